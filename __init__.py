@@ -4,18 +4,34 @@ from .design.directCommands.commands import *
 
 from .design.geometricTools.baseTools import *
 
+from .design.geometricTools.affine import AffineTransform
+
+from .design.geometricTools.pattern import ShapePattern
+
 from .design.geometricTools.extraTools import *
 
+from .design.geometricTools.containment import PolygonIndex, pointsInPolygon
+from .design.geometricTools.infill import serpentineInfill, sparseInfill
+
+from .design.geometricTools.offset import offsetPolygon, offsetLoops
+from .design.geometricTools.parallel import parallelLayers
+from .design.geometricTools.travel import optimizeTravel
+from .design.geometricTools.simplify import simplify
+
 from .design.geometricTools.polar import *
 
 from .design.geometricTools.vector import Vector
 
+from .design.geometricTools.shapeCache import shapeCache, ShapeCache
+
 from .design.geometries.curves import *
 
 from .design.geometries.shapes import *
 
 from .design.point import Point
 
+from .design.pointArray import PointArray, PointView, toPointArray
+
 from .transform.transformations import *
 
 from .visualizator.main import SoftwareRender
@@ -1,10 +1,20 @@
 from .point import Point
-from .geometricTools.extraTools import (nonPlanarVase, vaseMode, solidLayerInfill)
+from .pointArray import PointArray, PointView, toPointArray
+from .geometricTools.extraTools import (nonPlanarVase, nonPlanarVaseLayers, vaseMode, vaseLayers, solidLayerInfill)
 from .geometricTools.vector import Vector
-from .geometricTools.baseTools import (move, scale, rotate, copy)
+from .geometricTools.shapeCache import shapeCache, ShapeCache
+from .geometricTools.baseTools import (move, scale, rotate, copy, linearPattern, polarPattern, gridPattern)
+from .geometricTools.affine import AffineTransform
+from .geometricTools.containment import PolygonIndex, pointsInPolygon
+from .geometricTools.infill import serpentineInfill, sparseInfill
+from .geometricTools.offset import offsetPolygon, offsetLoops
+from .geometricTools.parallel import parallelLayers
+from .geometricTools.travel import optimizeTravel
+from .geometricTools.simplify import simplify
+from .geometricTools.pattern import ShapePattern
 from .geometricTools.polar import (PolarPoint,polarToPoint,pointToPolar,rotatePolarPoint)
 from .geometries.shapes import (arcXY, circle, helix, polygon, rectangle, spiral, square, varyingArc)
 from .geometries.curves import (cardinal_spline,sinusoidalWave,squareWave,tringleWave,cubic_bezier_point,cubic_bezier_curve,de_casteljau,bezier_curve_de_casteljau,catmull_rom_spline,nurbs_curve)
 
 # Define __all__ to make everything accessible through `from design import *`
-__all__ = ['Point', 'Vector', 'nonPlanarVase', 'vaseMode', 'solidLayerInfill', 'move', 'scale', 'rotate', 'copy', 'PolarPoint', 'polarToPoint', 'pointToPolar', 'rotatePolarPoint', 'arcXY', 'circle', 'helix', 'polygon', 'rectangle', 'spiral', 'square', 'varyingArc', 'cardinal_spline', 'sinusoidalWave', 'squareWave', 'tringleWave', 'cubic_bezier_point', 'cubic_bezier_curve', 'de_casteljau', 'bezier_curve_de_casteljau', 'catmull_rom_spline', 'nurbs_curve']
+__all__ = ['Point', 'PointArray', 'PointView', 'toPointArray', 'shapeCache', 'ShapeCache', 'Vector', 'nonPlanarVase', 'nonPlanarVaseLayers', 'vaseMode', 'vaseLayers', 'solidLayerInfill', 'PolygonIndex', 'pointsInPolygon', 'serpentineInfill', 'sparseInfill', 'offsetPolygon', 'offsetLoops', 'parallelLayers', 'optimizeTravel', 'simplify', 'move', 'scale', 'rotate', 'copy', 'linearPattern', 'polarPattern', 'gridPattern', 'AffineTransform', 'ShapePattern', 'PolarPoint', 'polarToPoint', 'pointToPolar', 'rotatePolarPoint', 'arcXY', 'circle', 'helix', 'polygon', 'rectangle', 'spiral', 'square', 'varyingArc', 'cardinal_spline', 'sinusoidalWave', 'squareWave', 'tringleWave', 'cubic_bezier_point', 'cubic_bezier_curve', 'de_casteljau', 'bezier_curve_de_casteljau', 'catmull_rom_spline', 'nurbs_curve']
@@ -0,0 +1,191 @@
+from typing import List, Optional, Union
+
+import numpy as np
+
+from design.geometricTools.vector import Vector
+from design.point import Point
+from design.pointArray import PointArray, PointView, toPointArray
+
+
+def translationMatrix(x: float, y: float, z: float) -> np.ndarray:
+    """
+    Returns: 4x4 homogeneous matrix moving points by (x, y, z)
+    """
+    matrix = np.eye(4)
+    matrix[:3, 3] = (x, y, z)
+    return matrix
+
+
+def scalingMatrix(scalar: float, axis: str = 'xyz') -> np.ndarray:
+    """
+    Returns: 4x4 homogeneous matrix scaling the given axes about the origin
+    """
+    return np.diag([scalar if name in axis else 1.0 for name in 'xyz'] + [1.0])
+
+
+def axisDirection(axis: Union[str, Vector, tuple, list, np.ndarray]) -> np.ndarray:
+    """
+    Returns: unit direction of a rotation axis given as 'x', 'y', 'z' or as a direction vector
+
+    Raises:
+        ValueError: If the axis is an unknown name or a zero vector.
+    """
+    if isinstance(axis, str):
+        if axis not in ('x', 'y', 'z'):
+            raise ValueError(f"Unknown axis: {axis}. Expected 'x', 'y', 'z' or a direction vector.")
+        return np.eye(3)['xyz'.index(axis)]
+    if isinstance(axis, Vector):
+        axis = (axis.x or 0.0, axis.y or 0.0, axis.z or 0.0)
+    direction = np.asarray(axis, dtype=float)
+    length = np.linalg.norm(direction)
+    if length == 0:
+        raise ValueError("The rotation axis must not be a zero vector.")
+    return direction / length
+
+
+def rotationMatrix(angle: float, axis: Union[str, Vector, tuple, list, np.ndarray] = 'z') -> np.ndarray:
+    """
+    Returns: 4x4 homogeneous matrix rotating points by angle (radians) about an axis through the origin,
+             counterclockwise when looking against the axis direction (Rodrigues' formula)
+    """
+    x, y, z = axisDirection(axis)
+    cosA, sinA = np.cos(angle), np.sin(angle)
+    cross = np.array([[0, -z, y], [z, 0, -x], [-y, x, 0]])
+    matrix = np.eye(4)
+    matrix[:3, :3] = cosA * np.eye(3) + sinA * cross + (1 - cosA) * np.outer((x, y, z), (x, y, z))
+    return matrix
+
+
+def aboutPivot(matrix: np.ndarray, pivot: np.ndarray) -> np.ndarray:
+    """
+    Returns: the matrix applied with pivot as the origin, T(pivot) @ matrix @ T(-pivot)
+    """
+    return translationMatrix(*pivot) @ matrix @ translationMatrix(*(-pivot))
+
+
+def applyMatrix(points: PointArray, matrix: np.ndarray) -> None:
+    """
+    Applies a 4x4 homogeneous matrix to all points of a PointArray in place, in a single product.
+    """
+    points.data[:3] = matrix[:3, :3] @ points.data[:3] + matrix[:3, 3:]
+
+
+def shapeCentroid(points: PointArray) -> np.ndarray:
+    """
+    Returns: center of the shape as used by scale and rotate, the closing point of an enclosed shape is left out
+    """
+    openPart = points.data[:3, :-1] if points.isClosed() else points.data[:3]
+    return openPart.mean(axis=1)
+
+
+class AffineTransform:
+    """
+    A chain of moves, scalings and rotations fused into a single 4x4 matrix.
+
+    The steps behave like move, scale and rotate from baseTools: unless a pivot is given, scaling and rotation
+    happen about the center of the shape as it is at that step of the chain. As affine maps keep centers, these
+    pivots are known from the center of the input shape alone, so the whole chain is composed into one matrix
+    and the points are touched once.
+
+    Example:
+        ```python
+        transformation = AffineTransform().move(Vector(x=0, y=0, z=10)).rotate(0.1 * pi).scale(1.05, 'xy')
+        layer = transformation.apply(baseShape)
+        ```
+    """
+
+    def __init__(self):
+        self.steps = []
+
+    def move(self, vector: Vector) -> 'AffineTransform':
+        """
+        Adds a move by vector to the chain.
+        """
+        self.steps.append(('move', translationMatrix(vector.x or 0.0, vector.y or 0.0, vector.z or 0.0), None))
+        return self
+
+    def scale(self, scalar: float, axis: str = 'xyz', pivot: Optional[Point] = None) -> 'AffineTransform':
+        """
+        Adds scaling of the given axes to the chain, about pivot or about the center of the shape.
+        """
+        self.steps.append(('pivoted', scalingMatrix(scalar, axis), pivot))
+        return self
+
+    def rotate(self, angle: float, axis: Union[str, Vector, tuple, list, np.ndarray] = 'z', pivot: Optional[Point] = None) -> 'AffineTransform':
+        """
+        Adds a rotation by angle (radians) about axis ('x', 'y', 'z' or a direction vector) to the chain.
+        The axis passes through pivot or through the center of the shape.
+        """
+        self.steps.append(('pivoted', rotationMatrix(angle, axis), pivot))
+        return self
+
+    def then(self, other: 'AffineTransform') -> 'AffineTransform':
+        """
+        Appends the steps of another transformation to this one.
+        """
+        self.steps.extend(other.steps)
+        return self
+
+    def matrix(self, center: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Composes the chain into one 4x4 matrix.
+
+        Args:
+            center (Optional[np.ndarray]): center of the input shape, needed for steps without an explicit pivot
+
+        Returns:
+            np.ndarray: the composed homogeneous matrix
+        """
+        composed = np.eye(4)
+        for kind, matrix, pivot in self.steps:
+            if kind == 'pivoted':
+                if pivot is not None:
+                    pivotPoint = np.array([pivot.x, pivot.y, pivot.z], dtype=float)
+                elif center is not None:
+                    # The center of the shape moves with the shape
+                    pivotPoint = composed[:3, :3] @ center + composed[:3, 3]
+                else:
+                    raise ValueError("A center is required to compose steps without a pivot.")
+                matrix = aboutPivot(matrix, pivotPoint)
+            composed = matrix @ composed
+        return composed
+
+    def apply(self, points: Union[Point, List[Point], PointArray, dict], copy: bool = True) -> Union[Point, dict]:
+        """
+        Transforms a point or a shape with the composed matrix.
+
+        Args:
+            points (Union[Point, List[Point], PointArray, dict]): The point(s) to transform. Can be a single Point, a list of Points, a PointArray, or a dictionary with key 'shape'.
+            copy (bool, optional): Whether to create and return a copy of the points, or modify the original. Default is True.
+
+        Returns:
+            Union[Point, dict]: A Point for a Point, otherwise a dictionary with key 'shape' containing a PointArray,
+                                or the original list of Points when `copy=False`.
+
+        Raises:
+            TypeError: If the type of `points` is not supported.
+        """
+        if isinstance(points, dict):
+            points = points['shape']
+
+        if isinstance(points, (Point, PointView)):
+            transformed = toPointArray(points)
+            applyMatrix(transformed, self.matrix(transformed.data[:3, 0]))
+            if copy:
+                return transformed[0].toPoint()
+            points.x, points.y, points.z = transformed.xyz[0].tolist()
+            return points
+
+        if not isinstance(points, (list, PointArray)):
+            raise TypeError(f"Unexpected item type: {type(points)}. Expected Point, list of Points, PointArray or dict.")
+
+        transformed = points.copy() if copy and isinstance(points, PointArray) else toPointArray(points)
+        applyMatrix(transformed, self.matrix(shapeCentroid(transformed)))
+
+        if isinstance(points, list) and not copy:
+            # Write the result back into the original Point objects
+            for point, (x, y, z) in zip(points, transformed.xyz.tolist()):
+                point.x, point.y, point.z = x, y, z
+            return {'shape': points}
+
+        return {'shape': transformed}
@@ -1,7 +1,13 @@
-from typing import List, Union
+from math import pi
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
 
 from .vector import Vector
 from ..point import Point
+from ..pointArray import PointArray, PointView
+from .affine import AffineTransform, aboutPivot, rotationMatrix
+from .pattern import ShapePattern
 from design.geometricTools.polar import PolarPoint, pointToPolar, polarToPoint, rotatePolarPoint
 
 def linespace(start: float, end: float, numberOfPoints: int) -> list:
@@ -18,15 +24,62 @@ def linespace(start: float, end: float, numberOfPoints: int) -> list:
 
     return [start + float(p) * (end - start) / (numberOfPoints - 1) for p in range(numberOfPoints)]
 
+def linespaceArray(start: float, end: float, numberOfPoints: int) -> np.ndarray:
+    """
+    Array version of linespace, evaluated in one numpy operation with the same rounding as linespace
+    Args:
+        start (float): starting value
+        end (float): ending value
+        numberOfPoints (int): number of points to be generated
+
+    Returns: array of evenly spaced points between start and end
+
+    """
+
+    return start + np.arange(numberOfPoints, dtype=float) * (end - start) / (numberOfPoints - 1)
+
 def flatten(listOfPoints: list) -> list:
     return [item for sublist in listOfPoints for item in sublist]
 
-def flattenPoints(nested_points: List[Union[Point, List]]) -> List[Point]:
+def iterPoints(nested_points: List[Union[Point, List, PointArray, ShapePattern]]) -> Iterator[Union[Point, PointView]]:
+    """
+    Iterates over the points of arbitrarily nested lists of Points, PointArrays and ShapePatterns in order,
+    without building intermediate lists. Nesting is walked with an explicit stack, so deep nesting cannot hit the recursion limit.
+
+    Args:
+        nested_points (List[Union[Point, List, PointArray, ShapePattern]]): A list containing Point objects, PointArrays, ShapePatterns or nested lists of them.
+
+    Yields:
+        Union[Point, PointView]: The points, PointArrays contribute their Point-compatible views.
+
+    Raises:
+        TypeError: If an item in the input list is neither a Point nor a list of Points.
     """
-    Recursively flattens a list of Point objects or nested lists of Point objects into a single list of Point objects.
+    stack = [iter(nested_points)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, list):
+                stack.append(iter(item))
+                break
+            elif isinstance(item, (Point, PointView)):
+                yield item
+            elif isinstance(item, PointArray):
+                yield from item
+            elif isinstance(item, ShapePattern):
+                for instance in item:
+                    yield from instance
+            else:
+                raise TypeError(f"Unexpected item type: {type(item)}. Expected Point or list of Points.")
+        else:
+            stack.pop()
+
+def flattenPoints(nested_points: List[Union[Point, List, PointArray, ShapePattern]]) -> List[Point]:
+    """
+    Flattens a list of Point objects or nested lists of Point objects into a single list of Point objects.
+    PointArrays and ShapePatterns found on the way contribute their Point-compatible views.
 
     Args:
-        nested_points (List[Union[Point, List]]): A list containing Point objects or nested lists of Point objects.
+        nested_points (List[Union[Point, List, PointArray, ShapePattern]]): A list containing Point objects, PointArrays or nested lists of Point objects.
 
     Returns:
         List[Point]: A flattened list containing only Point objects.
@@ -34,24 +87,65 @@ def flattenPoints(nested_points: List[Union[Point, List]]) -> List[Point]:
     Raises:
         TypeError: If an item in the input list is neither a Point nor a list of Points.
     """
-    flattened = []
-    for item in nested_points:
-        if isinstance(item, list):
-            # If the item is a list, call the function recursively
-            flattened.extend(flattenPoints(item))
-        elif isinstance(item, Point):
-            # If the item is a Point, append it to the flattened list
-            flattened.append(item)
+    return list(iterPoints(nested_points))
+
+def pointsToArray(nested_points: Union[Point, List, PointArray, ShapePattern, dict]) -> np.ndarray:
+    """
+    Collects the coordinates of a point, a shape or arbitrarily nested lists of them into one contiguous (N, 3) array.
+    PointArrays and ShapePatterns are copied as whole blocks, Points in between are gathered into a single block each,
+    and the blocks are joined once at the end. None coordinates count as 0, as in PointArray.fromPoints.
+
+    Args:
+        nested_points (Union[Point, List, PointArray, ShapePattern, dict]): The points, a dictionary with key 'shape' or 'pattern' is unpacked.
+
+    Returns:
+        np.ndarray: (N, 3) float array of x, y, z rows in the order of the points.
+
+    Raises:
+        TypeError: If an item is neither a Point nor a list of Points.
+    """
+    if isinstance(nested_points, dict):
+        nested_points = nested_points['pattern'] if 'pattern' in nested_points else nested_points['shape']
+    if not isinstance(nested_points, list):
+        nested_points = [nested_points]
+
+    blocks = []
+    pending = []
+    stack = [iter(nested_points)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, (Point, PointView)):
+                pending.extend((item.x or 0.0, item.y or 0.0, item.z or 0.0))
+                continue
+            if pending:
+                blocks.append(np.array(pending, dtype=float).reshape(-1, 3))
+                pending = []
+            if isinstance(item, list):
+                stack.append(iter(item))
+                break
+            elif isinstance(item, PointArray):
+                blocks.append(item.xyz)
+            elif isinstance(item, ShapePattern):
+                blocks.append(item.expand()[:, :3].transpose(0, 2, 1).reshape(-1, 3))
+            else:
+                raise TypeError(f"Unexpected item type: {type(item)}. Expected Point or list of Points.")
         else:
-            raise TypeError(f"Unexpected item type: {type(item)}. Expected Point or list of Points.")
-    return flattened
+            stack.pop()
+    if pending:
+        blocks.append(np.array(pending, dtype=float).reshape(-1, 3))
+
+    if not blocks:
+        return np.empty((0, 3))
+    if len(blocks) == 1:
+        return np.ascontiguousarray(blocks[0])
+    return np.concatenate(blocks, out=np.empty((sum(len(block) for block in blocks), 3)))
 
-def move(points: Union[Point, List[Point], dict], vector: Vector, copy: bool = True) -> Union[Point, dict]:
+def move(points: Union[Point, List[Point], PointArray, dict], vector: Vector, copy: bool = True) -> Union[Point, dict]:
     """
     Moves a point or list of points by a specified vector.
 
     Args:
-        points (Union[Point, List[Point], dict]): The point(s) to move. Can be a single Point, a list of Points, or a dictionary with key 'shape'.
+        points (Union[Point, List[Point], PointArray, dict]): The point(s) to move. Can be a single Point, a list of Points, a PointArray, or a dictionary with key 'shape'.
         vector (Vector): The vector by which to move the point(s).
         copy (bool, optional): Whether to create and return a copy of the points, or modify the original. Default is True.
 
@@ -112,15 +206,18 @@ def move(points: Union[Point, List[Point], dict], vector: Vector, copy: bool = T
                 p.z += vector.z
             return {'shape': points}
 
+    elif isinstance(points, PointArray):
+        return AffineTransform().move(vector).apply(points, copy)
+
     else:
         raise TypeError(f"Unexpected item type: {type(points)}. Expected Point, list of Points, or dict.")
 
-def scale(points: Union[Point, List[Point], dict], scalar: float, axis: str = 'xyz', copy: bool = True) -> Union[Point, dict]:
+def scale(points: Union[Point, List[Point], PointArray, dict], scalar: float, axis: str = 'xyz', copy: bool = True) -> Union[Point, dict]:
     """
     Scales a point or list of points around the center of the shape by a given scalar.
 
     Args:
-        points (Union[Point, List[Point], dict]): The point(s) to scale. Can be a single Point, a list of Points, or a dictionary with key 'shape'.
+        points (Union[Point, List[Point], PointArray, dict]): The point(s) to scale. Can be a single Point, a list of Points, a PointArray, or a dictionary with key 'shape'.
         scalar (float): The scale factor to apply.
         axis (str, optional): The axis or axes to apply scaling to. Default is 'xyz' (applies scaling in all axes).
         copy (bool, optional): Whether to create and return a copy of the points, or modify the original. Default is True.
@@ -195,89 +292,58 @@ def scale(points: Union[Point, List[Point], dict], scalar: float, axis: str = 'x
 
         return {'shape': scaled_points}
 
+    elif isinstance(points, PointArray):
+        return AffineTransform().scale(scalar, axis).apply(points, copy)
+
     else:
         raise TypeError(f"Unexpected item type: {type(points)}. Expected Point, list of Points, or dict.")
 
 
-def rotate(points: Union[Point, List[Point], dict], angle: float, axis: str = 'z', copy: bool = True) -> Union[
+def rotate(points: Union[Point, List[Point], PointArray, dict], angle: float, axis: Union[str, Vector] = 'z', copy: bool = True, pivot: Optional[Point] = None) -> Union[
     Point, dict]:
     """
-    Rotates a point or list of points around the center of the shape.
+    Rotates a point or list of points around an axis passing through the center of the shape.
+
+    All points are rotated at once with a single rotation matrix.
 
     Args:
-        points (Union[Point, List[Point], dict]): The point(s) to rotate. Can be a single Point, a list of Points, or a dictionary with key 'shape'.
+        points (Union[Point, List[Point], PointArray, dict]): The point(s) to rotate. Can be a single Point, a list of Points, a PointArray, or a dictionary with key 'shape'.
         angle (float): The angle in radians to rotate the points.
-        axis (str, optional): The axis around which to perform the rotation. Default is 'z'.
+        axis (Union[str, Vector], optional): The axis around which to perform the rotation, 'x', 'y', 'z' or any direction as a Vector. Default is 'z'.
         copy (bool, optional): Whether to create and return a copy of the points, or modify the original. Default is True.
+        pivot (Optional[Point], optional): A point on the rotation axis. Default is the center of the shape,
+                                           for a single Point that is the point itself, so it only moves when a pivot is given.
 
     Returns:
-        Union[Point, dict]: A Point or dictionary with key 'shape' containing a list of rotated points.
-                            If `copy=False`, modifies and returns the original points.
+        Union[Point, dict]: A Point or dictionary with key 'shape' containing a list of rotated points
+                            (a PointArray for a PointArray). If `copy=False`, modifies and returns the original points.
 
     Raises:
         TypeError: If the type of `points` is not supported.
+        ValueError: If the axis is not 'x', 'y', 'z' or a non-zero Vector.
     """
 
     if isinstance(points, dict):
         points = points['shape']
 
-    if isinstance(points, Point):
-        # For a single point, we just return it without rotating since there's no center defined for a single point
-        return points
-
-    elif isinstance(points, list):
-
-        # Determine if the shape is enclosed by checking if the first point equals the last point
-        is_enclosed = points and points[0] == points[-1]
-
-        # Make a copy of the points if required
-        if copy:
-            points = points[:]
-
-        # Exclude the last point if it is a copy of the first
-        if is_enclosed:
-            points = points[:-1]
-
-        # Calculate the center point
-        center_x = sum(p.x for p in points) / len(points)
-        center_y = sum(p.y for p in points) / len(points)
-        center_z = sum(p.z for p in points) / len(points)
-        center = Point(x=center_x, y=center_y, z=center_z)
-
-        # Rotate points around the center using polar coordinates
-        rotated_points = []
-        for p in points:
-            polar_point = pointToPolar(center, p)
-            rotated_polar_point = rotatePolarPoint(polar_point, angle)
-            rotated_point = polarToPoint(center, rotated_polar_point.radious, rotated_polar_point.angle)
-
-            if copy:
-                rotated_points.append(rotated_point)
-            else:
-                # Modify the original point in place
-                p.x = rotated_point.x
-                p.y = rotated_point.y
-                p.z = rotated_point.z
+    if not isinstance(points, (Point, PointView, list, PointArray)):
+        raise TypeError(f"Unexpected item type: {type(points)}. Expected Point, list of Points, or dict.")
 
-        if is_enclosed:
-            if copy:
-                rotated_points.append(rotated_points[0].copy())
-            else:
-                # If modifying in place, add the closing point again by modifying the reference to match the first point
-                points.append(points[0])
+    rotated = AffineTransform().rotate(angle, axis, pivot).apply(points, copy)
 
-        return {'shape': rotated_points} if copy else {'shape': points}
+    if isinstance(points, list) and copy:
+        # A list of Points stays a list of Points
+        return {'shape': rotated['shape'].toPoints()}
 
-    else:
-        raise TypeError(f"Unexpected item type: {type(points)}. Expected Point, list of Points, or dict.")
+    return rotated
 
 
-def copy(points: Union[Point, List[Point], dict]) -> Union[Point, dict]:
+def copy(points: Union[Point, List[Point], PointArray, dict]) -> Union[Point, dict]:
     """
     Creates a copy of a point or list of points.
 
     Args:
-        points (Union[Point, List[Point], dict]): The point(s) to copy. Can be a single Point, a list of Points, or a dictionary with key 'shape'.
+        points (Union[Point, List[Point], PointArray, dict]): The point(s) to copy. Can be a single Point, a list of Points, a PointArray, or a dictionary with key 'shape'.
 
     Returns:
         Union[Point, dict]: A Point or dictionary with key 'shape' containing a list of copied points.
@@ -294,14 +360,87 @@ def copy(points: Union[Point, List[Point], dict]) -> Union[Point, dict]:
     elif isinstance(points, list):
         return [p.copy() for p in points]
 
+    elif isinstance(points, PointArray):
+        return points.copy()
+
     elif isinstance(points, dict):
         points = points['shape']
+        if isinstance(points, PointArray):
+            return {'shape': points.copy()}
         return {'shape': [p.copy() for p in points]}
 
 
     else:
         raise TypeError(f"Unexpected item type: {type(points)}. Expected Point, list of Points, or dict.")
 
+def linearPattern(points: Union[List[Point], PointArray, dict], count: int, vector: Vector) -> dict:
+    """
+    Repeats a shape count times, every instance moved by vector from the previous one.
+    The first instance is the shape itself.
+
+    Args:
+        points (Union[List[Point], PointArray, dict]): The shape to repeat. Can be a list of Points, a PointArray, or a dictionary with key 'shape'.
+        count (int): Number of instances.
+        vector (Vector): Offset between neighbouring instances.
+
+    Returns:
+        dict: A dictionary with key 'pattern' containing a ShapePattern.
+
+    Example:
+        ```python
+        # Ten stacked copies of a circle, 20.4 mm apart
+        stack = linearPattern(circle(Point(x=0, y=0, z=0), 10), 10, Vector(x=0, y=0, z=20.4))
+        ```
+    """
+    offsets = np.arange(count)[:, None] * [vector.x or 0.0, vector.y or 0.0, vector.z or 0.0]
+    transforms = np.tile(np.eye(4), (count, 1, 1))
+    transforms[:, :3, 3] = offsets
+    return {'pattern': ShapePattern(points, transforms)}
+
+
+def polarPattern(points: Union[List[Point], PointArray, dict], count: int, center: Point, angleStep: Optional[float] = None, axis: Union[str, Vector] = 'z') -> dict:
+    """
+    Repeats a shape count times around an axis passing through center.
+
+    Args:
+        points (Union[List[Point], PointArray, dict]): The shape to repeat. Can be a list of Points, a PointArray, or a dictionary with key 'shape'.
+        count (int): Number of instances.
+        center (Point): A point on the axis of the pattern.
+        angleStep (Optional[float], optional): Angle in radians between neighbouring instances. Default spreads the instances over a full turn.
+        axis (Union[str, Vector], optional): The axis of the pattern, 'x', 'y', 'z' or any direction as a Vector. Default is 'z'.
+
+    Returns:
+        dict: A dictionary with key 'pattern' containing a ShapePattern.
+    """
+    if angleStep is None:
+        angleStep = 2 * pi / count
+    pivot = np.array([center.x, center.y, center.z], dtype=float)
+    transforms = np.stack([aboutPivot(rotationMatrix(index * angleStep, axis), pivot) for index in range(count)])
+    return {'pattern': ShapePattern(points, transforms)}
+
+
+def gridPattern(points: Union[List[Point], PointArray, dict], columns: int, rows: int, columnVector: Vector, rowVector: Vector) -> dict:
+    """
+    Repeats a shape on a columns x rows grid, row by row.
+
+    Args:
+        points (Union[List[Point], PointArray, dict]): The shape to repeat. Can be a list of Points, a PointArray, or a dictionary with key 'shape'.
+        columns (int): Number of instances in a row.
+        rows (int): Number of rows.
+        columnVector (Vector): Offset between neighbouring instances in a row.
+        rowVector (Vector): Offset between neighbouring rows.
+
+    Returns:
+        dict: A dictionary with key 'pattern' containing a ShapePattern.
+    """
+    column, row = np.meshgrid(np.arange(columns), np.arange(rows))
+    offsets = (column.reshape(-1, 1) * [columnVector.x or 0.0, columnVector.y or 0.0, columnVector.z or 0.0]
+               + row.reshape(-1, 1) * [rowVector.x or 0.0, rowVector.y or 0.0, rowVector.z or 0.0])
+    transforms = np.tile(np.eye(4), (columns * rows, 1, 1))
+    transforms[:, :3, 3] = offsets
+    return {'pattern': ShapePattern(points, transforms)}
+
+
 """
 def rotate(points: Union[Point, List[Point], dict], angle: float, axis: str = 'z') -> Union[Point, dict]:
 
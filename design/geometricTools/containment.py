@@ -0,0 +1,201 @@
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from design.geometricTools.intersections import asCoordinates
+from design.point import Point
+from design.pointArray import PointArray, toPointArray
+
+
+class PolygonIndex:
+    """
+    Edges of closed outlines sorted into horizontal bands, for point-in-polygon tests of many points at once.
+
+    A point is tested by casting a ray from it towards +x: only the edges listed in the band of the point can
+    cross the ray, so every point is tested against a handful of edges instead of all of them. An edge crosses the
+    ray if the point's y lies in its half-open y range, so a ray through a vertex counts it once for a crossing and
+    twice or not at all for a touch. Points exactly on an edge may be reported as inside or outside.
+
+    The entries are stored sorted by band: edges[bandStart[b]:bandStart[b + 1]] are the edges of band b.
+
+    Attributes:
+        starts (np.ndarray): (N, 2) first vertex of every edge
+        ends (np.ndarray): (N, 2) second vertex of every edge
+        low (float): lowest y of the edges, where band 0 starts
+        bandHeight (float): height of a band
+        bands (int): number of bands
+        bandStart (np.ndarray): offset of the entries of every band, bands + 1 values
+        edges (np.ndarray): edge indices of the entries
+    """
+
+    __slots__ = ('starts', 'ends', 'low', 'bandHeight', 'bands', 'bandStart', 'edges')
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, bands: Optional[int] = None):
+        starts = np.asarray(starts, dtype=float).reshape(-1, np.shape(starts)[-1])[:, :2]
+        ends = np.asarray(ends, dtype=float).reshape(-1, np.shape(ends)[-1])[:, :2]
+        # Horizontal edges never cross a horizontal ray
+        sloped = starts[:, 1] != ends[:, 1]
+        self.starts, self.ends = starts[sloped], ends[sloped]
+
+        lowY = np.minimum(self.starts[:, 1], self.ends[:, 1])
+        highY = np.maximum(self.starts[:, 1], self.ends[:, 1])
+        self.low = float(lowY.min()) if len(lowY) else 0.0
+        height = float(highY.max()) - self.low if len(highY) else 0.0
+
+        if bands is None:
+            # As many bands as edges, fewer if tall edges would be listed in too many of them
+            bands = max(len(lowY), 1)
+            while bands > 1 and self.entryCount(lowY, highY, height, bands) > 16 * len(lowY):
+                bands //= 4
+        self.bands = max(int(bands), 1)
+        self.bandHeight = height / self.bands if height > 0 else 1.0
+
+        first, last = self.bandOf(lowY), self.bandOf(highY)
+        counts = last - first + 1
+        edges = np.repeat(np.arange(len(lowY)), counts)
+        entryBands = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        order = np.argsort(entryBands, kind='stable')
+        self.edges = edges[order]
+        self.bandStart = np.searchsorted(entryBands[order], np.arange(self.bands + 1))
+
+    @classmethod
+    def fromLoops(cls, loops: List[Union[dict, List[Point], PointArray, np.ndarray]], bands: Optional[int] = None) -> 'PolygonIndex':
+        """
+        Builds the index over one or more closed outlines, e.g. a contour and its holes. Every outline is closed
+        by an edge from its last point back to its first, unless they already coincide.
+        """
+        starts, ends = [], []
+        for loop in loops:
+            vertices = asCoordinates(loop)[:, :2]
+            if len(vertices) > 1 and np.array_equal(vertices[0], vertices[-1]):
+                vertices = vertices[:-1]
+            starts.append(vertices)
+            ends.append(np.roll(vertices, -1, axis=0))
+        return cls(np.concatenate(starts) if starts else np.empty((0, 2)), np.concatenate(ends) if ends else np.empty((0, 2)), bands)
+
+    def entryCount(self, lowY: np.ndarray, highY: np.ndarray, height: float, bands: int) -> int:
+        if height <= 0:
+            return len(lowY)
+        scale = bands / height
+        first = np.minimum(np.floor((lowY - self.low) * scale), bands - 1)
+        last = np.minimum(np.floor((highY - self.low) * scale), bands - 1)
+        return int((last - first + 1).sum())
+
+    def bandOf(self, y: np.ndarray) -> np.ndarray:
+        """
+        Returns: band of every y value, clamped to the bands
+        """
+        return np.clip(np.floor((np.asarray(y, dtype=float) - self.low) / self.bandHeight), 0, self.bands - 1).astype(int)
+
+    def windingNumbers(self, points: Union[Point, List[Point], PointArray, np.ndarray], chunkSize: int = 1 << 22) -> np.ndarray:
+        """
+        Winding number of the outlines around every point: the crossings of the ray from the point towards +x
+        with upward edges minus those with downward edges. It is 1 inside a counterclockwise outline, -1 inside a
+        clockwise one and 0 outside.
+
+        Args:
+            points (Union[Point, List[Point], PointArray, np.ndarray]): the query points, x and y first
+            chunkSize (int): approximate number of point-edge pairs computed at once
+
+        Returns:
+            np.ndarray: the winding number of every point
+        """
+        return self.countCrossings(points, chunkSize)[1]
+
+    def contains(self, points: Union[Point, List[Point], PointArray, np.ndarray], rule: str = 'evenodd', chunkSize: int = 1 << 22) -> np.ndarray:
+        """
+        Tests which points lie inside the outlines.
+
+        Args:
+            points (Union[Point, List[Point], PointArray, np.ndarray]): the query points, x and y first
+            rule (str): 'evenodd', inside if the ray crosses the outlines an odd number of times, so holes are outside,
+                        or 'nonzero', inside if the outlines wind around the point, so overlapping outlines stay inside
+            chunkSize (int): approximate number of point-edge pairs computed at once
+
+        Returns:
+            np.ndarray: True for every point inside
+
+        Raises:
+            ValueError: If the rule is unknown.
+        """
+        if rule not in ('evenodd', 'nonzero'):
+            raise ValueError(f"Unknown fill rule: {rule}. Expected 'evenodd' or 'nonzero'.")
+        crossings, winding = self.countCrossings(points, chunkSize)
+        return crossings % 2 == 1 if rule == 'evenodd' else winding != 0
+
+    def countCrossings(self, points: Union[Point, List[Point], PointArray, np.ndarray], chunkSize: int = 1 << 22) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns: number of edges the ray from every point towards +x crosses, and their upward minus downward count
+        """
+        xy = asCoordinates(points)[:, :2]
+        crossings = np.zeros(len(xy), dtype=np.int64)
+        winding = np.zeros(len(xy), dtype=np.int64)
+        if len(self.starts) == 0 or len(xy) == 0:
+            return crossings, winding
+
+        band = self.bandOf(xy[:, 1])
+        counts = self.bandStart[band + 1] - self.bandStart[band]
+        # Points below or above all edges cannot be enclosed
+        counts[(xy[:, 1] < self.low) | (xy[:, 1] > self.low + self.bands * self.bandHeight)] = 0
+        cumulative = np.cumsum(counts)
+
+        first = 0
+        while first < len(xy):
+            # Chunks of points with about chunkSize pairs together
+            done = cumulative[first - 1] if first else 0
+            last = max(int(np.searchsorted(cumulative, done + chunkSize, side='right')), first + 1)
+            chunkCounts = counts[first:last]
+            point = np.repeat(np.arange(first, last), chunkCounts)
+            entry = np.repeat(self.bandStart[band[first:last]] - np.cumsum(chunkCounts) + chunkCounts, chunkCounts) + np.arange(chunkCounts.sum())
+            edge = self.edges[entry]
+
+            x, y = xy[point, 0], xy[point, 1]
+            (x0, y0), (x1, y1) = self.starts[edge].T, self.ends[edge].T
+            upward = y1 > y0
+            spans = np.where(upward, (y0 <= y) & (y < y1), (y1 <= y) & (y < y0))
+            crossX = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+            hit = spans & (crossX > x)
+
+            crossings[first:last] = np.bincount(point[hit] - first, minlength=last - first)
+            winding[first:last] = np.bincount(point[hit] - first, weights=np.where(upward[hit], 1, -1), minlength=last - first).astype(np.int64)
+            first = last
+        return crossings, winding
+
+
+def polygonIndex(shape: Union[dict, List[Point], PointArray]) -> PolygonIndex:
+    """
+    The PolygonIndex of a closed shape. For a PointArray the index is built once and kept in its cache,
+    it is rebuilt only after the points have been changed.
+
+    Args:
+        shape (Union[dict, List[Point], PointArray]): the closed outline, a dictionary with key 'shape', a list of Points or a PointArray
+
+    Returns:
+        PolygonIndex: the index of the outline's edges
+    """
+    points = toPointArray(shape)
+    vertices = points.data[:2]
+    # Compared in full, the points can also have been changed in place through data or the x and y rows
+    cached = points.cache.get('polygonIndex')
+    if cached is not None and np.array_equal(cached[0], vertices):
+        return cached[1]
+    index = PolygonIndex.fromLoops([vertices.T])
+    points.cache['polygonIndex'] = (vertices.copy(), index)
+    return index
+
+
+def pointsInPolygon(points: Union[Point, List[Point], PointArray, np.ndarray], polygon: Union[dict, List[Point], PointArray, PolygonIndex],
+                    rule: str = 'evenodd') -> np.ndarray:
+    """
+    Tests which of many points lie inside a closed shape, see PolygonIndex.contains.
+
+    Args:
+        points (Union[Point, List[Point], PointArray, np.ndarray]): the query points, an array of x, y [, z] rows for large batches
+        polygon (Union[dict, List[Point], PointArray, PolygonIndex]): the closed shape, or a PolygonIndex e.g. of a contour with holes
+        rule (str): 'evenodd' or 'nonzero'. Default is 'evenodd'.
+
+    Returns:
+        np.ndarray: True for every point inside
+    """
+    index = polygon if isinstance(polygon, PolygonIndex) else polygonIndex(polygon)
+    return index.contains(points, rule)
@@ -1,6 +1,24 @@
+from functools import wraps
+
+from design.pointArray import PointArray
+from design.geometricTools.shapeCache import shapeCache
+
 
 def geometryDecorator(shape_function):
-    def wrapper(*args, **kwargs):
-        list_of_points = shape_function(*args, **kwargs)
+    """
+    Wraps a shape function so that it returns a step dictionary {'shape': points}.
+
+    Shape functions may return either a list of Points or a PointArray. Passing ``asArray=True``
+    to the decorated function converts a list result into a PointArray.
+    When shapeCache is enabled, results are memoized on the function arguments.
+    """
+    @wraps(shape_function)
+    def wrapper(*args, asArray: bool = False, **kwargs):
+        if shapeCache.enabled:
+            list_of_points = shapeCache.call(shape_function, args, kwargs)
+        else:
+            list_of_points = shape_function(*args, **kwargs)
+        if asArray and not isinstance(list_of_points, PointArray):
+            list_of_points = PointArray.fromPoints(list_of_points)
         return {'shape': list_of_points}
     return wrapper
@@ -1,8 +1,15 @@
 from math import sqrt
 
-from design.geometricTools.baseTools import linespace, copy
+import numpy as np
+
+from design.geometricTools.baseTools import linespaceArray
 from design.point import Point
-from typing import List, Union
+from design.pointArray import PointArray, toPointArray
+from design.geometricTools.scanline import scanlineIntersections
+from design.geometricTools.intersections import segmentIntersections
+from design.geometricTools.offset import offsetPolygon
+from design.geometricTools.spatialIndex import edgeGrid
+from typing import Iterator, List, Optional, Union
 from design.directCommands.commands import moveWithNoExtrusion
 
 def euclideanDistance(p1: Point, p2: Point) -> float:
@@ -18,108 +25,135 @@ def euclideanDistance(p1: Point, p2: Point) -> float:
     """
     return sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
 
-def nonPlanarVase(baseShape: dict[str, Union[Point, List[Point]]],variation: float, height: int, extrusionW: float, extrusionH: float ) -> dict[str, List[Point]]:
+def layerExtrusion(points: np.ndarray, previous: Optional[np.ndarray], factor: Union[float, np.ndarray], extrusionW: float, extrusionH: float) -> np.ndarray:
     """
-        Generates a non-planar vase-like 3D shape by extruding a given base shape with variation over a specified height.
+    Extrusion of every point of a layer from its distance to the point printed before it, all points at once.
+
+    Args:
+        points (np.ndarray): (N, 3) coordinates of the layer
+        previous (Optional[np.ndarray]): the last point of the previous layer, None for the first layer
+        factor (Union[float, np.ndarray]): scale of the extrusion, for all points or one per point
+        extrusionW (float): The width factor for extrusion calculations.
+        extrusionH (float): The height factor for extrusion calculations.
+
+    Returns:
+        np.ndarray: extrusion of every point, NaN for the first point of the first layer
+    """
+    before = np.empty_like(points)
+    before[1:] = points[:-1]
+    before[0] = points[0] if previous is None else previous
+    distance = np.sqrt(((points - before) ** 2).sum(axis=1))
+    extrusion = distance * extrusionW * extrusionH * factor
+    if previous is None:
+        extrusion[0] = np.nan
+    return extrusion
+
+def nonPlanarVaseLayers(baseShape: dict[str, Union[List[Point], PointArray]], variation: float, height: int, extrusionW: float, extrusionH: float) -> Iterator[dict[str, PointArray]]:
+    """
+        Generates a non-planar vase-like 3D shape layer by layer, by extruding a given base shape with variation over a specified height.
+
+        Layers are computed only when requested, each with array operations over all of its points, and the base
+        shape is left untouched. The generator can be passed directly to parseStepsToGcode.
 
         Args:
-            baseShape (dict[str, Union[Point, List[Point]]]): A dictionary containing the base shape, represented as a list of Points.
+            baseShape (dict[str, Union[List[Point], PointArray]]): A dictionary containing the base shape, represented as a list of Points or a PointArray.
             variation (float): A factor that adds variation to the extrusion height, resulting in a non-planar effect.
             height (int): The number of layers to extrude the base shape vertically.
             extrusionW (float): The width factor for extrusion calculations.
             extrusionH (float): The height factor for extrusion calculations.
 
-        Returns:
-            dict[str, List[Point]]: A dictionary containing the extruded non-planar shape as a list of Points.
-    `"""
-    shapePoints = baseShape['shape']
-    print(shapePoints)
-    pointsLength = len(shapePoints)
-    change1  = linespace(0, 1, pointsLength//2)
-    change2 = linespace(1, 0, pointsLength//2)
-    change = change1 + change2
-
-    previousPoint = shapePoints[0]
-
-    vasePoints = [previousPoint]
-    for point in range(1, pointsLength):
-        if point < pointsLength / 2:
-            distance = euclideanDistance(previousPoint, shapePoints[point])
-            extrusion = (distance * extrusionW * extrusionH) * (1 + variation * change[point])
-            shapePoints[point].z = (shapePoints[point].z + extrusionH) * (1 + variation * change[point])
-            shapePoints[point].e = extrusion
-        else:
-            distance = euclideanDistance(previousPoint, shapePoints[point])
-            extrusion = (distance * extrusionW * extrusionH) * (1 + variation * change[point])
-            shapePoints[point].z = (shapePoints[point].z + extrusionH) * (1 + variation * change[point])
-            shapePoints[point].e = extrusion
-        previousPoint = shapePoints[point]
-        vasePoints.append(shapePoints[point])
-
-
-    for layer in range(1, height):
-        currentLayer = copy(shapePoints)
-        print(currentLayer)
-        for point in range(0, pointsLength):
-            currentLayer[point].z = shapePoints[point].z * layer
-            vasePoints.append(currentLayer[point])
-
-    return {'shape': vasePoints}
-
-def vaseMode(baseShape: dict[str, Union[Point, List[Point]]],height: int, extrusionW: float, extrusionH: float ) -> dict[str, List[Point]]:
+        Yields:
+            dict[str, PointArray]: One {'shape': PointArray} step per layer, from the bottom up.
     """
-        Generates a vase-like 3D shape by extruding a given base shape over a specified height.
+    base = toPointArray(baseShape['shape'])
+    pointsLength = len(base)
+
+    # The variation rises along the first half of the shape and falls along the second
+    half = pointsLength // 2
+    change = np.concatenate((linespaceArray(0, 1, half), linespaceArray(1, 0, pointsLength - half)))
+    factor = 1 + variation * change
+    firstZ = (base.z + extrusionH) * factor
+
+    previous = None
+    for layer in range(height):
+        points = np.column_stack((base.x, base.y, firstZ * (layer + 1)))
+        extrusion = layerExtrusion(points, previous, factor, extrusionW, extrusionH)
+        previous = points[-1]
+        yield {'shape': PointArray(points[:, 0], points[:, 1], points[:, 2], extrusion)}
+
+def nonPlanarVase(baseShape: dict[str, Union[List[Point], PointArray]], variation: float, height: int, extrusionW: float, extrusionH: float) -> dict[str, PointArray]:
+    """
+        Generates a non-planar vase-like 3D shape by extruding a given base shape with variation over a specified height.
+        All layers of nonPlanarVaseLayers joined into one shape.
 
         Args:
-            baseShape (dict[str, Union[Point, List[Point]]]): A dictionary containing the base shape, represented as a list of Points.
+            baseShape (dict[str, Union[List[Point], PointArray]]): A dictionary containing the base shape, represented as a list of Points or a PointArray.
+            variation (float): A factor that adds variation to the extrusion height, resulting in a non-planar effect.
             height (int): The number of layers to extrude the base shape vertically.
             extrusionW (float): The width factor for extrusion calculations.
             extrusionH (float): The height factor for extrusion calculations.
 
         Returns:
-            dict[str, List[Point]]: A dictionary containing the extruded shape as a list of Points.
+            dict[str, PointArray]: A dictionary containing the extruded non-planar shape as a PointArray.
     """
+    return {'shape': PointArray.concatenate(step['shape'] for step in nonPlanarVaseLayers(baseShape, variation, height, extrusionW, extrusionH))}
 
-    shapePoints = baseShape['shape']
-
-    pointsLength = len(shapePoints)
-
-    change = linespace(0, 1, pointsLength)
-
-    previousPoint = shapePoints[0]
-
-    vasePoints = [previousPoint]
-    for point in shapePoints:
-        point.e = 0.0
+def vaseLayers(baseShape: dict[str, Union[List[Point], PointArray]], height: int, extrusionW: float, extrusionH: float) -> Iterator[dict[str, PointArray]]:
+    """
+        Generates a vase-like 3D shape layer by layer, by extruding a given base shape over a specified height.
 
-    for point in range(1, pointsLength):
-        distance = euclideanDistance(previousPoint, shapePoints[point])
-        extrusion = (distance * extrusionW * extrusionH) * change[point]
-        shapePoints[point].z = (shapePoints[point].z + extrusionH) * change[point]
-        shapePoints[point].e = extrusion
-        previousPoint = shapePoints[point]
-        vasePoints.append(shapePoints[point])
+        The first layer ramps up from the base shape to one layer height with growing extrusion, the last one closes
+        the top with fading extrusion. Layers are computed only when requested, each with array operations over all
+        of its points, and the base shape is left untouched. The generator can be passed directly to parseStepsToGcode.
 
+        Args:
+            baseShape (dict[str, Union[List[Point], PointArray]]): A dictionary containing the base shape, represented as a list of Points or a PointArray.
+            height (int): The number of layers to extrude the base shape vertically.
+            extrusionW (float): The width factor for extrusion calculations.
+            extrusionH (float): The height factor for extrusion calculations.
 
-    for layer in range(1, height - 1):
-        currentLayer = copy(shapePoints)
-        print(currentLayer)
-        for point in range(0, pointsLength):
-            extrusion = (distance * extrusionW * extrusionH)
-            currentLayer[point].z = shapePoints[point].z + extrusionH * layer
-            currentLayer[point].e = extrusion
-            vasePoints.append(currentLayer[point])
+        Yields:
+            dict[str, PointArray]: One {'shape': PointArray} step per layer, from the bottom up.
+    """
+    base = toPointArray(baseShape['shape'])
+    pointsLength = len(base)
+
+    change = linespaceArray(0, 1, pointsLength)
+    rampZ = (base.z + extrusionH) * change
+    rampZ[0] = base.z[0]
+
+    previous = None
+    # The ramp is printed even for a height below 1
+    for layer in range(max(height, 1)):
+        # Ramp, walls and the closing layer without its first point
+        first, factor = 0, 1.0
+        if layer == 0:
+            factor = change
+        elif layer == height - 1:
+            first, factor = 1, change[:0:-1]
+        z = rampZ[first:] + extrusionH * layer
+        points = np.column_stack((base.x[first:], base.y[first:], z))
+        extrusion = layerExtrusion(points, previous, factor, extrusionW, extrusionH)
+        if previous is None:
+            extrusion[0] = 0.0
+        previous = points[-1]
+        yield {'shape': PointArray(points[:, 0], points[:, 1], points[:, 2], extrusion)}
+
+def vaseMode(baseShape: dict[str, Union[List[Point], PointArray]], height: int, extrusionW: float, extrusionH: float) -> dict[str, PointArray]:
+    """
+        Generates a vase-like 3D shape by extruding a given base shape over a specified height.
+        All layers of vaseLayers joined into one shape.
 
-    for point in range(1, pointsLength):
-        currentLayer = copy(shapePoints)
-        distance = euclideanDistance(previousPoint, shapePoints[point])
-        extrusion = (distance * extrusionW * extrusionH) * change[-point]
-        shapePoints[point].z = shapePoints[point].z + extrusionH * (height-1)
-        shapePoints[point].e = extrusion
-        previousPoint = shapePoints[point]
-        vasePoints.append(shapePoints[point])
+        Args:
+            baseShape (dict[str, Union[List[Point], PointArray]]): A dictionary containing the base shape, represented as a list of Points or a PointArray.
+            height (int): The number of layers to extrude the base shape vertically.
+            extrusionW (float): The width factor for extrusion calculations.
+            extrusionH (float): The height factor for extrusion calculations.
 
-    return {'shape': vasePoints}
+        Returns:
+            dict[str, PointArray]: A dictionary containing the extruded shape as a PointArray.
+    """
+    return {'shape': PointArray.concatenate(step['shape'] for step in vaseLayers(baseShape, height, extrusionW, extrusionH))}
 
 
 '''
@@ -184,127 +218,98 @@ def solidLayerInfill(baseShape: dict[str, List[Point]], extrusion_width: float)
     return infill_commands
 '''
 
-def solidLayerInfill(baseShape: dict[str, List[Point]], extrusion_width: float, infill_axis: str = 'y') -> List[dict[str, Union[List[Point], Point]]]:
+def solidLayerInfill(baseShape: dict[str, Union[List[Point], PointArray]], extrusion_width: float, infill_axis: str = 'y', perimeters: int = 0) -> List[dict[str, Union[List[Point], Point]]]:
     """
     Generate a solid layer inside the enclosed base shape using a linear infill pattern that fits inside a complex shape.
 
+    The infill lines are intersected with the shape in a single scanline sweep over its edges (see scanline.EdgeTable).
+    With perimeters, the infill fills the inside of the innermost perimeter (see offset.offsetLoops), every loop
+    the shape splits into on its own.
+
     Args:
-        baseShape (dict[str, List[Point]]): The closed base shape represented as a dictionary with the key 'shape' and a list of Point objects.
+        baseShape (dict[str, Union[List[Point], PointArray]]): The closed base shape represented as a dictionary with the key 'shape' and a list of Point objects or a PointArray.
         extrusion_width (float): The width of the extrusion in millimeters, used as the spacing between infill lines.
         infill_axis (str): Axis along which to generate infill lines, either 'x' or 'y'. Default is 'y'.
+        perimeters (int): Number of perimeters of extrusion_width printed along the shape, left free of infill. Default is 0.
 
     Returns:
         List[Dict[str, Union[List[Point], Point]]]: A list containing dictionaries with either a 'shape' key or 'moveWithNoExtrusion' key.
                                                      Each 'shape' key contains a list of Point objects representing the infill pattern.
                                                      Each 'moveWithNoExtrusion' key contains a Point object for a non-extruding move.
     """
-    # Extract points from baseShape
-    shape_points = baseShape['shape']
+    if perimeters:
+        # The infill region is bounded by the inner side of the innermost perimeter
+        infill_commands = []
+        for region in offsetPolygon(baseShape['shape'], -perimeters * extrusion_width):
+            infill_commands.extend(solidLayerInfill({'shape': region}, extrusion_width, infill_axis))
+        return infill_commands
+
+    outline = toPointArray(baseShape['shape'])
 
     # Calculate the bounding box of the shape, expanding by half the extrusion width to ensure complete fill
-    min_x = min(point.x for point in shape_points) - (extrusion_width / 2)
-    max_x = max(point.x for point in shape_points) + (extrusion_width / 2)
-    min_y = min(point.y for point in shape_points) - (extrusion_width / 2)
-    max_y = max(point.y for point in shape_points) + (extrusion_width / 2)
+    min_x = float(outline.x.min()) - (extrusion_width / 2)
+    max_x = float(outline.x.max()) + (extrusion_width / 2)
+    min_y = float(outline.y.min()) - (extrusion_width / 2)
+    max_y = float(outline.y.max()) + (extrusion_width / 2)
 
     # Initialize list to hold the infill points and the move commands
     infill_commands = []
 
-    # Generate infill based on the specified axis
     if infill_axis == 'y':
-        # Generate y values for the infill lines using a for loop with an extrusion width step
+        # Lines parallel to the x-axis at y values spaced according to 'extrusion_width', each starting at min_x
         values = [min_y + i * extrusion_width for i in range(int((max_y - min_y) / extrusion_width) + 1)]
-
-        # Create parallel lines along y-axis within the bounding box, spaced according to 'extrusion_width'
-        for i, current_y in enumerate(values):
-            start_point = Point(x=min_x, y=current_y, z=0)
-            end_point = Point(x=max_x, y=current_y, z=0)
-
-            # Find intersections between the line and the boundary of the shape
-            intersections = findIntersectionsWithShape(shape_points, start_point, end_point)
-
-            # Sort intersections by x to determine segments within the shape
-            intersections.sort(key=lambda p: p.x)
-
-            # Use the even-odd rule to add segments inside the shape
-            for j in range(0, len(intersections) - 1, 2):
-                p1 = intersections[j]
-                p2 = intersections[j + 1]
-
-                # Create a segment between each pair of intersections
-                infill_commands.append({'shape': [p1, p2]})
-
-                # Add a moveWithNoExtrusion command to move to the start of the next segment without extruding
-                if j + 2 < len(intersections):
-                    move_to_next_start = moveWithNoExtrusion(intersections[j + 2])
-                    infill_commands.append(move_to_next_start)
-
-            # If not the last line, add a moveWithNoExtrusion to the start of the next line
-            if i < len(values) - 1:
-                move_to_next_start = moveWithNoExtrusion(Point(x=min_x, y=values[i + 1], z=0))
-                infill_commands.append(move_to_next_start)
-
+        toPoint = lambda along, across: Point(x=along, y=across, z=0)
+        lineStart = min_x
     elif infill_axis == 'x':
-        # Generate x values for the infill lines using a for loop with an extrusion width step
+        # Lines parallel to the y-axis at x values spaced according to 'extrusion_width', each starting at min_y
         values = [min_x + i * extrusion_width for i in range(int((max_x - min_x) / extrusion_width) + 1)]
+        toPoint = lambda along, across: Point(x=across, y=along, z=0)
+        lineStart = min_y
+    else:
+        return infill_commands
 
-        # Create parallel lines along x-axis within the bounding box, spaced according to 'extrusion_width'
-        for i, current_x in enumerate(values):
-            start_point = Point(x=current_x, y=min_y, z=0)
-            end_point = Point(x=current_x, y=max_y, z=0)
-
-            # Find intersections between the line and the boundary of the shape
-            intersections = findIntersectionsWithShape(shape_points, start_point, end_point)
+    # Sorted intersections of every line with the boundary of the shape
+    crossings = scanlineIntersections(outline, np.array(values), infill_axis)
 
-            # Sort intersections by y to determine segments within the shape
-            intersections.sort(key=lambda p: p.y)
+    for i, (current, line) in enumerate(zip(values, crossings)):
+        intersections = [toPoint(along, current) for along in line.tolist()]
 
-            # Use the even-odd rule to add segments inside the shape
-            for j in range(0, len(intersections) - 1, 2):
-                p1 = intersections[j]
-                p2 = intersections[j + 1]
-
-                # Create a segment between each pair of intersections
-                infill_commands.append({'shape': [p1, p2]})
+        # Use the even-odd rule to add segments inside the shape
+        for j in range(0, len(intersections) - 1, 2):
+            # Create a segment between each pair of intersections
+            infill_commands.append({'shape': [intersections[j], intersections[j + 1]]})
 
-                # Add a moveWithNoExtrusion command to move to the start of the next segment without extruding
-                if j + 2 < len(intersections):
-                    move_to_next_start = moveWithNoExtrusion(intersections[j + 2])
-                    infill_commands.append(move_to_next_start)
+            # Add a moveWithNoExtrusion command to move to the start of the next segment without extruding
+            if j + 2 < len(intersections):
+                infill_commands.append(moveWithNoExtrusion(intersections[j + 2]))
 
-            # If not the last line, add a moveWithNoExtrusion to the start of the next line
-            if i < len(values) - 1:
-                move_to_next_start = moveWithNoExtrusion(Point(x=values[i + 1], y=min_y, z=0))
-                infill_commands.append(move_to_next_start)
+        # If not the last line, add a moveWithNoExtrusion to the start of the next line
+        if i < len(values) - 1:
+            infill_commands.append(moveWithNoExtrusion(toPoint(lineStart, values[i + 1])))
 
     return infill_commands
 
 
 # Required supporting function for intersection calculations
-def findIntersectionsWithShape(shape_points: List[Point], start: Point, end: Point) -> List[Point]:
+def findIntersectionsWithShape(shape_points: Union[List[Point], PointArray], start: Point, end: Point) -> List[Point]:
     """
     Finds the intersections of a line segment with the boundary of a complex shape.
 
     Args:
-        shape_points (List[Point]): List of points representing the boundary of the shape.
+        shape_points (Union[List[Point], PointArray]): List of points representing the boundary of the shape.
         start (Point): Start point of the line segment.
         end (Point): End point of the line segment.
 
     Returns:
-        List[Point]: A list of intersection points between the line segment and the shape boundary.
+        List[Point]: A list of intersection points between the line segment and the shape boundary, in the order of the edges.
     """
-    intersections = []
-
-    # Iterate through each edge of the shape
-    for i in range(len(shape_points) - 1):
-        shape_start = shape_points[i]
-        shape_end = shape_points[i + 1]
-
-        intersection = findLineIntersection(start, end, shape_start, shape_end)
-        if intersection:
-            intersections.append(intersection)
-
-    return intersections
+    if isinstance(shape_points, PointArray):
+        # Only the edges near the segment are tested, with the edge index cached on the shape
+        crossings = edgeGrid(shape_points).intersectSegment(start, end)
+    else:
+        # All edges are tested at once, see segmentIntersections
+        crossings = segmentIntersections(start, end, shape_points)
+    return [Point(x=x, y=y, z=z) for x, y, z in crossings.points.tolist()]
 
 
 def findLineIntersection(start1: Point, end1: Point, start2: Point, end2: Point) -> Union[None, Point]:
@@ -0,0 +1,457 @@
+from math import cos, hypot, pi, sin, sqrt
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from design.directCommands.commands import moveWithNoExtrusion
+from design.geometricTools.containment import PolygonIndex
+from design.geometricTools.intersections import segmentIntersections
+from design.geometricTools.scanline import EdgeTable
+from design.geometricTools.spatialIndex import EdgeGrid
+from design.point import Point
+from design.pointArray import PointArray, toPointArray
+
+
+def groupSegments(crossings: List[np.ndarray]) -> List[List[tuple]]:
+    """
+    Splits the inside segments of consecutive scanlines into regions that can each be filled by one serpentine.
+
+    A segment continues the region of the segment on the previous scanline it overlaps, every region takes at
+    most one segment per scanline, so a region ends wherever the shape splits into branches or branches join.
+
+    Args:
+        crossings (List[np.ndarray]): ascending crossings of every scanline with the outline
+
+    Returns:
+        List[List[tuple]]: regions in order of their first scanline, each a list of (scanline, start, end) segments
+    """
+    regions = []
+    previous = []
+    for line, values in enumerate(crossings):
+        values = values.tolist()
+        current = []
+        used = set()
+        # Use the even-odd rule to find the segments inside the shape
+        for start, end in zip(values[0::2], values[1::2]):
+            if end <= start:
+                continue
+            region = next((region for previousStart, previousEnd, region in previous
+                           if region not in used and previousStart < end and start < previousEnd), None)
+            if region is None:
+                region = len(regions)
+                regions.append([])
+            used.add(region)
+            regions[region].append((line, start, end))
+            current.append((start, end, region))
+        previous = current
+    return regions
+
+
+def serpentineInfill(baseShape: dict[str, Union[List[Point], PointArray]], extrusion_width: float, angle: float = 0.0, layerIndex: int = 0,
+                     z: float = 0.0, maxLinkLength: Optional[float] = None) -> List[dict[str, Union[PointArray, Point]]]:
+    """
+    Generate a solid layer inside the enclosed base shape with infill lines at any angle, printed back and forth.
+
+    The lines are grouped into regions, every region is printed as one serpentine: each line starts where the previous
+    one ended and neighbouring lines are joined by an extruding link whenever the link is short and stays inside the
+    shape. Travel moves (and their retractions) are only needed between regions and where a link would leave the shape.
+    Regions are visited nearest first.
+
+    Args:
+        baseShape (dict[str, Union[List[Point], PointArray]]): The closed base shape represented as a dictionary with the key 'shape' and a list of Point objects or a PointArray.
+        extrusion_width (float): The width of the extrusion in millimeters, used as the spacing between infill lines.
+        angle (float): Direction of the infill lines in radians, 0 is along the x-axis. Default is 0.
+        layerIndex (int): Index of the layer, odd layers are rotated by a further 90 degrees so that neighbouring layers cross. Default is 0.
+        z (float): Height of the layer. Default is 0.
+        maxLinkLength (Optional[float]): Longest link printed between neighbouring lines. Default is three extrusion widths.
+
+    Returns:
+        List[Dict[str, Union[PointArray, Point]]]: moveWithNoExtrusion steps, each followed by a 'shape' step with a PointArray path.
+    """
+    if maxLinkLength is None:
+        maxLinkLength = 3 * extrusion_width
+
+    # Work in a frame rotated so that the infill lines run along its first axis
+    angle = angle + (layerIndex % 2) * pi / 2
+    cosA, sinA = cos(angle), sin(angle)
+    outline = toPointArray(baseShape['shape'])
+    rotated = PointArray(outline.x * cosA + outline.y * sinA, -outline.x * sinA + outline.y * cosA)
+
+    # Lines spaced according to 'extrusion_width', starting half a width outside the shape
+    low = float(rotated.y.min()) - (extrusion_width / 2)
+    high = float(rotated.y.max()) + (extrusion_width / 2)
+    positions = [low + i * extrusion_width for i in range(int((high - low) / extrusion_width) + 1)]
+    edges = EdgeTable(rotated, 'y')
+    regions = groupSegments(edges.crossings(np.array(positions)))
+
+    # Serpentine order inside every region: every other line is printed backwards
+    serpentines = []
+    for region in regions:
+        ends = []
+        for index, (line, start, end) in enumerate(region):
+            if index % 2:
+                start, end = end, start
+            ends.append(((start, positions[line]), (end, positions[line])))
+        serpentines.append(ends)
+
+    # Links between neighbouring lines of a region, all checked at once
+    links = [(ends[index][1], ends[index + 1][0]) for ends in serpentines for index in range(len(ends) - 1)]
+    printable = []
+    if links:
+        linkStarts = np.array([(u, v, 0.0) for (u, v), _ in links])
+        linkEnds = np.array([(u, v, 0.0) for _, (u, v) in links])
+
+        # A link leaves the shape if it crosses the outline anywhere but at its own end points
+        crossings = segmentIntersections(linkStarts, linkEnds, rotated)
+        crossing = (crossings.t > 1e-9) & (crossings.t < 1 - 1e-9)
+        leaves = np.zeros(len(links), dtype=bool)
+        leaves[crossings.segment[crossing]] = True
+
+        # ... or if it runs outside altogether, seen from its middle with the even-odd rule,
+        # links running along the outline itself are fine
+        middles = (linkStarts + linkEnds) / 2
+        middleCrossings = edges.crossings(middles[:, 1])
+        inside = np.zeros(len(links), dtype=bool)
+        for index, (values, u) in enumerate(zip(middleCrossings, middles[:, 0].tolist())):
+            before, through = np.searchsorted(values, u), np.searchsorted(values, u, side='right')
+            inside[index] = before % 2 == 1 or before != through
+
+        lengths = np.hypot(*(linkEnds - linkStarts)[:, :2].T)
+        printable = ((lengths <= maxLinkLength) & inside & ~leaves).tolist()
+
+    # Every region becomes a list of paths, a new path starts wherever a link cannot be printed
+    regionPaths = []
+    linkIndex = 0
+    for ends in serpentines:
+        paths = [[ends[0][0], ends[0][1]]]
+        for start, end in ends[1:]:
+            if not printable[linkIndex]:
+                paths.append([])
+            paths[-1].extend((start, end))
+            linkIndex += 1
+        regionPaths.append(paths)
+
+    # Visit the regions nearest first, entering a region from whichever end is closer
+    infill_commands = []
+    position = None
+    remaining = list(range(len(regionPaths)))
+    while remaining:
+        if position is None:
+            chosen, reverse = remaining[0], False
+        else:
+            distances = [(hypot(regionPaths[index][0][0][0] - position[0], regionPaths[index][0][0][1] - position[1]), index, False) for index in remaining]
+            distances += [(hypot(regionPaths[index][-1][-1][0] - position[0], regionPaths[index][-1][-1][1] - position[1]), index, True) for index in remaining]
+            _, chosen, reverse = min(distances)
+        remaining.remove(chosen)
+
+        paths = regionPaths[chosen]
+        if reverse:
+            paths = [path[::-1] for path in paths[::-1]]
+        for path in paths:
+            u, v = np.array(path).T
+            x, y = u * cosA - v * sinA, u * sinA + v * cosA
+            infill_commands.append(moveWithNoExtrusion(Point(x=float(x[0]), y=float(y[0]), z=z)))
+            infill_commands.append({'shape': PointArray(x, y, np.full(len(x), z))})
+        position = paths[-1][-1]
+
+    return infill_commands
+
+
+# Line spacing of the sparse patterns for a density of 1, in extrusion widths (see sparseInfill)
+SPARSE_PATTERNS = {'grid': 2.0, 'triangles': 3.0, 'honeycomb': 2 / sqrt(3), 'gyroid': 2.48}
+
+
+def linePolylines(low: np.ndarray, high: np.ndarray, spacing: float, angles: List[float]) -> List[np.ndarray]:
+    """
+    Parallel lines covering a rectangle, one family per angle. Every family has a line through the origin,
+    so that the lines of families 60 degrees apart meet in common points.
+
+    Returns:
+        List[np.ndarray]: the lines as (2, 2) arrays, starting and ending outside the rectangle
+    """
+    corners = np.array([[low[0], low[1]], [high[0], low[1]], [high[0], high[1]], [low[0], high[1]]])
+    lines = []
+    for angle in angles:
+        direction = np.array([cos(angle), sin(angle)])
+        normal = np.array([-direction[1], direction[0]])
+        across, along = corners @ normal, corners @ direction
+        offsets = np.arange(np.floor(across.min() / spacing), np.ceil(across.max() / spacing) + 1) * spacing
+        first, last = along.min() - spacing, along.max() + spacing
+        starts = offsets[:, None] * normal + first * direction
+        ends = offsets[:, None] * normal + last * direction
+        lines.extend(np.stack((starts, ends), axis=1))
+    return lines
+
+
+def honeycombPolylines(low: np.ndarray, high: np.ndarray, side: float) -> List[np.ndarray]:
+    """
+    Hexagons of the given side covering a rectangle, every edge once.
+
+    Every other row of hexagons is outlined by a trapezoidal wave, whose flat parts are the flats of the rows above
+    and below it. The rising and falling sides of the rows in between meet only those flats, so they are added as
+    single segments: as every vertex joins three edges, one path has to end at each of them anyway.
+
+    Returns:
+        List[np.ndarray]: (N, 2) polylines, the waves starting and ending outside the rectangle
+    """
+    rise = side * sqrt(3) / 2
+    period = 3 * side
+    # One period of the wave: a low flat, a rising side, a high flat and a falling side
+    waveX = np.array([0.0, side, 1.5 * side, 2.5 * side])
+    waveY = np.array([0.0, 0.0, rise, rise])
+    periods = np.arange(np.floor(low[0] / period) - 1, np.ceil(high[0] / period) + 1)
+
+    polylines = []
+    firstRow, lastRow = int(np.floor(low[1] / rise)) - 1, int(np.ceil(high[1] / rise)) + 1
+    for row in range(firstRow - firstRow % 2, lastRow + 1, 2):
+        x = (periods[:, None] * period + waveX).ravel()
+        y = np.tile(waveY, len(periods)) + row * rise
+        polylines.append(np.column_stack((x, y)))
+
+        # The sides of the next row, shifted by half a period
+        left = periods * period + 1.5 * side
+        bottom, top = (row + 1) * rise, (row + 2) * rise
+        for x0, x1 in ((left + side, left + 1.5 * side), (left + 3 * side, left + 2.5 * side)):
+            polylines.extend(np.stack((np.column_stack((x0, np.full(len(x0), bottom))),
+                                       np.column_stack((x1, np.full(len(x1), top)))), axis=1))
+    return polylines
+
+
+def gyroidBranches(u: np.ndarray, w: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns: the two solutions y = phi +- acos(-sin(w)cos(u) / R) of the gyroid cut at every u, see gyroidPolylines
+    """
+    a, b = np.sin(u), cos(w)
+    radius = np.maximum(np.hypot(a, b), 1e-12)
+    phase = np.unwrap(np.arctan2(b, a))
+    # Only rounding errors are clipped, u is kept where the equation has solutions
+    offset = np.arccos(np.clip(-sin(w) * np.cos(u) / radius, -1, 1))
+    return phase + offset, phase - offset
+
+
+def gyroidPolylines(low: np.ndarray, high: np.ndarray, period: float, z: float, samples: int = 32) -> List[np.ndarray]:
+    """
+    Curves where the plane at height z cuts the gyroid sin(x)cos(y) + sin(y)cos(z) + sin(z)cos(x) = 0,
+    scaled to the given period, covering a rectangle.
+
+    For every x the equation reads R cos(y - phi) = -sin(z)cos(x) with R cos(phi) = sin(x) and R sin(phi) = cos(z),
+    so the curves are y = phi +- acos(-sin(z)cos(x) / R) + 2 pi k, sampled at samples points per period.
+    Where cos(z)^2 < 1/2 the equation has no solution around x = m pi, there the two branches of every stretch
+    of x in between meet, at the turning points of the curves, and are joined into one polyline.
+
+    Returns:
+        List[np.ndarray]: (N, 2) polylines, starting and ending outside the rectangle
+    """
+    scale = 2 * pi / period
+    w = z * scale
+    first, last = np.floor(low[0] / period) - 1, np.ceil(high[0] / period) + 1
+    # Solutions exist where cos(x)^2 (2 - cos(z)^2) <= 1 + cos(z)^2
+    limit = (1 + cos(w) ** 2) / (2 - cos(w) ** 2)
+
+    def copies(u: np.ndarray, y: np.ndarray, step: float) -> List[np.ndarray]:
+        # The curve shifted by 2 pi k along y, as far as it reaches into the rectangle
+        firstK = np.floor((low[1] * scale - y.max()) / step) - 1
+        lastK = np.ceil((high[1] * scale - y.min()) / step) + 1
+        return [np.column_stack((u, y + step * k)) / scale for k in np.arange(firstK, lastK + 1)]
+
+    curves = []
+    if limit >= 1:
+        u = np.arange(first, last, 1 / samples) * 2 * pi
+        for branch in gyroidBranches(u, w):
+            curves.extend(copies(u, branch, 2 * pi))
+        return curves
+
+    edge = np.arccos(sqrt(limit))
+    count = max(int(np.ceil(samples * (pi - 2 * edge) / (2 * pi))), 2)
+    # Denser towards the turning points, where the curves run along y
+    along = (1 - np.cos(np.linspace(0, pi, count + 1))) / 2
+    for m in np.arange(2 * first - 1, 2 * last + 1):
+        u = m * pi + edge + along * (pi - 2 * edge)
+        plus, minus = gyroidBranches(u, w)
+        # At a turning point the branches are the same y, or 2 pi apart if it is the top of one and the bottom of the next
+        minus = minus + 2 * pi * np.round((plus[-1] - minus[-1]) / (2 * pi))
+        drift = 2 * pi * np.round((plus[0] - minus[0]) / (2 * pi))
+        loop = np.concatenate((plus, minus[-2::-1]))
+        loopU = np.concatenate((u, u[-2::-1]))
+        if drift == 0:
+            # The branches close into a loop
+            curves.extend(copies(loopU, loop, 2 * pi))
+        else:
+            # Every loop ends where the next one, shifted by -drift, starts: the stretch is a single zig-zag along y,
+            # started beyond the rectangle on the side it moves away from
+            turns = int(np.ceil(((high[1] - low[1]) * scale + np.ptp(loop)) / (2 * pi))) + 4
+            if drift < 0:
+                start = 2 * pi * (np.floor((low[1] * scale - loop.max()) / (2 * pi)) - 1)
+            else:
+                start = 2 * pi * (np.ceil((high[1] * scale - loop.min()) / (2 * pi)) + 1)
+            zigzagU = np.concatenate([loopU] + [loopU[1:]] * (turns - 1))
+            zigzagY = np.concatenate([loop + start] + [loop[1:] + start - drift * k for k in range(1, turns)])
+            curves.append(np.column_stack((zigzagU, zigzagY)) / scale)
+    return curves
+
+
+def clipPolylines(polylines: List[np.ndarray], outline: np.ndarray) -> List[np.ndarray]:
+    """
+    Cuts polylines into the pieces inside a closed outline (even-odd rule). Polylines starting inside the outline
+    are found with a PolygonIndex, their first piece starts at their first vertex.
+
+    All segments of all polylines are tested against the edges near them at once. An edge crosses a segment if its end
+    points lie on different sides of the segment's line and the segment's end points lie on different sides of the
+    edge's line, a point on a line counting as its left side. As every vertex is classified once per line, a
+    polyline passing through a vertex of the outline, or with a vertex on an edge, crosses it once and one only
+    touching it crosses it twice or not at all.
+
+    Args:
+        polylines (List[np.ndarray]): (N, 2) polylines
+        outline (np.ndarray): (M, 2) vertices of the closed outline, the closing edge is added if missing
+
+    Returns:
+        List[np.ndarray]: the pieces inside the outline, in order along the polylines
+    """
+    if not np.array_equal(outline[0], outline[-1]):
+        outline = np.vstack((outline, outline[:1]))
+    edgeStarts, edgeEnds = outline[:-1], outline[1:]
+
+    vertices = np.concatenate(polylines)
+    lastVertex = np.cumsum([len(polyline) for polyline in polylines]) - 1
+    segmentStart = np.setdiff1d(np.arange(len(vertices) - 1), lastVertex)
+    starts, directions = vertices[segmentStart], vertices[segmentStart + 1] - vertices[segmentStart]
+
+    # Only segments and edges sharing a cell of an EdgeGrid over both can cross
+    edgeCount = len(edgeStarts)
+    grid = EdgeGrid(np.vstack((edgeStarts, starts)), np.vstack((edgeEnds, starts + directions)))
+    first, second = grid.candidatePairs()
+    mixed = (first < edgeCount) & (second >= edgeCount)
+    edges, segment = first[mixed], second[mixed] - edgeCount
+
+    start, direction = starts[segment], directions[segment]
+    toStart, toEnd = edgeStarts[edges] - start, edgeEnds[edges] - start
+    sideStart = direction[:, 0] * toStart[:, 1] - direction[:, 1] * toStart[:, 0]
+    sideEnd = direction[:, 0] * toEnd[:, 1] - direction[:, 1] * toEnd[:, 0]
+    crosses = (sideStart >= 0) != (sideEnd >= 0)
+    segment, edges, start, direction = segment[crosses], edges[crosses], start[crosses], direction[crosses]
+    sideStart, sideEnd = sideStart[crosses], sideEnd[crosses]
+
+    edgeStart, edgeDirection = edgeStarts[edges], edgeEnds[edges] - edgeStarts[edges]
+    fromEdge, toEdge = start - edgeStart, start + direction - edgeStart
+    segmentSideStart = edgeDirection[:, 0] * fromEdge[:, 1] - edgeDirection[:, 1] * fromEdge[:, 0]
+    segmentSideEnd = edgeDirection[:, 0] * toEdge[:, 1] - edgeDirection[:, 1] * toEdge[:, 0]
+    keep = (segmentSideStart >= 0) != (segmentSideEnd >= 0)
+    segment, sideStart, sideEnd = segment[keep], sideStart[keep], sideEnd[keep]
+    edgeStart, edgeDirection, start, direction = edgeStart[keep], edgeDirection[keep], start[keep], direction[keep]
+
+    # Crossing parameter along the segment, from the point where the edge meets the segment's line
+    share = sideStart / (sideStart - sideEnd)
+    point = edgeStart + share[:, None] * edgeDirection
+    t = np.clip(((point - start) * direction).sum(axis=1) / (direction ** 2).sum(axis=1), 0, 1)
+
+    vertexIndex = segmentStart[segment]
+    points = vertices[vertexIndex] + t[:, None] * (vertices[vertexIndex + 1] - vertices[vertexIndex])
+
+    # A polyline starting inside gets a crossing at its first vertex, one ending inside at its last vertex
+    firstVertex = np.r_[0, lastVertex[:-1] + 1]
+    startsInside = PolygonIndex.fromLoops([outline]).contains(vertices[firstVertex]) & (lastVertex > firstVertex)
+    crossingCount = np.bincount(np.searchsorted(lastVertex, vertexIndex), minlength=len(polylines))
+    endsInside = startsInside ^ (crossingCount % 2 == 1)
+    vertexIndex = np.concatenate((vertexIndex, firstVertex[startsInside], lastVertex[endsInside] - 1))
+    t = np.concatenate((t, np.zeros(startsInside.sum()), np.ones(endsInside.sum())))
+    points = np.vstack((points, vertices[firstVertex[startsInside]], vertices[lastVertex[endsInside]]))
+
+    # Ordered along the polylines, the crossings pair up into pieces from entering to leaving
+    order = np.lexsort((t, vertexIndex))
+    vertexIndex, t, points = vertexIndex[order], t[order], points[order]
+
+    pieces = []
+    for enter, leave in zip(range(0, len(t) - 1, 2), range(1, len(t), 2)):
+        inner = vertices[vertexIndex[enter] + 1:vertexIndex[leave] + 1]
+        piece = np.vstack((points[enter], inner, points[leave]))
+        # Crossings at a vertex repeat it, and a polyline only touching the outline leaves a single point
+        piece = piece[np.r_[True, np.any(piece[1:] != piece[:-1], axis=1)]]
+        if len(piece) > 1:
+            pieces.append(piece)
+    return pieces
+
+
+def orderPaths(paths: List[np.ndarray], position: Optional[np.ndarray] = None) -> List[np.ndarray]:
+    """
+    Orders paths nearest first, every path entered from whichever end is closer to where the previous one ended.
+
+    Returns:
+        List[np.ndarray]: the paths, some of them reversed
+    """
+    if not paths:
+        return []
+    starts = np.array([path[0] for path in paths])
+    ends = np.array([path[-1] for path in paths])
+    remaining = np.ones(len(paths), dtype=bool)
+    position = starts[0] if position is None else position
+
+    ordered = []
+    for _ in range(len(paths)):
+        toStart = np.where(remaining, np.hypot(*(starts - position).T), np.inf)
+        toEnd = np.where(remaining, np.hypot(*(ends - position).T), np.inf)
+        chosen, reverse = (int(np.argmin(toStart)), False) if toStart.min() <= toEnd.min() else (int(np.argmin(toEnd)), True)
+        remaining[chosen] = False
+        path = paths[chosen][::-1] if reverse else paths[chosen]
+        ordered.append(path)
+        position = path[-1]
+    return ordered
+
+
+def sparseInfill(baseShape: dict[str, Union[List[Point], PointArray]], extrusion_width: float, density: float, pattern: str = 'grid',
+                 z: float = 0.0, angle: float = 0.0) -> List[dict[str, Union[PointArray, Point]]]:
+    """
+    Generate a sparse infill layer inside the enclosed base shape.
+
+    The pattern is laid out as polylines over the bounding box of the shape, all of them cut by the shape at once
+    (see clipPolylines), and the pieces inside are printed nearest first. The patterns are anchored to the origin,
+    so that the same pattern on consecutive layers stacks into walls:
+
+    - 'grid': lines along both axes
+    - 'triangles': lines in three directions 60 degrees apart, meeting in common points
+    - 'honeycomb': regular hexagons, rows of trapezoidal waves and the sides between them
+    - 'gyroid': the cut of a gyroid at the height z, changing from layer to layer
+
+    The spacing is chosen so that about the given fraction of the area is extruded.
+
+    Args:
+        baseShape (dict[str, Union[List[Point], PointArray]]): The closed base shape represented as a dictionary with the key 'shape' and a list of Point objects or a PointArray.
+        extrusion_width (float): The width of the extrusion in millimeters.
+        density (float): Fraction of the area to fill, between 0 (exclusive) and 1.
+        pattern (str): One of 'grid', 'triangles', 'honeycomb' and 'gyroid'. Default is 'grid'.
+        z (float): Height of the layer, also selecting the cut of the gyroid. Default is 0.
+        angle (float): Rotation of the pattern in radians. Default is 0.
+
+    Returns:
+        List[Dict[str, Union[PointArray, Point]]]: moveWithNoExtrusion steps, each followed by a 'shape' step with a PointArray path.
+
+    Raises:
+        ValueError: If the pattern is unknown or the density is not in (0, 1].
+    """
+    if pattern not in SPARSE_PATTERNS:
+        raise ValueError(f"Unknown infill pattern: {pattern}. Expected one of {', '.join(SPARSE_PATTERNS)}.")
+    if not 0 < density <= 1:
+        raise ValueError("The density must be greater than 0 and at most 1.")
+    spacing = SPARSE_PATTERNS[pattern] * extrusion_width / density
+
+    # Work in a frame rotated by the pattern angle
+    cosA, sinA = cos(angle), sin(angle)
+    outline = toPointArray(baseShape['shape'])
+    rotated = np.column_stack((outline.x * cosA + outline.y * sinA, -outline.x * sinA + outline.y * cosA))
+    low, high = rotated.min(axis=0), rotated.max(axis=0)
+
+    if pattern == 'grid':
+        polylines = linePolylines(low, high, spacing, [0.0, pi / 2])
+    elif pattern == 'triangles':
+        polylines = linePolylines(low, high, spacing, [0.0, pi / 3, 2 * pi / 3])
+    elif pattern == 'honeycomb':
+        polylines = honeycombPolylines(low, high, spacing)
+    else:
+        polylines = gyroidPolylines(low, high, spacing, z)
+
+    infill_commands = []
+    for path in orderPaths(clipPolylines(polylines, rotated)):
+        x, y = path[:, 0] * cosA - path[:, 1] * sinA, path[:, 0] * sinA + path[:, 1] * cosA
+        infill_commands.append(moveWithNoExtrusion(Point(x=float(x[0]), y=float(y[0]), z=z)))
+        infill_commands.append({'shape': PointArray(x, y, np.full(len(x), z))})
+    return infill_commands
@@ -0,0 +1,106 @@
+from typing import List, NamedTuple, Union
+
+import numpy as np
+
+from design.point import Point
+from design.pointArray import PointArray, PointView, toPointArray
+
+
+class Intersections(NamedTuple):
+    """
+    Crossings found by segmentIntersections, one entry per crossing, ordered by query segment and then by edge.
+
+    Attributes:
+        segment (np.ndarray): index of the query segment
+        edge (np.ndarray): index of the polygon edge, edge i runs from vertex i to vertex i + 1
+        t (np.ndarray): parameter of the crossing along the query segment, 0 at its start and 1 at its end
+        s (np.ndarray): parameter of the crossing along the edge
+        points (np.ndarray): (K, 3) coordinates of the crossings, z interpolated along the query segment
+    """
+    segment: np.ndarray
+    edge: np.ndarray
+    t: np.ndarray
+    s: np.ndarray
+    points: np.ndarray
+
+
+def asCoordinates(points: Union[Point, List[Point], PointArray, np.ndarray]) -> np.ndarray:
+    """
+    Returns: points given as Points, a PointArray or an array of x, y [, z] as an (N, 3) float array
+    """
+    if isinstance(points, np.ndarray):
+        points = np.asarray(points, dtype=float)
+        points = points.reshape(-1, points.shape[-1])
+        if points.shape[1] == 2:
+            return np.column_stack((points, np.zeros(len(points))))
+        return points[:, :3]
+    if isinstance(points, (Point, PointView)):
+        return np.array([[points.x or 0.0, points.y or 0.0, points.z or 0.0]])
+    return toPointArray(points).xyz
+
+
+def edgeIntersections(starts: np.ndarray, ends: np.ndarray, edgeStarts: np.ndarray, edgeEnds: np.ndarray, chunkSize: int = 1 << 20) -> Intersections:
+    """
+    Intersects query segments with a set of edges at once, in the xy plane, see segmentIntersections.
+
+    Args:
+        starts (np.ndarray): (M, 3) start points of the query segments
+        ends (np.ndarray): (M, 3) end points of the query segments
+        edgeStarts (np.ndarray): (N, 2 or 3) first vertex of every edge
+        edgeEnds (np.ndarray): (N, 2 or 3) second vertex of every edge
+        chunkSize (int): approximate number of segment-edge pairs computed at once
+
+    Returns:
+        Intersections: indices, parameters and coordinates of all crossings, edge indices into edgeStarts
+    """
+    edgeStarts = edgeStarts[:, :2]
+    edgeDirections = edgeEnds[:, :2] - edgeStarts
+    dx2, dy2 = edgeDirections[:, 0], edgeDirections[:, 1]
+
+    found = []
+    step = max(1, chunkSize // max(1, len(edgeStarts)))
+    for first in range(0, len(starts), step):
+        start, end = starts[first:first + step], ends[first:first + step]
+        dx1 = (end[:, 0] - start[:, 0])[:, None]
+        dy1 = (end[:, 1] - start[:, 1])[:, None]
+        offsetX = start[:, 0:1] - edgeStarts[:, 0]
+        offsetY = start[:, 1:2] - edgeStarts[:, 1]
+
+        # Same determinants as findLineIntersection, for all pairs of the chunk
+        determinant = -dx2 * dy1 + dx1 * dy2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = (-dy1 * offsetX + dx1 * offsetY) / determinant
+            t = (dx2 * offsetY - dy2 * offsetX) / determinant
+
+        hit = (determinant != 0) & (s >= 0) & (s <= 1) & (t >= 0) & (t <= 1)
+        segment, edge = np.nonzero(hit)
+        t, s = t[segment, edge], s[segment, edge]
+        origin, direction = start[segment], end[segment] - start[segment]
+        found.append((segment + first, edge, t, s, origin + t[:, None] * direction))
+
+    if not found:
+        return Intersections(np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0), np.empty(0), np.empty((0, 3)))
+    return Intersections(*(np.concatenate(parts) for parts in zip(*found)))
+
+
+def segmentIntersections(starts: Union[Point, List[Point], PointArray, np.ndarray], ends: Union[Point, List[Point], PointArray, np.ndarray],
+                         polygon: Union[List[Point], PointArray, np.ndarray], chunkSize: int = 1 << 20) -> Intersections:
+    """
+    Intersects query segments with all edges of a polygon at once, in the xy plane.
+
+    Every query segment is tested against every edge in one broadcast operation, the work is split into
+    chunks of query segments so that no more than about chunkSize segment-edge pairs are held at once.
+    Crossings at segment or edge end points count (0 <= t, s <= 1). Parallel segments and edges, including
+    overlapping ones, have no crossing, as in findLineIntersection.
+
+    Args:
+        starts (Union[Point, List[Point], PointArray, np.ndarray]): start points of the query segments, a single Point for one segment
+        ends (Union[Point, List[Point], PointArray, np.ndarray]): end points of the query segments
+        polygon (Union[List[Point], PointArray, np.ndarray]): the polygon, consecutive points forming its edges
+        chunkSize (int): approximate number of segment-edge pairs computed at once
+
+    Returns:
+        Intersections: indices, parameters and coordinates of all crossings
+    """
+    vertices = asCoordinates(polygon)
+    return edgeIntersections(asCoordinates(starts), asCoordinates(ends), vertices[:-1], vertices[1:], chunkSize)
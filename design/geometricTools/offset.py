@@ -0,0 +1,212 @@
+from typing import List, Union
+
+import numpy as np
+
+from design.directCommands.commands import moveWithNoExtrusion
+from design.geometricTools.spatialIndex import EdgeGrid
+from design.point import Point
+from design.pointArray import PointArray, toPointArray
+
+
+def signedArea(loop: np.ndarray) -> float:
+    """
+    Returns: area enclosed by a loop of (N, 2) vertices without a closing copy, positive if counterclockwise
+    """
+    x, y = loop[:, 0], loop[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def openLoop(points: PointArray) -> np.ndarray:
+    """
+    Returns: (N, 2) xy vertices of a closed shape without its closing point and without repeated vertices
+    """
+    xy = points.data[:2].T
+    keep = np.any(xy != np.roll(xy, 1, axis=0), axis=1)
+    keep[0] = True
+    xy = xy[keep]
+    if len(xy) > 1 and np.array_equal(xy[0], xy[-1]):
+        xy = xy[:-1]
+    return xy
+
+
+def rawOffset(loop: np.ndarray, distance: float, miterLimit: float = 2.0) -> np.ndarray:
+    """
+    Moves every edge of a loop sideways by distance and joins neighbouring edges where their offsets meet.
+    Corners whose join would reach further than miterLimit * distance are cut off (beveled) instead.
+    The result may intersect itself, see splitLoops.
+
+    Args:
+        loop (np.ndarray): (N, 2) vertices of a counterclockwise loop without a closing copy
+        distance (float): offset, positive outwards and negative inwards
+        miterLimit (float): longest allowed join relative to the distance
+
+    Returns:
+        np.ndarray: (M, 2) vertices of the offset loop
+    """
+    directions = np.roll(loop, -1, axis=0) - loop
+    directions /= np.hypot(*directions.T)[:, None]
+    # Outward normals of the edges leaving and entering every vertex
+    normals = np.column_stack((directions[:, 1], -directions[:, 0]))
+    previous = np.roll(normals, 1, axis=0)
+
+    cosine = (previous * normals).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miter = (previous + normals) / (1 + cosine)[:, None]
+    beveled = ~(2 / np.maximum(1 + cosine, 1e-12) <= miterLimit ** 2)
+
+    joins = np.empty((len(loop), 2, 2))
+    joins[:, 0] = loop + distance * np.where(beveled[:, None], previous, miter)
+    joins[:, 1] = loop + distance * normals
+    keep = np.column_stack((np.ones(len(loop), dtype=bool), beveled))
+    return joins[keep]
+
+
+def splitLoops(loop: np.ndarray) -> List[np.ndarray]:
+    """
+    Splits a loop at the points where it crosses itself into loops that do not.
+
+    The crossings are found with an EdgeGrid, so only edges sharing a grid cell are tested against each other.
+    Walking along the loop and switching to the other branch at every crossing visits every piece of the loop
+    exactly once and closes the pieces into simple loops.
+
+    Args:
+        loop (np.ndarray): (N, 2) vertices without a closing copy
+
+    Returns:
+        List[np.ndarray]: the simple loops, each as (M, 2) vertices without a closing copy
+    """
+    count = len(loop)
+    ends = np.roll(loop, -1, axis=0)
+    i, j = EdgeGrid(loop, ends).candidatePairs() if count > 3 else (np.empty(0, dtype=int), np.empty(0, dtype=int))
+
+    # Neighbouring edges share a vertex, it is not a crossing
+    separate = (j - i > 1) & ~((i == 0) & (j == count - 1))
+    i, j = i[separate], j[separate]
+
+    d1 = ends[i] - loop[i]
+    d2 = ends[j] - loop[j]
+    offset = loop[j] - loop[i]
+    determinant = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (offset[:, 0] * d2[:, 1] - offset[:, 1] * d2[:, 0]) / determinant
+        s = (offset[:, 0] * d1[:, 1] - offset[:, 1] * d1[:, 0]) / determinant
+    # Half open parameters, a crossing through a vertex belongs to one of its edges only
+    hit = (determinant != 0) & (t >= 0) & (t < 1) & (s >= 0) & (s < 1)
+    i, j, t, s = i[hit], j[hit], t[hit], s[hit]
+    if len(t) == 0:
+        return [loop]
+    crossings = loop[i] + t[:, None] * d1[hit]
+
+    # Every vertex and both visits of every crossing, in order along the loop
+    crossingCount = len(t)
+    edge = np.concatenate((np.arange(count), i, j))
+    parameter = np.concatenate((np.full(count, -1.0), t, s))
+    crossing = np.concatenate((np.full(count, -1), np.arange(crossingCount), np.arange(crossingCount)))
+    order = np.lexsort((parameter, edge))
+    coordinates = np.concatenate((loop, crossings, crossings))[order]
+    crossing = crossing[order]
+
+    # At a crossing the walk continues after the other visit of the same crossing
+    position = np.arange(len(order))
+    twin = position.copy()
+    visits = np.flatnonzero(crossing >= 0)
+    byCrossing = visits[np.argsort(crossing[visits], kind='stable')].reshape(-1, 2)
+    twin[byCrossing[:, 0]] = byCrossing[:, 1]
+    twin[byCrossing[:, 1]] = byCrossing[:, 0]
+    following = (twin + 1) % len(order)
+
+    loops = []
+    visited = np.zeros(len(order), dtype=bool)
+    for start in range(len(order)):
+        if visited[start]:
+            continue
+        members = []
+        current = start
+        while not visited[current]:
+            visited[current] = True
+            members.append(current)
+            current = following[current]
+        loops.append(coordinates[members])
+    return loops
+
+
+def distanceToEdges(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Returns: distance of every point to the nearest of the edges, all pairs computed at once
+    """
+    directions = ends - starts
+    lengths = np.maximum((directions ** 2).sum(axis=1), 1e-300)
+    relative = points[:, None, :] - starts[None, :, :]
+    t = np.clip((relative * directions).sum(axis=2) / lengths, 0, 1)
+    nearest = starts + t[:, :, None] * directions
+    return np.sqrt(((points[:, None, :] - nearest) ** 2).sum(axis=2)).min(axis=1)
+
+
+def offsetPolygon(baseShape: Union[dict, List[Point], PointArray], distance: float, miterLimit: float = 2.0) -> List[PointArray]:
+    """
+    Offsets a closed shape by distance, outwards for positive and inwards for negative values.
+
+    A shape that crosses itself is split into simple loops first and every loop is offset on its own. The offset
+    edges are computed for all vertices at once, the loops they form are split where they cross themselves and only
+    pieces that keep the orientation of the loop and lie the full distance away from it are kept. An inward offset
+    can therefore split into several loops, or vanish where the shape is thinner than twice the distance.
+
+    Args:
+        baseShape (Union[dict, List[Point], PointArray]): The closed shape, a dictionary with key 'shape', a list of Points or a PointArray.
+        distance (float): The offset in millimeters, positive outwards and negative inwards.
+        miterLimit (float): Corners whose join would reach further than miterLimit * distance are beveled. Default is 2.
+
+    Returns:
+        List[PointArray]: The offset loops, each closed by a copy of its first point, at the height of the shape's first point.
+    """
+    outline = toPointArray(baseShape)
+    z = float(outline.z[0]) if len(outline) else 0.0
+
+    result = []
+    for loop in splitLoops(openLoop(outline)) if len(outline) > 2 else []:
+        area = signedArea(loop)
+        if len(loop) < 3 or abs(area) < 1e-12:
+            continue
+        orientation = 1.0 if area > 0 else -1.0
+        if orientation < 0:
+            loop = loop[::-1]
+
+        source = (loop, np.roll(loop, -1, axis=0))
+        for piece in splitLoops(rawOffset(loop, distance, miterLimit)):
+            if len(piece) < 3 or signedArea(piece) <= 1e-12:
+                continue
+            # Pieces cut off by a self-crossing come closer to the loop than the offset distance
+            samples = piece[np.linspace(0, len(piece) - 1, min(len(piece), 16)).astype(int)]
+            clearance = distanceToEdges(samples, *source)
+            if np.mean(clearance >= abs(distance) * (1 - 1e-6) - 1e-9) < 0.5:
+                continue
+            if orientation < 0:
+                piece = piece[::-1]
+            closed = np.vstack((piece, piece[:1]))
+            result.append(PointArray(closed[:, 0], closed[:, 1], np.full(len(closed), z)))
+    return result
+
+
+def offsetLoops(baseShape: Union[dict, List[Point], PointArray], extrusion_width: float, count: int, inward: bool = True) -> List[dict[str, Union[PointArray, Point]]]:
+    """
+    Generates count perimeters along a closed shape, each one extrusion width further from it.
+
+    The first perimeter is centered half an extrusion width from the shape, so that its outer side follows the shape.
+
+    Args:
+        baseShape (Union[dict, List[Point], PointArray]): The closed shape, a dictionary with key 'shape', a list of Points or a PointArray.
+        extrusion_width (float): The width of the extrusion in millimeters, used as the spacing between perimeters.
+        count (int): Number of perimeters.
+        inward (bool): Whether the perimeters go inside (walls) or outside (brims) the shape. Default is True.
+
+    Returns:
+        List[Dict[str, Union[PointArray, Point]]]: moveWithNoExtrusion steps, each followed by a 'shape' step with one closed loop,
+                                                    perimeters nearest to the shape first.
+    """
+    sign = -1.0 if inward else 1.0
+    steps = []
+    for index in range(count):
+        for loop in offsetPolygon(baseShape, sign * (index + 0.5) * extrusion_width):
+            steps.append(moveWithNoExtrusion(Point(x=float(loop.x[0]), y=float(loop.y[0]), z=float(loop.z[0]))))
+            steps.append({'shape': loop})
+    return steps
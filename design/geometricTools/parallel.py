@@ -0,0 +1,185 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from design.point import Point
+from design.pointArray import PointArray, PointView, toPointArray
+
+
+class SharedSlice(NamedTuple):
+    """
+    Stands in for a PointArray (or a list of Points) whose data was written to a shared memory block.
+
+    Attributes:
+        start (int): first column of the data in the block
+        stop (int): column after the last one
+        asPoints (bool): whether the value was a list of Points
+        channels (Dict[str, np.ndarray]): per-vertex channels of the PointArray, sent along with the job
+    """
+    start: int
+    stop: int
+    asPoints: bool
+    channels: Dict[str, np.ndarray]
+
+
+def writeShared(arrays: List[PointArray]) -> Tuple[Optional[shared_memory.SharedMemory], List[Tuple[int, int]]]:
+    """
+    Copies the data of PointArrays one after another into a new shared memory block.
+
+    Returns:
+        Tuple[Optional[SharedMemory], List[Tuple[int, int]]]: the block, None if there is no data, and the column range of every array
+    """
+    total = sum(len(array) for array in arrays)
+    if total == 0:
+        return None, [(0, 0)] * len(arrays)
+    block = shared_memory.SharedMemory(create=True, size=4 * total * np.dtype(float).itemsize)
+    data = np.ndarray((4, total), dtype=float, buffer=block.buf)
+    ranges = []
+    start = 0
+    for array in arrays:
+        data[:, start:start + len(array)] = array.data
+        ranges.append((start, start + len(array)))
+        start += len(array)
+    del data
+    return block, ranges
+
+
+def readShared(block: Optional[shared_memory.SharedMemory], total: int, start: int, stop: int, channels: Dict[str, np.ndarray]) -> PointArray:
+    """
+    Returns: a PointArray with its own copy of the columns start to stop of a block written by writeShared
+    """
+    points = PointArray.__new__(PointArray)
+    if block is None:
+        points.data = np.empty((4, 0))
+    else:
+        points.data = np.ndarray((4, total), dtype=float, buffer=block.buf)[:, start:stop].copy()
+    points.channels = channels
+    return points
+
+
+def isPointList(value: Any) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(item, (Point, PointView)) for item in value)
+
+
+def packSteps(steps: List[dict]) -> Tuple[Optional[str], int, List[dict]]:
+    """
+    Moves the point data of a layer's steps into shared memory, leaving SharedSlice markers in the steps.
+    Other step values (single Points, patterns, ...) stay in the steps and are pickled as usual.
+
+    Returns:
+        Tuple[Optional[str], int, List[dict]]: name of the block, number of columns in it and the marked steps
+    """
+    marked = [dict(step) for step in steps]
+    found = [(step, key, value) for step in marked for key, value in step.items()
+             if isinstance(value, PointArray) or isPointList(value)]
+    arrays = [toPointArray(value) for _, _, value in found]
+
+    block, ranges = writeShared(arrays)
+    for (step, key, value), points, (start, stop) in zip(found, arrays, ranges):
+        step[key] = SharedSlice(start, stop, isinstance(value, list), points.channels)
+    if block is None:
+        return None, 0, marked
+    name = block.name
+    block.close()
+    return name, ranges[-1][1], marked
+
+
+def unpackSteps(name: Optional[str], total: int, marked: List[dict]) -> List[dict]:
+    """
+    Rebuilds the steps packed by packSteps and frees their shared memory block.
+    """
+    block = shared_memory.SharedMemory(name=name) if name is not None else None
+    try:
+        steps = []
+        for step in marked:
+            for key, value in step.items():
+                if isinstance(value, SharedSlice):
+                    points = readShared(block, total, value.start, value.stop, value.channels)
+                    step[key] = points.toPoints() if value.asPoints else points
+            steps.append(step)
+        return steps
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+
+
+def runLayer(function: Callable, name: Optional[str], total: int, start: int, stop: int, channels: Dict[str, np.ndarray],
+             args: tuple, kwargs: dict) -> Tuple[Optional[str], int, List[dict]]:
+    """
+    Runs one layer in a worker process: reads its shape from the shared input block, calls the function on
+    {'shape': PointArray} and returns the resulting steps packed into a new shared memory block.
+    """
+    block = shared_memory.SharedMemory(name=name) if name is not None else None
+    try:
+        shape = readShared(block, total, start, stop, channels)
+    finally:
+        if block is not None:
+            block.close()
+    return packSteps(list(function({'shape': shape}, *args, **kwargs)))
+
+
+def parallelLayers(function: Callable, shapes: Sequence[Union[dict, List[Point], PointArray]], *args, layerArguments: Optional[Sequence[dict]] = None,
+                   workers: Optional[int] = None, **kwargs) -> List[dict]:
+    """
+    Runs a per-layer function, such as solidLayerInfill, serpentineInfill or offsetLoops, on every layer's shape
+    in a pool of worker processes and joins the resulting steps in layer order.
+
+    The shapes of all layers are written to one shared memory block that the workers read from, and every worker
+    returns the point data of its steps in a shared memory block of its own, so only small step markers are
+    pickled between the processes. The function is called as function({'shape': PointArray}, *args, **kwargs,
+    **layerArguments[i]) and must be defined at module level so that the workers can import it.
+
+    Args:
+        function (Callable): the per-layer function, returning a list (or any iterable) of steps
+        shapes (Sequence[Union[dict, List[Point], PointArray]]): the shape of every layer, bottom up
+        *args: further positional arguments of the function, the same for every layer
+        layerArguments (Optional[Sequence[dict]]): keyword arguments that differ per layer, e.g. {'layerIndex': i, 'z': z}
+        workers (Optional[int]): number of worker processes, all cores by default, 1 runs every layer in this process
+        **kwargs: further keyword arguments of the function, the same for every layer
+
+    Returns:
+        List[dict]: the steps of all layers, layer after layer
+    """
+    shapes = [toPointArray(shape) for shape in shapes]
+    if layerArguments is None:
+        layerArguments = [{}] * len(shapes)
+    if len(layerArguments) != len(shapes):
+        raise ValueError("layerArguments needs one entry per layer.")
+    workers = min(workers or os.cpu_count() or 1, max(len(shapes), 1))
+
+    if workers == 1:
+        steps = []
+        for shape, layerKwargs in zip(shapes, layerArguments):
+            steps.extend(function({'shape': shape}, *args, **{**kwargs, **layerKwargs}))
+        return steps
+
+    block, ranges = writeShared(shapes)
+    name = block.name if block is not None else None
+    total = ranges[-1][1] if ranges else 0
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(runLayer, function, name, total, start, stop, shape.channels, args, {**kwargs, **layerKwargs})
+                       for (start, stop), shape, layerKwargs in zip(ranges, shapes, layerArguments)]
+            wait(futures)
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    # Every finished layer frees its block, even if another layer failed
+    steps = []
+    error = None
+    for future in futures:
+        if future.exception() is not None:
+            error = error or future.exception()
+            continue
+        layerSteps = unpackSteps(*future.result())
+        if error is None:
+            steps.extend(layerSteps)
+    if error is not None:
+        raise error
+    return steps
@@ -0,0 +1,84 @@
+from typing import Iterator, List, Union
+
+import numpy as np
+
+from design.geometricTools.affine import AffineTransform, shapeCentroid
+from design.point import Point
+from design.pointArray import PointArray, toPointArray
+
+
+class ShapePattern:
+    """
+    N transformed instances of one base shape, stored as the base points plus one 4x4 matrix per instance.
+
+    The instances are only generated when they are needed: iterating yields one PointArray per instance,
+    expand() generates all of them with a single broadcast product. A plate of 50 parts or a stack of
+    100 layers of the same contour therefore keeps a single copy of the contour in memory.
+
+    Attributes:
+        base (PointArray): the shape that is repeated, a copy of the given one, so later changes to that shape do not move the instances
+        transforms (np.ndarray): (K, 4, 4) homogeneous matrices, one per instance
+    """
+
+    __slots__ = ('base', 'transforms')
+
+    def __init__(self, base: Union[PointArray, List[Point], dict], transforms: np.ndarray):
+        shape = base['shape'] if isinstance(base, dict) else base
+        self.base = shape.copy() if isinstance(shape, PointArray) else toPointArray(shape)
+        self.transforms = np.asarray(transforms, dtype=float).reshape(-1, 4, 4)
+
+    @classmethod
+    def fromTransforms(cls, base: Union[PointArray, List[Point], dict], transforms: List[AffineTransform]) -> 'ShapePattern':
+        """
+        Builds a pattern from AffineTransform chains, each applied to the base shape as AffineTransform.apply would.
+        """
+        base = toPointArray(base)
+        center = shapeCentroid(base)
+        return cls(base, np.stack([transform.matrix(center) for transform in transforms]))
+
+    def __len__(self) -> int:
+        return self.transforms.shape[0]
+
+    def instance(self, index: int) -> PointArray:
+        """
+        Returns: the points of a single instance as a new PointArray
+        """
+        matrix = self.transforms[index]
+        points = self.base.copy()
+        points.data[:3] = matrix[:3, :3] @ points.data[:3] + matrix[:3, 3:]
+        return points
+
+    def __iter__(self) -> Iterator[PointArray]:
+        for index in range(len(self)):
+            yield self.instance(index)
+
+    def expand(self) -> np.ndarray:
+        """
+        Generates all instances at once.
+
+        Returns:
+            np.ndarray: (K, 4, N) array, the x, y, z and e rows of every instance
+        """
+        data = np.empty((len(self),) + self.base.data.shape)
+        data[:, :3] = np.einsum('kij,jn->kin', self.transforms[:, :3, :3], self.base.data[:3]) + self.transforms[:, :3, 3:]
+        data[:, 3] = self.base.data[3]
+        return data
+
+    def toPointArray(self) -> PointArray:
+        """
+        Returns: all instances joined one after another into a single PointArray
+        """
+        data = self.expand()
+        joined = PointArray.__new__(PointArray)
+        joined.data = np.ascontiguousarray(data.transpose(1, 0, 2).reshape(4, -1))
+        joined.channels = {name: np.tile(values, len(self)) for name, values in self.base.channels.items()}
+        return joined
+
+    def steps(self) -> List[dict]:
+        """
+        Returns: the instances as a list of {'shape': PointArray} steps, as separately built copies would be
+        """
+        return [{'shape': points} for points in self]
+
+    def __repr__(self):
+        return f"ShapePattern(instances={len(self)}, points={len(self.base)})"
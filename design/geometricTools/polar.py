@@ -4,7 +4,9 @@ from numpy.ma.core import angle
 from pydantic import BaseModel
 from typing import Optional
 from math import pi,cos,sin, atan2
+import numpy as np
 from ..point import Point
+from ..pointArray import PointArray
 
 class PolarPoint(BaseModel):
     """
@@ -34,6 +36,26 @@ def polarToPoint(center: Point, radious: float, angle: float) -> Point:
 
     return Point(x = center.x + radious*cos(angle), y = center.y + radious*sin(angle), z = center.z)
 
+def polarToPoints(center: Point, radious, angle, z=None) -> PointArray:
+    """
+    Batched version of polarToPoint, converting whole arrays of polar coordinates at once.
+    Radii and angles may be arrays or scalars, they are broadcast against each other.
+
+    Args:
+        center (Point): the center of polar coordinates
+        radious (Union[float, np.ndarray]): distances of the points from the center
+        angle (Union[float, np.ndarray]): angles of the points from the x-axis
+        z (Union[float, np.ndarray, None]): z of the points, defaults to center.z
+
+    Returns:
+        PointArray: points with x, y calculated based on the given polar coordinates
+    """
+
+    radious, angle = np.broadcast_arrays(np.asarray(radious, dtype=float), np.asarray(angle, dtype=float))
+    x = center.x + radious * np.cos(angle)
+    y = center.y + radious * np.sin(angle)
+    return PointArray(np.atleast_1d(x), np.atleast_1d(y), center.z if z is None else z)
+
 def pointToPolar(origin: Point, point: Point) -> PolarPoint:
     """
     function converting a cartesian coordinate point to polar coordinates point
@@ -0,0 +1,93 @@
+from typing import List
+
+import numpy as np
+
+from design.pointArray import PointArray
+
+
+class EdgeTable:
+    """
+    The edges of an outline sorted once by their extent across the scanlines, as used by scanline filling.
+
+    Scanlines run along one axis ('y' scanlines are horizontal lines y = position) and cross the edges
+    whose extent on the other axis contains the position. Edges parallel to the scanlines never cross them.
+
+    Attributes:
+        low (np.ndarray): lower end of every edge across the scanlines, ascending
+        high (np.ndarray): upper end of every edge across the scanlines
+        start (np.ndarray): coordinate along the scanlines at the first vertex of every edge
+        startPosition (np.ndarray): coordinate across the scanlines at the first vertex of every edge
+        slope (np.ndarray): change along the scanlines per unit across them
+    """
+
+    __slots__ = ('low', 'high', 'start', 'startPosition', 'slope')
+
+    def __init__(self, outline: PointArray, axis: str = 'y'):
+        along, across = (outline.x, outline.y) if axis == 'y' else (outline.y, outline.x)
+
+        # Consecutive vertices form the edges, edges parallel to the scanlines are left out
+        a0, a1, b0, b1 = along[:-1], along[1:], across[:-1], across[1:]
+        crossing = b0 != b1
+        a0, a1, b0, b1 = a0[crossing], a1[crossing], b0[crossing], b1[crossing]
+
+        low = np.minimum(b0, b1)
+        order = np.argsort(low, kind='stable')
+        self.low = low[order]
+        self.high = np.maximum(b0, b1)[order]
+        self.start = a0[order]
+        self.startPosition = b0[order]
+        self.slope = ((a1 - a0) / (b1 - b0))[order]
+
+    def __len__(self) -> int:
+        return len(self.low)
+
+    def crossings(self, positions: np.ndarray) -> List[np.ndarray]:
+        """
+        Sweeps the scanlines in ascending order with an active edge table: edges enter the table when the
+        sweep reaches their lower end and leave it once it passes their upper end, so every scanline only
+        intersects the edges that actually span it, all of them in one array operation.
+
+        Args:
+            positions (np.ndarray): positions of the scanlines, in any order
+
+        Returns:
+            List[np.ndarray]: for every scanline, the ascending coordinates along it where it crosses an edge
+        """
+        positions = np.asarray(positions, dtype=float)
+        result = [None] * len(positions)
+        active = np.empty(0, dtype=int)
+        nextEdge = 0
+
+        for index in np.argsort(positions, kind='stable'):
+            position = positions[index]
+
+            # Edges reached by the sweep enter the table, edges left behind drop out of it
+            entering = int(np.searchsorted(self.low, position, side='right'))
+            if entering > nextEdge:
+                active = np.concatenate((active, np.arange(nextEdge, entering)))
+                nextEdge = entering
+            active = active[self.high[active] >= position]
+
+            crossings = self.start[active] + (position - self.startPosition[active]) * self.slope[active]
+            crossings.sort()
+            result[index] = crossings
+
+        return result
+
+
+def scanlineIntersections(outline: PointArray, positions: np.ndarray, axis: str = 'y') -> List[np.ndarray]:
+    """
+    Intersects parallel scanlines with the edges of an outline.
+
+    A vertex lying exactly on a scanline counts once for each of its edges that crosses the scanline,
+    the same as intersecting the scanline with every edge separately.
+
+    Args:
+        outline (PointArray): the outline, consecutive points forming its edges
+        positions (np.ndarray): positions of the scanlines across the axis, e.g. y values for 'y'
+        axis (str): 'y' for scanlines parallel to the x axis (y = position), 'x' for scanlines parallel to the y axis
+
+    Returns:
+        List[np.ndarray]: for every scanline, the ascending coordinates along it where it crosses the outline
+    """
+    return EdgeTable(outline, axis).crossings(positions)
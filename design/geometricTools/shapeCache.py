@@ -0,0 +1,187 @@
+import inspect
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+from design.point import Point
+from design.pointArray import PointArray, PointView
+
+
+def normalizeArgument(value: Any) -> Hashable:
+    """
+    Converts an argument of a shape function into a hashable key, equal for arguments that generate the same shape.
+
+    Args:
+        value (Any): the argument
+
+    Returns:
+        Hashable: the normalized argument
+
+    Raises:
+        TypeError: If the argument cannot be made hashable.
+    """
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    if isinstance(value, (Point, PointView)):
+        return ('Point', value.x, value.y, value.z, value.e)
+    if isinstance(value, PointArray):
+        channels = tuple(sorted((name, normalizeArgument(values)) for name, values in value.channels.items()))
+        return ('PointArray', value.data.shape, value.data.tobytes(), channels)
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(normalizeArgument(item) for item in value))
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted((key, normalizeArgument(item)) for key, item in value.items())))
+
+    # Functions (e.g. polar functions) and other objects are keyed by identity
+    hash(value)
+    return value
+
+
+@lru_cache(maxsize=None)
+def signatureOf(function: Callable) -> inspect.Signature:
+    return inspect.signature(function)
+
+
+def normalizeCall(function: Callable, args: tuple, kwargs: dict) -> Hashable:
+    """
+    Converts the arguments of a call into a hashable key that does not depend on how they were passed:
+    f(a, 5), f(a, segments=5) and, if 5 is the default, f(a) give the same key.
+
+    Raises:
+        TypeError: If the arguments do not fit the function or cannot be made hashable.
+    """
+    bound = signatureOf(function).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return normalizeArgument(dict(bound.arguments))
+
+
+def copyShape(shape: Any) -> Any:
+    """
+    Returns: an independent copy of a shape function result, a PointArray or a list of Points
+    """
+    if isinstance(shape, PointArray):
+        return shape.copy()
+    if isinstance(shape, list):
+        return [point.copy() for point in shape]
+    return shape
+
+
+def shapeSize(shape: Any) -> int:
+    """
+    Returns: approximate memory used by a shape function result in bytes
+    """
+    if isinstance(shape, PointArray):
+        return shape.data.nbytes + sum(values.nbytes for values in shape.channels.values())
+    if isinstance(shape, list):
+        # Rough footprint of a pydantic Point with its four fields
+        return 200 * len(shape)
+    return 0
+
+
+class ShapeCache:
+    """
+    Opt-in memoization of shape functions decorated with geometryDecorator.
+
+    Results are keyed on the function and its normalized arguments and evicted in least recently used order once
+    either the number of entries or their total size goes over the limit. The cache keeps its own copy of every
+    result and every hit hands out a fresh copy, so in-place changes (move(..., copy=False), editing points of
+    a shape) never reach the cached entry.
+
+    Attributes:
+        enabled (bool): whether decorated shape functions use the cache
+        maxEntries (int): maximum number of cached shapes
+        maxBytes (int): maximum total size of cached shapes
+        hits (int): number of calls answered from the cache
+        misses (int): number of calls that had to generate the shape
+    """
+
+    def __init__(self, maxEntries: int = 256, maxBytes: int = 256 * 1024 * 1024):
+        self.enabled = False
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self.entries = OrderedDict()
+
+    def enable(self, maxEntries: Optional[int] = None, maxBytes: Optional[int] = None) -> None:
+        """
+        Turns the cache on, optionally changing its limits.
+        """
+        if maxEntries is not None:
+            self.maxEntries = maxEntries
+        if maxBytes is not None:
+            self.maxBytes = maxBytes
+        self.enabled = True
+        self.evict()
+
+    def disable(self) -> None:
+        """
+        Turns the cache off and drops its entries.
+        """
+        self.enabled = False
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Drops all entries and resets the counters.
+        """
+        self.entries.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> dict:
+        """
+        Returns: dictionary with hits, misses, number of entries and their size in bytes
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries), 'bytes': self.bytes}
+
+    def evict(self) -> None:
+        """
+        Drops least recently used entries until the cache fits its limits.
+        """
+        while self.entries and (len(self.entries) > self.maxEntries or self.bytes > self.maxBytes):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+
+    def call(self, shape_function: Callable, args: tuple, kwargs: dict) -> Any:
+        """
+        Calls shape_function through the cache.
+
+        Args:
+            shape_function (Callable): the undecorated shape function
+            args (tuple): positional arguments of the call
+            kwargs (dict): keyword arguments of the call
+
+        Returns:
+            Any: a private copy of the (possibly cached) result
+        """
+        try:
+            key = (shape_function.__module__, shape_function.__qualname__, normalizeCall(shape_function, args, kwargs))
+        except TypeError:
+            # Arguments that cannot be keyed are simply not cached, calls that do not fit raise in the function
+            return shape_function(*args, **kwargs)
+
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return copyShape(self.entries[key][0])
+
+        self.misses += 1
+        shape = shape_function(*args, **kwargs)
+        size = shapeSize(shape)
+        if size <= self.maxBytes:
+            self.entries[key] = (copyShape(shape), size)
+            self.bytes += size
+            self.evict()
+        return shape
+
+
+shapeCache = ShapeCache()
@@ -0,0 +1,203 @@
+from typing import List, Optional, Union
+
+import numpy as np
+
+from design.geometricTools.pattern import ShapePattern
+from design.point import Point
+from design.pointArray import PointArray, PointView, toPointArray
+
+
+def douglasPeucker(points: np.ndarray, tolerance: float, fixed: Optional[np.ndarray] = None, blockSize: int = 1 << 14) -> np.ndarray:
+    """
+    Douglas-Peucker simplification: a stretch of a path is replaced by its chord unless a point strays further than
+    tolerance from it, in which case the stretch is split at the farthest point and both halves are checked again.
+
+    All stretches of a round are checked at once, every round splits each of them at most once, so the number of
+    rounds only grows with the depth of the splitting. Long paths start out cut into stretches of blockSize vertices,
+    keeping at most one more vertex per block than the plain algorithm would, to save the first rounds over all vertices.
+
+    Args:
+        points (np.ndarray): (N, 3) vertices of the path
+        tolerance (float): largest allowed distance of a removed vertex from the simplified path
+        fixed (Optional[np.ndarray]): indices of vertices that have to be kept
+        blockSize (int): longest stretch checked at the start
+
+    Returns:
+        np.ndarray: ascending indices of the kept vertices, always including the first and the last one
+    """
+    count = len(points)
+    if count == 0:
+        return np.arange(0)
+    fixed = np.unique(np.r_[0, count - 1, [] if fixed is None else fixed]).astype(int)
+    keep = np.zeros(count, dtype=bool)
+    keep[fixed] = True
+    limit = tolerance * tolerance
+    # One contiguous array per coordinate, reductions over short rows are slow. Coordinates that are the same
+    # for all vertices, such as z of a flat layer, do not change any distance.
+    coordinates = [np.ascontiguousarray(points[:, axis]) for axis in range(points.shape[1]) if np.ptp(points[:, axis]) > 0]
+    if count < 3 or not coordinates:
+        return fixed
+    # Stretches start at most blockSize vertices long, which saves the rounds splitting very long paths,
+    # and end at the fixed vertices
+    starts = np.union1d(np.arange(0, count - 1, blockSize), fixed[:-1])
+    ends = np.r_[starts[1:], count - 1]
+    keep[starts] = True
+
+    while True:
+        inner = ends - starts - 1
+        unfinished = inner > 0
+        starts, ends, inner = starts[unfinished], ends[unfinished], inner[unfinished]
+        if len(starts) == 0:
+            break
+
+        # The inner vertices of all stretches one after another
+        first = np.cumsum(inner) - inner
+        index = np.repeat(starts + 1 - first, inner) + np.arange(inner.sum())
+
+        # Squared distance of every inner vertex from the chord of its stretch, |r - t c|^2 = r.r - 2 t r.c + t^2 c.c
+        along = relativeLength = 0.0
+        chordLength = 0.0
+        for values in coordinates:
+            chordStart = values[starts]
+            chord = values[ends] - chordStart
+            chordLength = chordLength + chord * chord
+            relative = values[index]
+            relative -= np.repeat(chordStart, inner)
+            along = along + relative * np.repeat(chord, inner)
+            relativeLength = relativeLength + relative * relative
+        chordLength = np.repeat(np.maximum(chordLength, 1e-300), inner)
+        t = np.clip(along / chordLength, 0, 1)
+        distance = relativeLength - t * (2 * along - t * chordLength)
+
+        farthest = np.maximum.reduceat(distance, first)
+        split = farthest > limit
+        if not split.any():
+            break
+        # First vertex reaching the largest distance of its stretch
+        stretch = np.repeat(np.arange(len(starts)), inner)
+        candidates = np.flatnonzero(distance == farthest[stretch])
+        _, firstCandidate = np.unique(stretch[candidates], return_index=True)
+        splitAt = index[candidates[firstCandidate]][split]
+        keep[splitAt] = True
+        starts, ends = np.concatenate((starts[split], splitAt)), np.concatenate((splitAt, ends[split]))
+
+    return np.flatnonzero(keep)
+
+
+def visvalingam(points: np.ndarray, tolerance: float, fixed: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Visvalingam-Whyatt simplification: vertices are removed smallest triangle first, the triangle being formed
+    with their current neighbours, as long as the vertex lies within tolerance of the segment between the neighbours.
+
+    Instead of one vertex at a time, every round removes the removable vertices whose triangles are no larger than
+    the median one, skipping every other vertex of a run of neighbours, so each round removes a good part of them.
+
+    Args:
+        points (np.ndarray): (N, 3) vertices of the path
+        tolerance (float): largest allowed distance of a removed vertex from the segment between its current neighbours
+        fixed (Optional[np.ndarray]): indices of vertices that have to be kept
+
+    Returns:
+        np.ndarray: ascending indices of the kept vertices, always including the first and the last one
+    """
+    coordinates = [np.ascontiguousarray(points[:, axis]) for axis in range(points.shape[1]) if np.ptp(points[:, axis]) > 0]
+    kept = np.arange(len(points))
+    removable = np.ones(len(points), dtype=bool)
+    if fixed is not None:
+        removable[np.asarray(fixed, dtype=int)] = False
+    while len(kept) > 2 and coordinates:
+        # With u from the previous to the vertex and v from the previous to the following one,
+        # |u x v|^2 = |u|^2 |v|^2 - (u.v)^2 in any dimension
+        uu = uv = vv = 0.0
+        for values in coordinates:
+            previous = values[kept[:-2]]
+            u = values[kept[1:-1]] - previous
+            v = values[kept[2:]] - previous
+            uu, uv, vv = uu + u * u, uv + u * v, vv + v * v
+        crossSquared = np.maximum(uu * vv - uv * uv, 0)
+        area = 0.5 * np.sqrt(crossSquared)
+        # Distance from the segment between the neighbours, |u - t v|^2 = u.u - 2 t u.v + t^2 v.v
+        t = np.clip(uv / np.where(vv > 0, vv, 1), 0, 1)
+        height = np.sqrt(np.maximum(uu - t * (2 * uv - t * vv), 0))
+
+        candidate = (height <= tolerance) & removable[kept[1:-1]]
+        if not candidate.any():
+            break
+        chosen = candidate & (area <= np.median(area[candidate]))
+        # Neighbours are not removed together: in every run of chosen vertices only every other one goes
+        position = np.arange(len(chosen))
+        runStart = np.maximum.accumulate(np.where(chosen & ~np.r_[False, chosen[:-1]], position, 0))
+        remove = chosen & ((position - runStart) % 2 == 0)
+        kept = kept[np.r_[True, ~remove, True]]
+    return kept
+
+
+SIMPLIFICATION_METHODS = {'douglas-peucker': douglasPeucker, 'visvalingam': visvalingam}
+
+
+def simplifyArray(points: PointArray, tolerance: float, method: str = 'douglas-peucker') -> PointArray:
+    """
+    Simplifies an array-backed path, see simplify.
+
+    Returns:
+        PointArray: the kept vertices, with the extrusion of every removed vertex added to the next kept one
+    """
+    if len(points) < 3:
+        return points.copy()
+    # The extrusion of segment i is given at vertex i. A vertex between a segment with explicit extrusion and
+    # one with computed extrusion is kept, so no chord replaces both kinds: their sum would drop the computed part.
+    e = points.e
+    given = ~np.isnan(e)
+    boundaries = np.flatnonzero(given[1:-1] != given[2:]) + 1
+    kept = SIMPLIFICATION_METHODS[method](points.xyz, tolerance, boundaries)
+
+    simplified = PointArray.__new__(PointArray)
+    simplified.data = points.data[:, kept]
+    simplified.channels = {name: values[kept] for name, values in points.channels.items()}
+
+    # A kept vertex takes the extrusion of all segments it replaces, which are either all explicit or all computed
+    if given.any():
+        merged = np.add.reduceat(np.where(given, e, 0.0), kept[:-1] + 1)
+        simplified.data[3, 1:] = np.where(given[kept[1:]], merged, np.nan)
+    return simplified
+
+
+def simplify(shape: Union[dict, List[Point], PointArray, List[dict]], tolerance: float, method: str = 'douglas-peucker') -> Union[dict, List[Point], PointArray, List[dict]]:
+    """
+    Removes vertices that change a path by less than tolerance, from a shape or from every shape of a step list.
+
+    The first and the last vertex are always kept, so closed loops stay closed. Explicit extrusion values are kept
+    in total: a kept vertex takes the extrusion of all segments it replaces, so the material of a removed stretch is
+    laid down along its chord. Vertices without extrusion values keep having theirs computed from the length, and
+    the vertices where explicit and computed extrusion meet are always kept.
+
+    Args:
+        shape (Union[dict, List[Point], PointArray, List[dict]]): a shape (a dictionary with key 'shape', a list of Points or a PointArray) or a step list
+        tolerance (float): largest allowed deviation in millimeters
+        method (str): 'douglas-peucker', keeping every removed vertex within tolerance of the simplified path, or
+                      'visvalingam', removing the vertices with the smallest triangles first. Default is 'douglas-peucker'.
+
+    Returns:
+        Union[dict, List[Point], PointArray, List[dict]]: the simplified shape or step list, of the same kind as given
+
+    Raises:
+        ValueError: If the method is unknown.
+    """
+    if method not in SIMPLIFICATION_METHODS:
+        raise ValueError(f"Unknown simplification method: {method}. Expected one of {', '.join(SIMPLIFICATION_METHODS)}.")
+
+    if isinstance(shape, PointArray):
+        return simplifyArray(shape, tolerance, method)
+    if isinstance(shape, ShapePattern):
+        return ShapePattern(simplifyArray(shape.base, tolerance, method), shape.transforms)
+    if isinstance(shape, dict):
+        if 'shape' in shape:
+            return {'shape': simplify(shape['shape'], tolerance, method)}
+        if 'pattern' in shape:
+            return {'pattern': simplify(shape['pattern'], tolerance, method)}
+        return shape
+    if shape and all(isinstance(item, dict) for item in shape):
+        return [simplify(step, tolerance, method) for step in shape]
+    if all(isinstance(item, (Point, PointView)) for item in shape):
+        return simplifyArray(toPointArray(shape), tolerance, method).toPoints()
+    raise TypeError(f"Unexpected item type: {type(shape)}. Expected a shape or a list of steps.")
@@ -0,0 +1,354 @@
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from design.geometricTools.intersections import Intersections, asCoordinates, edgeIntersections
+from design.point import Point
+from design.pointArray import PointArray, toPointArray
+
+
+class EdgeGrid:
+    """
+    Uniform grid over the edges of a polyline, every edge is listed in each cell its bounding box touches.
+
+    Edges that do not share a cell cannot intersect, so pairwise tests only need the edges listed together,
+    and queries only look at the edges listed in the cells around the query. The entries are stored sorted
+    by cell: edges[cellStart[c]:cellStart[c + 1]] are the edges of cell c.
+
+    Attributes:
+        starts (np.ndarray): (N, 2) first vertex of every edge
+        ends (np.ndarray): (N, 2) second vertex of every edge
+        origin (np.ndarray): lower left corner of the grid
+        cellSize (float): side of a cell
+        columns (int): number of cells along x
+        rows (int): number of cells along y
+        cellStart (np.ndarray): offset of the entries of every cell, rows * columns + 1 values
+        edges (np.ndarray): edge indices of the entries
+    """
+
+    __slots__ = ('starts', 'ends', 'origin', 'cellSize', 'columns', 'rows', 'cellStart', 'edges')
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, cellSize: Optional[float] = None):
+        self.starts = np.asarray(starts, dtype=float)[:, :2]
+        self.ends = np.asarray(ends, dtype=float)[:, :2]
+
+        low = np.minimum(self.starts, self.ends)
+        high = np.maximum(self.starts, self.ends)
+        self.origin = low.min(axis=0) if len(low) else np.zeros(2)
+        extent = (high.max(axis=0) - self.origin) if len(high) else np.zeros(2)
+
+        if cellSize is None:
+            # About one edge per cell along the outline: the mean edge length, at most ~4N cells in total
+            lengths = np.hypot(*(self.ends - self.starts).T) if len(low) else np.zeros(1)
+            cellSize = max(float(lengths.mean()), float(np.sqrt(extent[0] * extent[1] / (4 * max(len(low), 1)))), 1e-9)
+        self.cellSize = cellSize
+        self.columns, self.rows = (np.floor(extent / cellSize).astype(int) + 1).tolist()
+
+        # Cell ranges covered by every edge, expanded into one (cell, edge) entry per covered cell
+        first = self.cellOf(low)
+        last = self.cellOf(high)
+        spanX = last[:, 0] - first[:, 0] + 1
+        spanY = last[:, 1] - first[:, 1] + 1
+        counts = spanX * spanY
+        edges = np.repeat(np.arange(len(low)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cellX = first[edges, 0] + local % spanX[edges]
+        cellY = first[edges, 1] + local // spanX[edges]
+        cells = cellY * self.columns + cellX
+
+        order = np.argsort(cells, kind='stable')
+        self.edges = edges[order]
+        self.cellStart = np.searchsorted(cells[order], np.arange(self.rows * self.columns + 1))
+
+    @classmethod
+    def fromPolyline(cls, vertices: np.ndarray, closed: bool = False, cellSize: Optional[float] = None) -> 'EdgeGrid':
+        """
+        Builds the grid over consecutive vertices, closed adds the edge from the last vertex back to the first.
+        """
+        vertices = np.asarray(vertices, dtype=float)
+        ends = np.roll(vertices, -1, axis=0) if closed else vertices[1:]
+        starts = vertices if closed else vertices[:-1]
+        return cls(starts, ends, cellSize)
+
+    def cellOf(self, points: np.ndarray) -> np.ndarray:
+        """
+        Returns: (N, 2) column and row of the cells containing the points, clamped to the grid
+        """
+        cell = np.floor((np.asarray(points, dtype=float)[:, :2] - self.origin) / self.cellSize).astype(int)
+        return np.clip(cell, 0, [self.columns - 1, self.rows - 1])
+
+    def candidatePairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pairs of edges listed in a common cell, each pair once.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: edge indices i and j with i < j
+        """
+        # Every entry is paired with the entries after it in the same cell
+        cellEnd = np.repeat(self.cellStart[1:], np.diff(self.cellStart))
+        following = cellEnd - np.arange(len(self.edges)) - 1
+        first = np.repeat(np.arange(len(self.edges)), following)
+        second = first + 1 + (np.arange(following.sum()) - np.repeat(np.cumsum(following) - following, following))
+
+        i, j = self.edges[first], self.edges[second]
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        pairs = np.unique(i.astype(np.int64) * len(self.starts) + j)
+        return pairs // len(self.starts), pairs % len(self.starts)
+
+    def edgesInCells(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Returns: ascending indices of the edges listed in any of the cells (row * columns + column)
+        """
+        starts, stops = self.cellStart[cells], self.cellStart[cells + 1]
+        counts = stops - starts
+        entries = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.unique(self.edges[entries])
+
+    def cellRange(self, low: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns: columns and rows of all cells of the rectangle from low to high, clamped to the grid
+        """
+        first, last = self.cellOf(np.array([low, high]))
+        columns, rows = np.meshgrid(np.arange(first[0], last[0] + 1), np.arange(first[1], last[1] + 1))
+        return columns.ravel(), rows.ravel()
+
+    def segmentCandidates(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """
+        Edges listed in the cells a segment passes through, a superset of the edges it can cross.
+        The cells are found column by column from the rows the segment spans inside each column.
+
+        Args:
+            start (np.ndarray): start of the segment, x and y first
+            end (np.ndarray): end of the segment
+
+        Returns:
+            np.ndarray: ascending edge indices
+        """
+        # Work in cell units
+        start = (np.asarray(start, dtype=float)[:2] - self.origin) / self.cellSize
+        end = (np.asarray(end, dtype=float)[:2] - self.origin) / self.cellSize
+        (startX, startY), (endX, endY) = (start, end) if start[0] <= end[0] else (end, start)
+
+        columns = np.arange(np.floor(startX), np.floor(endX) + 1)
+        if endX > startX:
+            # Rows spanned by the part of the segment inside every column
+            left = np.clip(columns, startX, endX)
+            right = np.clip(columns + 1, startX, endX)
+            slope = (endY - startY) / (endX - startX)
+            lowY = startY + (left - startX) * slope
+            highY = startY + (right - startX) * slope
+            firstRow, lastRow = np.floor(np.minimum(lowY, highY)), np.floor(np.maximum(lowY, highY))
+        else:
+            firstRow, lastRow = np.floor([min(startY, endY)]), np.floor([max(startY, endY)])
+
+        # Only cells inside the grid hold edges
+        columnMask = (columns >= 0) & (columns < self.columns)
+        columns = columns[columnMask].astype(int)
+        firstRow = np.clip(firstRow[columnMask], 0, None).astype(int)
+        lastRow = np.clip(lastRow[columnMask], None, self.rows - 1).astype(int)
+        counts = np.maximum(lastRow - firstRow + 1, 0)
+        rows = np.repeat(firstRow - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return self.edgesInCells(rows * self.columns + np.repeat(columns, counts))
+
+    def intersectSegment(self, start: Union[Point, np.ndarray], end: Union[Point, np.ndarray]) -> Intersections:
+        """
+        Crossings of a segment with the edges, testing only the edges near the segment.
+
+        Args:
+            start (Union[Point, np.ndarray]): start of the segment
+            end (Union[Point, np.ndarray]): end of the segment
+
+        Returns:
+            Intersections: the crossings as segmentIntersections finds them, edge indices into the whole outline
+        """
+        start, end = asCoordinates(start), asCoordinates(end)
+        candidates = self.segmentCandidates(start[0], end[0])
+        found = edgeIntersections(start, end, self.starts[candidates], self.ends[candidates])
+        return found._replace(edge=candidates[found.edge])
+
+    def pointCandidates(self, point: Union[Point, np.ndarray], radius: float = 0.0) -> np.ndarray:
+        """
+        Edges listed in the cells within radius of a point, a superset of the edges closer to it than radius.
+
+        Args:
+            point (Union[Point, np.ndarray]): the query point
+            radius (float): search radius
+
+        Returns:
+            np.ndarray: ascending edge indices
+        """
+        point = asCoordinates(point)[0, :2]
+        columns, rows = self.cellRange(point - radius, point + radius)
+        return self.edgesInCells(rows * self.columns + columns)
+
+    def edgeDistances(self, point: np.ndarray, edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns: distance from a point to each of the edges and the closest point of each edge
+        """
+        starts, directions = self.starts[edges], self.ends[edges] - self.starts[edges]
+        lengths = np.maximum((directions ** 2).sum(axis=1), 1e-300)
+        t = np.clip(((point - starts) * directions).sum(axis=1) / lengths, 0, 1)
+        closest = starts + t[:, None] * directions
+        return np.hypot(*(closest - point).T), closest
+
+    def nearestEdge(self, point: Union[Point, np.ndarray]) -> Tuple[int, float, np.ndarray]:
+        """
+        Finds the edge closest to a point, searching squares of cells around it, doubling their size,
+        until no cell outside the square can hold a closer edge.
+
+        Args:
+            point (Union[Point, np.ndarray]): the query point
+
+        Returns:
+            Tuple[int, float, np.ndarray]: index of the nearest edge, its distance and the closest point on it (x, y)
+        """
+        point = asCoordinates(point)[0, :2]
+        if len(self.starts) == 0:
+            raise ValueError("The grid holds no edges.")
+
+        ring = 1
+        while True:
+            edges = self.pointCandidates(point, ring * self.cellSize)
+            covered = ring >= max(self.columns, self.rows) + self.outside(point)
+            if len(edges):
+                distances, closest = self.edgeDistances(point, edges)
+                best = int(np.argmin(distances))
+                # Cells outside the searched square are farther than its half width
+                if distances[best] <= ring * self.cellSize or covered:
+                    return int(edges[best]), float(distances[best]), closest[best]
+            ring *= 2
+
+    def outside(self, point: np.ndarray) -> int:
+        """
+        Returns: how many cells a point lies outside the grid, 0 inside it
+        """
+        cell = np.floor((point - self.origin) / self.cellSize)
+        beyond = np.maximum(np.maximum(-cell, cell - [self.columns - 1, self.rows - 1]), 0)
+        return int(beyond.max())
+
+
+def edgeGrid(shape: Union[dict, List[Point], PointArray], closed: bool = False) -> EdgeGrid:
+    """
+    The EdgeGrid of a shape's outline, consecutive points forming its edges.
+
+    For a PointArray the grid is built once and kept in its cache, it is rebuilt only after the points have
+    been changed. Lists of Points get a new grid on every call, use PointArrays for repeated queries.
+
+    Args:
+        shape (Union[dict, List[Point], PointArray]): the outline, a dictionary with key 'shape', a list of Points or a PointArray
+        closed (bool): whether to add an edge from the last point back to the first
+
+    Returns:
+        EdgeGrid: the grid of the outline's edges
+    """
+    points = toPointArray(shape)
+    vertices = points.data[:2]
+    # Compared in full, the points can also have been changed in place through data or the x and y rows
+    cached = points.cache.get(('edgeGrid', closed))
+    if cached is not None and np.array_equal(cached[0], vertices):
+        return cached[1]
+    grid = EdgeGrid.fromPolyline(vertices.T, closed)
+    points.cache[('edgeGrid', closed)] = (vertices.copy(), grid)
+    return grid
+
+
+class KDTree:
+    """
+    2-d tree over a fixed set of points from which points can be removed, for repeated nearest neighbour queries
+    among the points that are left, as in building a tour nearest first.
+
+    The points are split at the median of the wider side of their bounding box until at most leafSize remain.
+    Every node counts the points left below it, so that emptied parts of the tree are skipped.
+
+    Attributes:
+        points (np.ndarray): (N, 2) coordinates
+        removed (np.ndarray): whether each point has been removed
+    """
+
+    __slots__ = ('points', 'removed', 'order', 'start', 'stop', 'low', 'high', 'children', 'parent', 'alive', 'leafOf')
+
+    def __init__(self, points: np.ndarray, leafSize: int = 8):
+        points = np.asarray(points, dtype=float)
+        self.points = points[:, :2] if points.size else np.empty((0, 2))
+        self.removed = np.zeros(len(self.points), dtype=bool)
+        self.order = np.arange(len(self.points))
+        self.start, self.stop, self.low, self.high, self.children, self.parent = [], [], [], [], [], []
+        self.leafOf = np.zeros(len(self.points), dtype=int)
+
+        pending = [(0, len(self.points), -1)]
+        while pending:
+            start, stop, parent = pending.pop()
+            node = len(self.start)
+            indices = self.order[start:stop]
+            coordinates = self.points[indices]
+            low = coordinates.min(axis=0) if len(indices) else np.zeros(2)
+            high = coordinates.max(axis=0) if len(indices) else np.zeros(2)
+            self.start.append(start)
+            self.stop.append(stop)
+            self.low.append(low.tolist())
+            self.high.append(high.tolist())
+            self.children.append([])
+            self.parent.append(parent)
+            if parent >= 0:
+                self.children[parent].append(node)
+
+            if stop - start > leafSize:
+                axis = int(np.argmax(high - low))
+                middle = (stop - start) // 2
+                self.order[start:stop] = indices[np.argpartition(coordinates[:, axis], middle)]
+                pending.append((start + middle, stop, node))
+                pending.append((start, start + middle, node))
+            else:
+                self.leafOf[indices] = node
+        self.alive = [stop - start for start, stop in zip(self.start, self.stop)]
+
+    def __len__(self) -> int:
+        return self.alive[0] if self.alive else 0
+
+    def remove(self, index: int) -> None:
+        """
+        Removes a point from further queries.
+        """
+        if self.removed[index]:
+            return
+        self.removed[index] = True
+        node = int(self.leafOf[index])
+        while node >= 0:
+            self.alive[node] -= 1
+            node = self.parent[node]
+
+    def nearest(self, point: np.ndarray) -> Tuple[int, float]:
+        """
+        Finds the nearest point that has not been removed.
+
+        Args:
+            point (np.ndarray): the query point, x and y first
+
+        Returns:
+            Tuple[int, float]: index of the nearest point and its distance, (-1, inf) if no point is left
+        """
+        x, y = float(point[0]), float(point[1])
+        bestIndex, best = -1, float('inf')
+        pending = [(0.0, 0)] if self.alive and self.alive[0] else []
+        while pending:
+            distance, node = pending.pop()
+            if distance >= best or self.alive[node] == 0:
+                continue
+            children = self.children[node]
+            if not children:
+                indices = self.order[self.start[node]:self.stop[node]]
+                indices = indices[~self.removed[indices]]
+                distances = np.hypot(self.points[indices, 0] - x, self.points[indices, 1] - y)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] < best:
+                    bestIndex, best = int(indices[nearest]), float(distances[nearest])
+                continue
+            # Visit the nearer child first, it is popped last
+            boxes = []
+            for child in children:
+                (lowX, lowY), (highX, highY) = self.low[child], self.high[child]
+                dx = max(lowX - x, 0.0, x - highX)
+                dy = max(lowY - y, 0.0, y - highY)
+                boxes.append(((dx * dx + dy * dy) ** 0.5, child))
+            pending.extend(sorted(boxes, reverse=True))
+        return bestIndex, best
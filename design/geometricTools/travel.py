@@ -0,0 +1,402 @@
+import time
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from design.directCommands.commands import moveWithNoExtrusion
+from design.geometricTools.spatialIndex import KDTree
+from design.point import Point
+from design.pointArray import PointArray
+
+
+def stepEnd(step: dict) -> Optional[np.ndarray]:
+    """
+    Returns: x, y and z of the nozzle after a step, None for steps that do not move it
+    """
+    command_type, data = next(iter(step.items()))
+    if command_type == 'moveWithNoExtrusion':
+        last = data
+    elif command_type == 'shape' and len(data):
+        last = data[-1]
+    elif command_type == 'pattern' and len(data):
+        last = data.instance(len(data) - 1)[-1]
+    else:
+        return None
+    return np.array([last.x or 0.0, last.y or 0.0, last.z or 0.0])
+
+
+def travelLength(steps: Iterable[dict]) -> float:
+    """
+    Total length of the moves without extrusion in a step list, from wherever the previous step left the nozzle.
+
+    Args:
+        steps (Iterable[dict]): the steps
+
+    Returns:
+        float: the travel distance in millimeters
+    """
+    total = 0.0
+    position = None
+    for step in steps:
+        end = stepEnd(step)
+        if 'moveWithNoExtrusion' in step and position is not None:
+            total += float(np.sqrt(((end - position) ** 2).sum()))
+        if end is not None:
+            position = end
+    return total
+
+
+class TravelGroup:
+    """
+    A moveWithNoExtrusion step with the steps printed after it, up to the next move, which can be printed anywhere
+    in the layer. A group holding a single path can also be entered at its other end or, if it is closed, anywhere
+    along it, as long as it is flat and its extrusion is computed when printing (no explicit e values).
+
+    Attributes:
+        steps (List[dict]): the steps of the group, the move first
+        path (Union[PointArray, List[Point], None]): the path of a group made of a move and one 'shape' step
+        entry (np.ndarray): x, y and z where the group starts
+        exit (np.ndarray): x, y and z where the group ends
+        reversible (bool): whether the open path may be printed backwards
+        rotatable (bool): whether the closed path may start at any of its vertices
+        vertices (np.ndarray): (N, 3) vertices of the path without the closing one
+    """
+
+    __slots__ = ('steps', 'path', 'entry', 'exit', 'reversible', 'rotatable', 'vertices')
+
+    def __init__(self, steps: List[dict], reverse: bool, rotate: bool):
+        self.steps = steps
+        self.entry = stepEnd(steps[0])
+        ends = [end for end in map(stepEnd, steps) if end is not None]
+        self.exit = ends[-1]
+        self.path = None
+        self.reversible = self.rotatable = False
+        self.vertices = np.empty((0, 3))
+
+        if len(steps) == 2 and 'shape' in steps[1] and len(steps[1]['shape']) > 1:
+            self.path = steps[1]['shape']
+            if isinstance(self.path, PointArray):
+                self.vertices = self.path.xyz
+                computed = bool(np.isnan(self.path.e).all())
+            else:
+                self.vertices = np.array([[point.x or 0.0, point.y or 0.0, point.z or 0.0] for point in self.path])
+                computed = all(point.e is None for point in self.path)
+            self.entry = self.vertices[0]
+            closed = np.array_equal(self.vertices[0], self.vertices[-1])
+            # Only flat paths can change direction, a climbing one printed backwards would start in the air
+            free = computed and np.ptp(self.vertices[:, 2]) == 0
+            self.reversible = reverse and free and not closed
+            self.rotatable = rotate and free and closed and len(self.vertices) > 2
+            if closed:
+                self.vertices = self.vertices[:-1]
+
+    def candidates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns: the points where the group can be entered and, for each, the vertex it starts from:
+                 0 for the start of the path, -1 for its end (printed backwards) or the vertex of a closed path
+        """
+        if self.rotatable:
+            return self.vertices, np.arange(len(self.vertices))
+        if self.reversible:
+            return np.array([self.entry, self.exit]), np.array([0, -1])
+        return self.entry[None], np.zeros(1, dtype=int)
+
+    def ends(self, start: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns: where the group is entered and left when entered at a candidate vertex, see candidates
+        """
+        if self.rotatable:
+            return self.vertices[start], self.vertices[start]
+        return (self.exit, self.entry) if start < 0 else (self.entry, self.exit)
+
+    def stepsFrom(self, start: int) -> List[dict]:
+        """
+        Returns: the steps of the group entered at a candidate vertex, see candidates
+        """
+        if start == 0:
+            return self.steps
+        path = self.path
+        if isinstance(path, PointArray):
+            columns = np.arange(len(path))[::-1] if start < 0 else np.r_[np.arange(start, len(path) - 1), np.arange(start + 1)]
+            moved = PointArray.__new__(PointArray)
+            moved.data = path.data[:, columns]
+            moved.channels = {name: values[columns] for name, values in path.channels.items()}
+            first = moved[0].toPoint()
+        else:
+            moved = path[::-1] if start < 0 else path[start:-1] + path[:start + 1]
+            first = moved[0]
+        return [moveWithNoExtrusion(Point(x=first.x, y=first.y, z=first.z)), {'shape': moved}]
+
+
+def splitGroups(steps: List[dict], reverse: bool, rotate: bool) -> List[Union[TravelGroup, List[dict]]]:
+    """
+    Splits a step list into TravelGroups and runs of steps that stay in place: the steps before the first move.
+    """
+    parts = []
+    current = []
+    for step in steps:
+        if 'moveWithNoExtrusion' in step and current:
+            parts.append(current)
+            current = []
+        current.append(step)
+    if current:
+        parts.append(current)
+    return [TravelGroup(part, reverse, rotate) if 'moveWithNoExtrusion' in part[0] else part for part in parts]
+
+
+def distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sqrt(((a - b) ** 2).sum(axis=-1))
+
+
+class Tour:
+    """
+    An order of groups with the points where each one is entered and left, improved in place by 2-opt and Or-opt moves.
+
+    Attributes:
+        order (np.ndarray): group of every position
+        entries (np.ndarray): (N, 3) entry point of every position
+        exits (np.ndarray): (N, 3) exit point of every position
+        flippable (np.ndarray): whether the group can be printed in the opposite direction
+        flipped (np.ndarray): whether the group is printed in the opposite direction
+        start (Optional[np.ndarray]): where the nozzle is before the tour, None to keep the first group first
+    """
+
+    __slots__ = ('order', 'entries', 'exits', 'flippable', 'flipped', 'start')
+
+    def __init__(self, order: np.ndarray, entries: np.ndarray, exits: np.ndarray, flippable: np.ndarray, start: Optional[np.ndarray]):
+        self.order = order
+        self.entries = entries
+        self.exits = exits
+        self.flippable = flippable
+        self.flipped = np.zeros(len(order), dtype=bool)
+        self.start = start
+
+    def length(self) -> float:
+        links = distances(self.exits[:-1], self.entries[1:]).sum()
+        return float(links + (distances(self.start, self.entries[0]) if self.start is not None and len(self.order) else 0.0))
+
+    def rearrange(self, positions: np.ndarray, flip: np.ndarray) -> None:
+        """
+        Puts the group at positions[i] to position i, printed in the opposite direction where flip is set.
+        """
+        entries, exits = self.entries[positions], self.exits[positions]
+        self.entries = np.where(flip[:, None], exits, entries)
+        self.exits = np.where(flip[:, None], entries, exits)
+        self.order = self.order[positions]
+        self.flippable = self.flippable[positions]
+        self.flipped = self.flipped[positions] ^ flip
+
+    def linkCost(self, before: np.ndarray, after: np.ndarray, hasAfter: np.ndarray) -> np.ndarray:
+        return np.where(hasAfter, distances(before, after), 0.0)
+
+    def twoOpt(self, deadline: float) -> bool:
+        """
+        Reverses the stretch of the tour that shortens it most for every first position, one pass.
+
+        Returns:
+            bool: whether the tour got shorter
+        """
+        count = len(self.order)
+        improved = False
+        for first in range(0 if self.start is not None else 1, count):
+            if time.perf_counter() > deadline:
+                break
+            if not self.flippable[first]:
+                continue
+            previous = self.start if first == 0 else self.exits[first - 1]
+            # Every stretch from first to last has to be printable backwards
+            blocked = np.flatnonzero(~self.flippable[first:])
+            last = np.arange(first, first + (blocked[0] if len(blocked) else count - first))
+            hasNext = last + 1 < count
+            following = self.entries[np.minimum(last + 1, count - 1)]
+
+            before = distances(previous, self.entries[first]) + self.linkCost(self.exits[last], following, hasNext)
+            after = distances(previous, self.exits[last]) + self.linkCost(self.entries[first], following, hasNext)
+            gain = before - after
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                positions = np.arange(count)
+                positions[first:last[best] + 1] = positions[first:last[best] + 1][::-1]
+                flip = np.zeros(count, dtype=bool)
+                flip[first:last[best] + 1] = True
+                self.rearrange(positions, flip)
+                improved = True
+        return improved
+
+    def orOpt(self, deadline: float, chainLengths: Tuple[int, ...] = (1, 2, 3)) -> bool:
+        """
+        Moves chains of up to three neighbouring groups to wherever they shorten the tour most, also backwards, one pass.
+
+        Returns:
+            bool: whether the tour got shorter
+        """
+        improved = False
+        for length in chainLengths:
+            first = 0 if self.start is not None else 1
+            while first + length <= len(self.order):
+                if time.perf_counter() > deadline:
+                    return improved
+                if self.moveChain(first, first + length - 1):
+                    improved = True
+                first += 1
+        return improved
+
+    def moveChain(self, first: int, last: int) -> bool:
+        """
+        Moves the groups from first to last into the gap between two other groups where they shorten the tour most.
+
+        Returns:
+            bool: whether the chain was moved
+        """
+        count = len(self.order)
+        chainEntry, chainExit = self.entries[first], self.exits[last]
+        previous = self.start if first == 0 else self.exits[first - 1]
+        hasFollowing = last + 1 < count
+        following = self.entries[min(last + 1, count - 1)]
+
+        # Taking the chain out joins its neighbours directly
+        saved = distances(previous, chainEntry) + self.linkCost(chainExit, following, hasFollowing) - self.linkCost(previous, following, hasFollowing)
+
+        # Gap g of the tour without the chain lies before its g-th group, gap 0 follows the start
+        rest = np.r_[np.arange(first), np.arange(last + 1, count)]
+        missing = np.full((1, 3), np.nan)
+        before = np.vstack((missing if self.start is None else self.start[None], self.exits[rest]))
+        after = np.vstack((self.entries[rest], missing))
+        hasAfter = np.arange(len(rest) + 1) < len(rest)
+        usable = ~np.isnan(before[:, 0])
+
+        direct = self.linkCost(before, after, hasAfter)
+        forward = distances(before, chainEntry) + self.linkCost(chainExit, after, hasAfter) - direct
+        costs = [np.where(usable, forward, np.inf)]
+        if self.flippable[first:last + 1].all():
+            backward = distances(before, chainExit) + self.linkCost(chainEntry, after, hasAfter) - direct
+            costs.append(np.where(usable, backward, np.inf))
+        costs = np.concatenate(costs)
+
+        best = int(np.argmin(costs))
+        if saved - costs[best] <= 1e-9:
+            return False
+        gap, reverse = best % len(forward), best >= len(forward)
+        chain = np.arange(first, last + 1)
+        positions = np.r_[rest[:gap], chain[::-1] if reverse else chain, rest[gap:]]
+        flip = np.zeros(count, dtype=bool)
+        flip[gap:gap + len(chain)] = reverse
+        self.rearrange(positions, flip)
+        return True
+
+
+def planRun(groups: List[TravelGroup], start: Optional[np.ndarray], deadline: float) -> List[dict]:
+    """
+    Orders the groups of one layer: nearest first, then improved by 2-opt and Or-opt moves until no move shortens
+    the travel or the deadline passes, and finally starts every closed path at the vertex nearest to its neighbours.
+    """
+    # Nearest entry point first, all entry points of the chosen group leave the tree
+    candidates = [group.candidates() for group in groups]
+    counts = np.array([len(points) for points, _ in candidates])
+    offsets = np.r_[0, np.cumsum(counts)]
+    points = np.concatenate([points for points, _ in candidates])
+    owner = np.repeat(np.arange(len(groups)), counts)
+    vertex = np.concatenate([vertices for _, vertices in candidates])
+    tree = KDTree(points)
+
+    order, startVertex = [], []
+    position = start
+    while len(tree):
+        # Without a start position the first group stays first
+        chosen = 0 if position is None else tree.nearest(position)[0]
+        group = int(owner[chosen])
+        order.append(group)
+        startVertex.append(int(vertex[chosen]))
+        for index in range(offsets[group], offsets[group + 1]):
+            tree.remove(index)
+        position = groups[group].ends(startVertex[-1])[1]
+
+    ends = [groups[group].ends(vertex) for group, vertex in zip(order, startVertex)]
+    entries = np.array([entry for entry, _ in ends])
+    exits = np.array([exit for _, exit in ends])
+    flippable = np.array([groups[group].reversible or np.array_equal(*groups[group].ends(0)) for group in order])
+    tour = Tour(np.array(order), entries, exits, flippable, start)
+    tour.flipped = np.array(startVertex) < 0
+    rotation = dict(zip(order, startVertex))
+
+    while time.perf_counter() < deadline and (tour.twoOpt(deadline) | tour.orOpt(deadline)):
+        pass
+
+    # Closed paths start at the vertex closest to where the nozzle comes from and goes next
+    for index, group in enumerate(tour.order.tolist()):
+        if not groups[group].rotatable:
+            continue
+        vertices = groups[group].vertices
+        previous = tour.start if index == 0 else tour.exits[index - 1]
+        cost = distances(vertices, previous) if previous is not None else np.zeros(len(vertices))
+        if index + 1 < len(tour.order):
+            cost = cost + distances(vertices, tour.entries[index + 1])
+        best = int(np.argmin(cost))
+        rotation[group] = best
+        tour.entries[index] = tour.exits[index] = vertices[best]
+
+    steps = []
+    for group, flipped in zip(tour.order.tolist(), tour.flipped.tolist()):
+        if groups[group].rotatable:
+            steps.extend(groups[group].stepsFrom(rotation[group]))
+        elif groups[group].reversible and flipped:
+            steps.extend(groups[group].stepsFrom(-1))
+        else:
+            steps.extend(groups[group].steps)
+    return steps
+
+
+def optimizeTravel(steps: Iterable[dict], reverse: bool = True, rotate: bool = True, timeBudget: float = 1.0) -> List[dict]:
+    """
+    Reorders the steps of every layer to shorten the moves without extrusion between them.
+
+    Every moveWithNoExtrusion step starts a group that lasts until the next move, groups at the same height form a
+    layer and are reordered within it; steps before the first move and layer changes stay where they are. A tour is
+    built nearest first with a KD-tree over the points where the groups can be entered, then improved by 2-opt
+    (reversing stretches of the tour) and Or-opt (moving chains of up to three groups) until neither shortens it or
+    the time budget is used up. Paths are only reversed or rotated if they are flat and their extrusion is computed when printing.
+
+    Args:
+        steps (Iterable[dict]): the steps, as passed to parseStepsToGcode
+        reverse (bool): whether open paths may be printed backwards. Default is True.
+        rotate (bool): whether closed paths may start at any of their vertices. Default is True.
+        timeBudget (float): seconds spent at most on improving the tours of all layers. Default is 1.
+
+    Returns:
+        List[dict]: the reordered steps, the same step dictionaries where a group is printed unchanged
+    """
+    deadline = time.perf_counter() + timeBudget
+    result = []
+    position = None
+    layer = []
+
+    def finishLayer():
+        nonlocal position
+        if layer:
+            result.extend(planRun(layer, position, deadline))
+            layer.clear()
+            position = travelEnd(result)
+
+    for part in splitGroups(list(steps), reverse, rotate):
+        if isinstance(part, TravelGroup) and (not layer or np.isclose(part.entry[2], layer[0].entry[2])):
+            layer.append(part)
+            continue
+        finishLayer()
+        if isinstance(part, TravelGroup):
+            layer.append(part)
+        else:
+            result.extend(part)
+            position = travelEnd(result)
+    finishLayer()
+    return result
+
+
+def travelEnd(steps: List[dict]) -> Optional[np.ndarray]:
+    """
+    Returns: where the nozzle is after the last step of a list that moves it, None if no step does
+    """
+    for step in reversed(steps):
+        end = stepEnd(step)
+        if end is not None:
+            return end
+    return None
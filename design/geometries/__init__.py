@@ -1,8 +1,8 @@
 from design.point import Point
-from design.geometricTools.baseTools import linespace, flatten
+from design.geometricTools.baseTools import linespace, linespaceArray, flatten
 
 import typing
 from design.geometricTools.baseTools import linespace
-from design.geometricTools.polar import polarToPoint, PolarPoint
+from design.geometricTools.polar import polarToPoint, polarToPoints, PolarPoint
 #from customGcodeGenerator.transform.transformations import pointsIndiciesToStrRepresentation
 
@@ -0,0 +1,112 @@
+from typing import Callable, Tuple
+
+import numpy as np
+
+from design.pointArray import PointArray
+
+
+def chord_deviation(start: np.ndarray, end: np.ndarray, middle: np.ndarray) -> np.ndarray:
+    """
+    Distance of every middle point from the chord segment between start and end (row-wise, in x, y, z).
+    A middle point on the chord's line but beyond an end of the chord, where the curve runs back, keeps its distance to that end.
+
+    Args:
+        start (np.ndarray): (m, 3) chord start points.
+        end (np.ndarray): (m, 3) chord end points.
+        middle (np.ndarray): (m, 3) points of the curve between start and end.
+
+    Returns:
+        np.ndarray: (m,) distances, the distance to start where a chord has no length.
+    """
+    chord = end - start
+    offset = middle - start
+    squaredLength = (chord * chord).sum(axis=1)
+    t = np.clip((offset * chord).sum(axis=1) / np.where(squaredLength > 0, squaredLength, 1), 0, 1)
+    return np.linalg.norm(offset - t[:, None] * chord, axis=1)
+
+
+def adaptive_parameters(
+        evaluate: Callable[[np.ndarray], np.ndarray],
+        start: float,
+        end: float,
+        tolerance: float,
+        min_segment_length: float = 0.0,
+        initial_segments: int = 16,
+        max_refinements: int = 24,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sample a parametric curve so that its polyline deviates less than tolerance from the curve.
+
+    Starting from an even grid, every interval whose midpoint lies further than tolerance from the chord is halved.
+    Every round only evaluates the midpoints of the halves made in the previous round, all in a single call, so
+    evaluate has to accept an array of parameters. Intervals are not split below twice min_segment_length, so no segment gets shorter than it.
+
+    Args:
+        evaluate (Callable[[np.ndarray], np.ndarray]): maps (m,) parameters to (m, k) values, the first three columns being x, y, z.
+        start (float): first parameter.
+        end (float): last parameter.
+        tolerance (float): maximum chord deviation in mm.
+        min_segment_length (float): minimum segment length in mm, 0 disables it.
+        initial_segments (int): number of segments of the starting grid, it has to be fine enough not to miss features.
+        max_refinements (int): maximum number of refinement rounds.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the chosen parameters and the values of the curve at them.
+    """
+    parameters = np.linspace(start, end, initial_segments + 1)
+    values = np.asarray(evaluate(parameters), dtype=float)
+    # Intervals whose midpoint is still to be checked, an interval that was fine once stays fine
+    active = np.ones(initial_segments, dtype=bool)
+
+    for _ in range(max_refinements):
+        intervals = np.flatnonzero(active)
+        if len(intervals) == 0:
+            break
+        middles = (parameters[intervals] + parameters[intervals + 1]) / 2
+        middleValues = np.asarray(evaluate(middles), dtype=float)
+
+        xyz = values[:, :3]
+        deviation = chord_deviation(xyz[intervals], xyz[intervals + 1], middleValues[:, :3])
+        length = np.linalg.norm(xyz[intervals + 1] - xyz[intervals], axis=1)
+        refine = (deviation > tolerance) & (length >= 2 * min_segment_length)
+        if not refine.any():
+            break
+
+        # Insert the midpoints of refined intervals right after their interval start
+        positions = intervals[refine] + 1
+        parameters = np.insert(parameters, positions, middles[refine])
+        values = np.insert(values, positions, middleValues[refine], axis=0)
+
+        # Only the two halves of every refined interval are checked in the next round
+        inserted = positions + np.arange(len(positions))
+        active = np.zeros(len(parameters) - 1, dtype=bool)
+        active[inserted - 1] = True
+        active[inserted] = True
+
+    return parameters, values
+
+
+def adaptive_point_array(
+        evaluate: Callable[[np.ndarray], PointArray],
+        start: float,
+        end: float,
+        tolerance: float,
+        min_segment_length: float = 0.0,
+        initial_segments: int = 16,
+) -> PointArray:
+    """
+    adaptive_parameters for generators that evaluate their curve into a PointArray.
+
+    Args:
+        evaluate (Callable[[np.ndarray], PointArray]): maps (m,) parameters to m points of the curve.
+        start (float): first parameter.
+        end (float): last parameter.
+        tolerance (float): maximum chord deviation in mm.
+        min_segment_length (float): minimum segment length in mm, 0 disables it.
+        initial_segments (int): number of segments of the starting grid.
+
+    Returns:
+        PointArray: the adaptively sampled points.
+    """
+    _, values = adaptive_parameters(lambda parameters: evaluate(parameters).data.T, start, end, tolerance, min_segment_length, initial_segments)
+    return PointArray.fromArray(values)
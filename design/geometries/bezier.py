@@ -0,0 +1,116 @@
+from functools import lru_cache
+from math import comb
+
+import numpy as np
+
+from design.geometricTools.baseTools import linespaceArray
+from design.pointArray import PointArray
+
+
+@lru_cache(maxsize=64)
+def bernstein_matrix(degree: int, num_points: int) -> np.ndarray:
+    """
+    Bernstein basis of the given degree sampled at num_points evenly spaced t in [0, 1], cached by its arguments.
+    The returned matrix is read-only as it is shared between calls.
+
+    Args:
+        degree (int): Degree of the Bézier curve (number of control points - 1).
+        num_points (int): Number of samples.
+
+    Returns:
+        np.ndarray: (num_points, degree + 1) matrix, B[k, i] = C(degree, i) * t_k^i * (1 - t_k)^(degree - i).
+    """
+    t = linespaceArray(0.0, 1.0, num_points)[:, None]
+    i = np.arange(degree + 1)
+    coefficients = np.array([float(comb(degree, k)) for k in range(degree + 1)])
+    matrix = coefficients * t ** i * (1 - t) ** (degree - i)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def evaluate_bezier(control_points: PointArray, num_points: int = 1000) -> PointArray:
+    """
+    Evaluate a Bézier curve at num_points evenly spaced parameters as a single matrix product with the cached Bernstein basis.
+
+    Args:
+        control_points (PointArray): Control points of the curve.
+        num_points (int): Number of points to generate.
+
+    Returns:
+        PointArray: Points of the curve.
+    """
+    return control_points.combine(bernstein_matrix(len(control_points) - 1, num_points))
+
+
+def split_bezier(control: np.ndarray, t: float = 0.5):
+    """
+    Split a Bézier curve in two at parameter t using De Casteljau's algorithm.
+
+    Args:
+        control (np.ndarray): (n, k) control points.
+        t (float): Parameter of the split.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: control points of the part before and after t.
+    """
+    left = [control[0]]
+    right = [control[-1]]
+    points = control
+    for _ in range(len(control) - 1):
+        points = (1 - t) * points[:-1] + t * points[1:]
+        left.append(points[0])
+        right.append(points[-1])
+    return np.array(left), np.array(right[::-1])
+
+
+def control_polygon_deviation(control: np.ndarray) -> float:
+    """
+    Largest distance of the control points from the chord segment between the curve end points.
+    The curve lies in the convex hull of its control points, so it never deviates from the chord more than this,
+    also where it runs back or beyond the end points along the chord's line.
+
+    Args:
+        control (np.ndarray): (n, 3) control points.
+
+    Returns:
+        float: the deviation
+    """
+    chord = control[-1] - control[0]
+    offsets = control[1:-1] - control[0]
+    squaredLength = float(chord @ chord)
+    t = np.clip(offsets @ chord / squaredLength, 0, 1) if squaredLength > 0 else np.zeros(len(offsets))
+    return float(np.linalg.norm(offsets - t[:, None] * chord, axis=1).max(initial=0.0))
+
+
+def adaptive_bezier(control_points: PointArray, tolerance: float = 0.01, min_segment_length: float = 0.0, max_depth: int = 16) -> PointArray:
+    """
+    Approximate a Bézier curve by recursive subdivision until every piece is flat within tolerance.
+    Unlike the Bernstein matrix it stays accurate for very high degrees, and it places points where the curve bends.
+
+    Args:
+        control_points (PointArray): Control points of the curve.
+        tolerance (float): Maximum distance between the curve and its approximation in mm.
+        min_segment_length (float): Pieces whose chord is shorter than twice this length are not split any further.
+        max_depth (int): Maximum number of times a piece is split.
+
+    Returns:
+        PointArray: Points of the curve, starting and ending at the end control points.
+    """
+    # Subdivide x, y, z and e together, the flatness is measured in x, y, z only
+    hasExtrusion = not np.isnan(control_points.e).all()
+    control = np.nan_to_num(control_points.data.T)
+
+    points = [control[0]]
+    stack = [(control, 0)]
+    while stack:
+        piece, depth = stack.pop()
+        chord = np.linalg.norm(piece[-1, :3] - piece[0, :3])
+        if depth >= max_depth or 0 < chord < 2 * min_segment_length or control_polygon_deviation(piece[:, :3]) <= tolerance:
+            points.append(piece[-1])
+            continue
+        left, right = split_bezier(piece)
+        stack.append((right, depth + 1))
+        stack.append((left, depth + 1))
+
+    points = np.array(points)
+    return PointArray(points[:, 0], points[:, 1], points[:, 2], points[:, 3] if hasExtrusion else None)
@@ -1,7 +1,13 @@
-from design.geometricTools.polar import pointToPolar, rotatePolarPoint
-from design.geometries import Point, linespace, polarToPoint, PolarPoint
+from design.geometricTools.polar import polarToPoints
+from design.geometries import Point, linespace
+from design.pointArray import PointArray, toPointArray
+from design.geometries.nurbs import evaluate_nurbs, evaluate_nurbs_at
+from design.geometries.bezier import evaluate_bezier, adaptive_bezier
+from design.geometries.splines import evaluate_cardinal_spline, evaluate_cardinal_spline_at
+from design.geometries.adaptive import adaptive_point_array
 from math import sin, cos, pi, tau
-from typing import List
+from typing import List, Optional
+import numpy as np
 
 from design.geometricTools.decorators import geometryDecorator
 from math import sin, cos, pi, tau
@@ -16,7 +22,7 @@ def sinusoidalWave(
         segmentsPerPeriod: int = 50,
         extraHalfPeriod: bool = False,
         phaseShift: float = 0,
-) -> List[Point]:
+) -> PointArray:
     """
     Generate a sine wave in Cartesian coordinates using polar coordinates for rotation.
 
@@ -31,29 +37,23 @@ def sinusoidalWave(
     - phaseShift (float): The phase shift of the wave. Defaults to 0.
 
     Returns:
-    - List[Point]: Points representing the sine wave.
+    - PointArray: Points representing the sine wave.
     """
     # Calculate total number of steps
     totalSegments = periods * segmentsPerPeriod
     if extraHalfPeriod:
         totalSegments += int(segmentsPerPeriod / 2)
 
-    # Generate sine wave points
-    points = []
-    for step in range(totalSegments + 1):  # +1 to include the last point
-        # Compute axis distance and sine amplitude
-        axis_distance = step * periodLength / segmentsPerPeriod
-        sine_amplitude = amplitude * sin((step / segmentsPerPeriod) * tau + phaseShift)
+    # Compute axis distance and sine amplitude for all steps at once, +1 to include the last point
+    steps = np.arange(totalSegments + 1)
+    axis_distance = steps * periodLength / segmentsPerPeriod
+    sine_amplitude = amplitude * np.sin((steps / segmentsPerPeriod) * tau + phaseShift)
 
-        # Use polar coordinates to compute the point
-        polar_point = PolarPoint(radious=axis_distance, angle=direction_polar)
-        cartesian_point = polarToPoint(startPoint, polar_point.radious, polar_point.angle)
+    # Use polar coordinates to compute the points along the wave axis
+    points = polarToPoints(startPoint, axis_distance, direction_polar)
 
-        # Adjust the y-coordinate for the sine wave amplitude
-        cartesian_point.y += sine_amplitude
-
-        # Append the point
-        points.append(cartesian_point)
+    # Adjust the y-coordinates for the sine wave amplitude
+    points.y += sine_amplitude
 
     return points
 
@@ -67,7 +67,7 @@ def cosineWave(
         segmentsPerPeriod: int = 50,
         extraHalfPeriod: bool = False,
         phaseShift: float = 0,
-) -> List[Point]:
+) -> PointArray:
     """
     Generate a cosine wave in Cartesian coordinates using polar coordinates for rotation.
 
@@ -82,32 +82,26 @@ def cosineWave(
     - phaseShift (float): The phase shift of the wave. Defaults to 0.
 
     Returns:
-    - List[Point]: Points representing the cosine wave.
+    - PointArray: Points representing the cosine wave.
     """
     # Calculate total number of steps
     totalSegments = periods * segmentsPerPeriod
     if extraHalfPeriod:
         totalSegments += int(segmentsPerPeriod / 2)
 
-    # Generate cosine wave points
-    points = []
     # Starting with a phase shift of tau / 4 (which equals pi/2) to start at the peak
     phaseShift += tau / 2
 
-    for step in range(totalSegments + 1):  # +1 to include the last point
-        # Compute axis distance and cosine amplitude
-        axis_distance = step * periodLength / segmentsPerPeriod
-        cosine_amplitude = (-1) * amplitude * cos((step / segmentsPerPeriod) * tau + phaseShift)
-
-        # Use polar coordinates to compute the point
-        polar_point = PolarPoint(radious=axis_distance, angle=direction_polar)
-        cartesian_point = polarToPoint(startPoint, polar_point.radious, polar_point.angle)
+    # Compute axis distance and cosine amplitude for all steps at once, +1 to include the last point
+    steps = np.arange(totalSegments + 1)
+    axis_distance = steps * periodLength / segmentsPerPeriod
+    cosine_amplitude = (-1) * amplitude * np.cos((steps / segmentsPerPeriod) * tau + phaseShift)
 
-        # Adjust the y-coordinate for the cosine wave amplitude
-        cartesian_point.y += cosine_amplitude
+    # Use polar coordinates to compute the points along the wave axis
+    points = polarToPoints(startPoint, axis_distance, direction_polar)
 
-        # Append the point
-        points.append(cartesian_point)
+    # Adjust the y-coordinates for the cosine wave amplitude
+    points.y += cosine_amplitude
 
     return points
 
@@ -120,7 +114,7 @@ def squareWave(
         periods: int,
         segmentsPerPeriod: int = 16,
         extraHalfPeriod: bool = False,
-) -> List[Point]:
+) -> PointArray:
     """
     Generate a true square wave in Cartesian coordinates using polar coordinates for rotation.
 
@@ -134,32 +128,25 @@ def squareWave(
     - extraHalfPeriod (bool): Whether to add an extra half period. Defaults to False.
 
     Returns:
-    - List[Point]: Points representing the square wave.
+    - PointArray: Points representing the square wave.
     """
-    # Generate square wave points
-    points = []
-    points.append(Point(x=startPoint.x, y=startPoint.y, z=startPoint.z))
-    halfAmplitude = amplitude / 2
-    for period in range(periods):
-        # Generate square wave points for each period
-        points.append(Point(x=startPoint.x + period * periodLength, y=startPoint.y +  amplitude , z=startPoint.z))
-
-        points.append(Point(x=startPoint.x + (period + 0.5) * periodLength, y=startPoint.y +  amplitude , z=startPoint.z)) 
-
-        points.append(Point(x=startPoint.x + (period + 0.5) * periodLength, y=startPoint.y, z=startPoint.z))
+    # Generate square wave corner offsets from the start point, 4 corners per period
+    period = np.arange(periods)
+    offsetX = np.zeros(4 * periods + 1)
+    offsetY = np.zeros(4 * periods + 1)
+    offsetX[1::4] = period * periodLength
+    offsetY[1::4] = amplitude
+    offsetX[2::4] = (period + 0.5) * periodLength
+    offsetY[2::4] = amplitude
+    offsetX[3::4] = (period + 0.5) * periodLength
+    offsetX[4::4] = (period + 1) * periodLength
 
-        points.append(Point(x=startPoint.x + (period + 1) * periodLength, y=startPoint.y, z=startPoint.z))
-
-    print(points)
-    
-    rotatedPoints = []
-    centerPoint = startPoint
-    for point in points:
-        polarPoint = pointToPolar(centerPoint, point)
-        rotatedPolarPoint = rotatePolarPoint(polarPoint, direction_polar)
-        rotatedPoints.append(polarToPoint(centerPoint, rotatedPolarPoint.radious, rotatedPolarPoint.angle))
+    if extraHalfPeriod:
+        # The first half of a period is the raised part of the wave
+        offsetX = np.append(offsetX, [periods * periodLength, (periods + 0.5) * periodLength])
+        offsetY = np.append(offsetY, [amplitude, amplitude])
 
-    return rotatedPoints
+    return orientWave(startPoint, offsetX, offsetY, direction_polar)
 
 @geometryDecorator
 def tringleWave(
@@ -170,7 +157,7 @@ def tringleWave(
         periods: int,
         segmentsPerPeriod: int = 16,
         extraHalfPeriod: bool = False,
-) -> List[Point]:
+) -> PointArray:
     """
     Generate a true tringle wave in Cartesian coordinates using polar coordinates for rotation.
 
@@ -184,29 +171,40 @@ def tringleWave(
     - extraHalfPeriod (bool): Whether to add an extra half period. Defaults to False.
 
     Returns:
-    - List[Point]: Points representing the tringle wave.
+    - PointArray: Points representing the tringle wave.
     """
-    # Generate tringle wave points
-    points = []
-    points.append(Point(x=startPoint.x, y=startPoint.y, z=startPoint.z))
+    # Generate tringle wave vertex offsets from the start point, a peak and a valley per period
+    period = np.arange(periods)
+    offsetX = np.zeros(2 * periods + 1)
+    offsetY = np.zeros(2 * periods + 1)
+    offsetX[1::2] = (period + 0.5) * periodLength
+    offsetY[1::2] = amplitude
+    offsetX[2::2] = (period + 1) * periodLength
 
-    for period in range(periods):
-        # Generate tringle wave points for each period
+    if extraHalfPeriod:
+        # The first half of a period rises to the peak
+        offsetX = np.append(offsetX, (periods + 0.5) * periodLength)
+        offsetY = np.append(offsetY, amplitude)
 
-        points.append(Point(x=startPoint.x + (period + 0.5) * periodLength, y=startPoint.y +  amplitude , z=startPoint.z))
+    return orientWave(startPoint, offsetX, offsetY, direction_polar)
 
-        points.append(Point(x=startPoint.x + (period + 1) * periodLength, y=startPoint.y, z=startPoint.z))
 
-    print(points)
+def orientWave(startPoint: Point, offsetX: np.ndarray, offsetY: np.ndarray, direction_polar: float) -> PointArray:
+    """
+    Rotate wave vertices, given as offsets from the start point along the x-axis, to the wave direction.
 
-    rotatedPoints = []
-    centerPoint = startPoint
-    for point in points:
-        polarPoint = pointToPolar(centerPoint, point)
-        rotatedPolarPoint = rotatePolarPoint(polarPoint, direction_polar)
-        rotatedPoints.append(polarToPoint(centerPoint, rotatedPolarPoint.radious, rotatedPolarPoint.angle))
+    Args:
+        startPoint (Point): The starting point of the wave, center of the rotation.
+        offsetX (np.ndarray): x offsets of the wave vertices.
+        offsetY (np.ndarray): y offsets of the wave vertices.
+        direction_polar (float): The polar angle in radians that determines the direction of the wave.
 
-    return rotatedPoints
+    Returns:
+        PointArray: The rotated wave vertices.
+    """
+    radious = np.hypot(offsetX, offsetY)
+    angle = np.arctan2(offsetY, offsetX) + direction_polar
+    return polarToPoints(startPoint, radious, angle)
 
 
 def add_points(P1: Point, P2: Point) -> Point:
@@ -250,21 +248,23 @@ def cubic_bezier_point(P0: Point, P1: Point, P2: Point, P3: Point, t: float) ->
 
 @geometryDecorator
 def cubic_bezier_curve(
-    P0: Point, P1: Point, P2: Point, P3: Point, num_points: int = 100
-) -> List[Point]:
+    P0: Point, P1: Point, P2: Point, P3: Point, num_points: int = 100, tolerance: Optional[float] = None, min_segment_length: float = 0.0
+) -> PointArray:
     """
-    Generate a list of points approximating a cubic Bézier curve.
+    Generate points approximating a cubic Bézier curve.
 
     Args:
         P0, P1, P2, P3 (Point): Control points of the cubic Bézier curve.
         num_points (int): Number of points to generate along the curve.
+        tolerance (Optional[float]): Maximum chord deviation in mm, if given num_points is ignored and points are placed adaptively.
+        min_segment_length (float): Minimum segment length in mm when sampling adaptively.
 
     Returns:
-        List[Point]: List of points approximating the Bézier curve.
+        PointArray: Points approximating the Bézier curve.
     """
-    t_values = linespace(0.0, 1.0, num_points)
-    curve_points = [cubic_bezier_point(P0, P1, P2, P3, t) for t in t_values]
-    return curve_points
+    if tolerance is not None:
+        return adaptive_bezier(PointArray.fromPoints([P0, P1, P2, P3]), tolerance, min_segment_length)
+    return evaluate_bezier(PointArray.fromPoints([P0, P1, P2, P3]), num_points)
 
 
 def de_casteljau(control_points: List[Point], t: float) -> Point:
@@ -289,13 +289,26 @@ def de_casteljau(control_points: List[Point], t: float) -> Point:
     return points[0]
 
 @geometryDecorator
-def bezier_curve_de_casteljau(control_points: List[Point], num_points: int = 1000) -> List[Point]:
-    t_values = linespace(0.0, 1.0, num_points)
-    curve_points = [de_casteljau(control_points, t) for t in t_values]
-    return curve_points
+def bezier_curve_de_casteljau(control_points: List[Point], num_points: int = 1000, tolerance: Optional[float] = None, min_segment_length: float = 0.0) -> PointArray:
+    """
+    Generate points approximating a Bézier curve of any degree.
+
+    Args:
+        control_points (List[Point]): List of control points.
+        num_points (int): Number of evenly spaced points to generate along the curve.
+        tolerance (Optional[float]): If given, num_points is ignored and the curve is subdivided adaptively
+            until it deviates less than tolerance (in mm) from the generated path, suited for very high degrees.
+        min_segment_length (float): Minimum segment length in mm when sampling adaptively.
+
+    Returns:
+        PointArray: Points approximating the Bézier curve.
+    """
+    if tolerance is not None:
+        return adaptive_bezier(toPointArray(control_points), tolerance, min_segment_length)
+    return evaluate_bezier(toPointArray(control_points), num_points)
 
 @geometryDecorator
-def cardinal_spline(points: List[Point], tension: float = 0.0, resolution: int = 10) -> List[Point]:
+def cardinal_spline(points: List[Point], tension: float = 0.0, resolution: int = 10, tolerance: Optional[float] = None, min_segment_length: float = 0.0) -> PointArray:
     """
     Generates a Cardinal Spline based on given control points.
 
@@ -303,50 +316,25 @@ def cardinal_spline(points: List[Point], tension: float = 0.0, resolution: int =
         points (List[Point]): List of control points through which the spline will pass.
         tension (float): The tension parameter. Range -1 to 1, where -1 is very tight, and 1 is very loose.
         resolution (int): The number of interpolated points between each pair of control points.
+        tolerance (Optional[float]): Maximum chord deviation in mm, if given resolution is ignored and points are placed adaptively.
+        min_segment_length (float): Minimum segment length in mm when sampling adaptively.
 
     Returns:
-        List[Point]: The list of points representing the interpolated Cardinal Spline.
+        PointArray: The points representing the interpolated Cardinal Spline.
     """
     if len(points) < 2:
         raise ValueError("At least two points are required to generate a cardinal spline.")
 
-    spline_points = []
-
-    # Iterate through each pair of control points
-    for i in range(len(points) - 1):
-        p0 = points[i - 1] if i > 0 else points[i]
-        p1 = points[i]
-        p2 = points[i + 1]
-        p3 = points[i + 2] if i + 2 < len(points) else points[i + 1]
-
-        # Compute interpolated points between p1 and p2
-        tValuese = linespace(0, 1, resolution)
-        for t in tValuese:
-            # Hermite basis functions (modified by tension)
-            t2 = t * t
-            t3 = t2 * t
+    control_points = toPointArray(points)
+    if tolerance is not None:
+        segments = len(control_points) - 1
+        return adaptive_point_array(
+            lambda parameters: evaluate_cardinal_spline_at(control_points, tension, parameters),
+            0.0, segments, tolerance, min_segment_length, initial_segments=4 * segments)
 
-            h1 = 2 * t3 - 3 * t2 + 1
-            h2 = -2 * t3 + 3 * t2
-            h3 = t3 - 2 * t2 + t
-            h4 = t3 - t2
+    return evaluate_cardinal_spline(control_points, tension, resolution)
 
-            # Tension adjustment
-            m1_x = (1 - tension) * (p2.x - p0.x) / 2
-            m1_y = (1 - tension) * (p2.y - p0.y) / 2
-            m2_x = (1 - tension) * (p3.x - p1.x) / 2
-            m2_y = (1 - tension) * (p3.y - p1.y) / 2
-
-            # Interpolated point
-            x = h1 * p1.x + h2 * p2.x + h3 * m1_x + h4 * m2_x
-            y = h1 * p1.y + h2 * p2.y + h3 * m1_y + h4 * m2_y
-            z = p1.z  # Retain the z-coordinate from the control point p1 for simplicity
-
-            spline_points.append(Point(x=x, y=y, z=z))
-
-    return spline_points
-
-def catmull_rom_spline(points: List[Point], resolution: int = 10) -> List[Point]:
+def catmull_rom_spline(points: List[Point], resolution: int = 10) -> dict:
     """
     Generates a Catmull-Rom Spline based on given control points.
 
@@ -355,7 +343,7 @@ def catmull_rom_spline(points: List[Point], resolution: int = 10) -> List[Point]
         resolution (int): The number of interpolated points between each pair of control points.
 
     Returns:
-        List[Point]: The list of points representing the interpolated Catmull-Rom Spline.
+        dict: A dictionary with key 'shape' holding the points of the interpolated Catmull-Rom Spline.
     """
     return cardinal_spline(points, tension=0.0, resolution=resolution)
 
@@ -397,7 +385,7 @@ def generate_open_uniform_knot_vector(num_control_points: int, degree: int) -> L
 
 
 @geometryDecorator
-def nurbs_curve(control_points: List[Point], weights: List[float], degree: int, num_points: int = 100) -> List[Point]:
+def nurbs_curve(control_points: List[Point], weights: List[float], degree: int, num_points: int = 100, knot_vector: Optional[List[float]] = None, tolerance: Optional[float] = None, min_segment_length: float = 0.0) -> PointArray:
     """
     Generate a NURBS curve from control points, weights, and degree.
 
@@ -406,31 +394,25 @@ def nurbs_curve(control_points: List[Point], weights: List[float], degree: int,
         weights (List[float]): Weights for each control point.
         degree (int): Degree of the NURBS curve.
         num_points (int): Number of points to generate for the curve.
+        knot_vector (Optional[List[float]]): Knot vector, an open uniform one is generated if not given.
+        tolerance (Optional[float]): Maximum chord deviation in mm, if given num_points is ignored and points are placed adaptively.
+        min_segment_length (float): Minimum segment length in mm when sampling adaptively.
 
     Returns:
-        List[Point]: List of points representing the NURBS curve.
+        PointArray: Points representing the NURBS curve.
     """
     # Automatically generate the knot vector based on control points and degree
     num_control_points = len(control_points)
-    knot_vector = generate_open_uniform_knot_vector(num_control_points, degree)
+    if knot_vector is None:
+        knot_vector = generate_open_uniform_knot_vector(num_control_points, degree)
 
     # Number of knots should match `num_control_points + degree + 1`
     assert len(knot_vector) == num_control_points + degree + 1, "Incorrect knot vector length."
 
-    # Generate NURBS points
-    curve_points = []
-    t_values = linespace(knot_vector[degree], knot_vector[-degree - 1], num_points)
-
-    for t in t_values:
-        numerator = Point(x=0, y=0, z=0, e=0)
-        denominator = 0.0
-        for i in range(num_control_points):
-            basis = basis_function(i, degree + 1, t, knot_vector)
-            weighted_basis = basis * weights[i]
-            numerator = add_points(numerator, multiply_point_scalar(control_points[i], weighted_basis))
-            denominator += weighted_basis
-
-        if denominator != 0:
-            curve_points.append(multiply_point_scalar(numerator, 1 / denominator))
+    if tolerance is not None:
+        points = toPointArray(control_points)
+        return adaptive_point_array(
+            lambda parameters: evaluate_nurbs_at(points, weights, degree, knot_vector, parameters),
+            knot_vector[degree], knot_vector[-degree - 1], tolerance, min_segment_length, initial_segments=4 * num_control_points)
 
-    return curve_points
\ No newline at end of file
+    return evaluate_nurbs(toPointArray(control_points), weights, degree, knot_vector, num_points)
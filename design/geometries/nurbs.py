@@ -0,0 +1,159 @@
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+
+from design.pointArray import PointArray
+
+
+def find_knot_spans(knot_vector: np.ndarray, degree: int, parameters: np.ndarray) -> np.ndarray:
+    """
+    Find the knot span index of every parameter with a binary search over the knot vector.
+
+    The span i satisfies knot_vector[i] <= t < knot_vector[i + 1]; the end of the domain is assigned
+    to the last non-empty span so that the curve reaches its last point.
+
+    Args:
+        knot_vector (np.ndarray): Non-decreasing knot vector.
+        degree (int): Degree of the curve.
+        parameters (np.ndarray): Parameters inside the curve domain.
+
+    Returns:
+        np.ndarray: Span index for every parameter.
+    """
+    domain_end = knot_vector[-degree - 1]
+    spans = np.searchsorted(knot_vector, parameters, side='right') - 1
+    end_span = np.searchsorted(knot_vector, domain_end, side='left') - 1
+    spans = np.where(parameters >= domain_end, end_span, spans)
+    return np.clip(spans, degree, len(knot_vector) - degree - 2)
+
+
+def basis_functions(knot_vector: np.ndarray, degree: int, parameters: np.ndarray, spans: np.ndarray) -> np.ndarray:
+    """
+    Compute the non-zero B-spline basis functions with the iterative Cox–de Boor recurrence, for all parameters at once.
+
+    Args:
+        knot_vector (np.ndarray): Non-decreasing knot vector.
+        degree (int): Degree of the curve.
+        parameters (np.ndarray): Parameters to evaluate at.
+        spans (np.ndarray): Knot span of every parameter, see find_knot_spans.
+
+    Returns:
+        np.ndarray: (len(parameters), degree + 1) array, row k holds N[spans[k] - degree .. spans[k]] at parameters[k].
+    """
+    count = len(parameters)
+    basis = np.zeros((count, degree + 1))
+    basis[:, 0] = 1.0
+    left = np.zeros((count, degree + 1))
+    right = np.zeros((count, degree + 1))
+
+    for j in range(1, degree + 1):
+        left[:, j] = parameters - knot_vector[spans + 1 - j]
+        right[:, j] = knot_vector[spans + j] - parameters
+        saved = np.zeros(count)
+        for r in range(j):
+            denominator = right[:, r + 1] + left[:, j - r]
+            temp = np.divide(basis[:, r], denominator, out=np.zeros(count), where=denominator != 0)
+            basis[:, r] = saved + right[:, r + 1] * temp
+            saved = left[:, j - r] * temp
+        basis[:, j] = saved
+
+    return basis
+
+
+def basis_matrix(knot_vector: Sequence[float], degree: int, parameters: np.ndarray) -> np.ndarray:
+    """
+    Build the dense (parameters x control points) B-spline basis matrix.
+
+    Args:
+        knot_vector (Sequence[float]): Non-decreasing knot vector.
+        degree (int): Degree of the curve.
+        parameters (np.ndarray): Parameters to evaluate at.
+
+    Returns:
+        np.ndarray: (len(parameters), len(knot_vector) - degree - 1) basis matrix.
+    """
+    knots = np.asarray(knot_vector, dtype=float)
+    parameters = np.asarray(parameters, dtype=float)
+    spans = find_knot_spans(knots, degree, parameters)
+    values = basis_functions(knots, degree, parameters, spans)
+
+    matrix = np.zeros((len(parameters), len(knots) - degree - 1))
+    rows = np.arange(len(parameters))[:, None]
+    columns = spans[:, None] - degree + np.arange(degree + 1)
+    matrix[rows, columns] = values
+    return matrix
+
+
+@lru_cache(maxsize=64)
+def cached_basis_matrix(knot_vector: tuple, degree: int, num_points: int) -> np.ndarray:
+    """
+    Basis matrix for num_points parameters spread evenly over the curve domain, cached by its arguments.
+    The returned matrix is read-only as it is shared between calls.
+
+    Args:
+        knot_vector (tuple): Non-decreasing knot vector.
+        degree (int): Degree of the curve.
+        num_points (int): Number of parameters.
+
+    Returns:
+        np.ndarray: (num_points, len(knot_vector) - degree - 1) basis matrix.
+    """
+    parameters = np.linspace(knot_vector[degree], knot_vector[-degree - 1], num_points)
+    matrix = basis_matrix(knot_vector, degree, parameters)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def rational_basis(basis: np.ndarray, weights: Sequence[float]) -> np.ndarray:
+    """
+    Turn a B-spline basis matrix into the NURBS one: R = N * w / sum(N * w).
+    Rows where all weighted basis functions vanish are dropped.
+
+    Args:
+        basis (np.ndarray): (parameters x control points) B-spline basis matrix.
+        weights (Sequence[float]): Weights for each control point.
+
+    Returns:
+        np.ndarray: the rational basis matrix.
+    """
+    weighted = basis * np.asarray(weights, dtype=float)
+    denominator = weighted.sum(axis=1)
+    valid = denominator != 0
+    return weighted[valid] / denominator[valid, None]
+
+
+def evaluate_nurbs(control_points: PointArray, weights: Sequence[float], degree: int, knot_vector: Sequence[float], num_points: int = 100) -> PointArray:
+    """
+    Evaluate a NURBS curve at num_points evenly spaced parameters as a single matrix product.
+    The basis matrix is cached, so evaluating again with new control points or weights does not recompute it.
+
+    Args:
+        control_points (PointArray): Control points.
+        weights (Sequence[float]): Weights for each control point.
+        degree (int): Degree of the curve.
+        knot_vector (Sequence[float]): Knot vector, len(control_points) + degree + 1 long.
+        num_points (int): Number of points to generate.
+
+    Returns:
+        PointArray: Points of the curve.
+    """
+    basis = cached_basis_matrix(tuple(float(knot) for knot in knot_vector), degree, num_points)
+    return control_points.combine(rational_basis(basis, weights))
+
+
+def evaluate_nurbs_at(control_points: PointArray, weights: Sequence[float], degree: int, knot_vector: Sequence[float], parameters: np.ndarray) -> PointArray:
+    """
+    Evaluate a NURBS curve at arbitrary parameters, e.g. the ones chosen by adaptive sampling.
+
+    Args:
+        control_points (PointArray): Control points.
+        weights (Sequence[float]): Weights for each control point.
+        degree (int): Degree of the curve.
+        knot_vector (Sequence[float]): Knot vector, len(control_points) + degree + 1 long.
+        parameters (np.ndarray): Parameters inside the curve domain.
+
+    Returns:
+        PointArray: Points of the curve.
+    """
+    return control_points.combine(rational_basis(basis_matrix(knot_vector, degree, parameters), weights))
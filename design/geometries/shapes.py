@@ -1,9 +1,12 @@
-from math import pi, sin, cos
+from math import pi, sin, cos, ceil
 from platform import android_ver
-from typing import Callable, List
+from typing import Callable, List, Optional
+import numpy as np
 from design.geometricTools.decorators import geometryDecorator
 
-from design.geometries import Point, linespace, polarToPoint
+from design.pointArray import PointArray
+from design.geometries.adaptive import adaptive_point_array
+from design.geometries import Point, linespace, linespaceArray, polarToPoint, polarToPoints
 
 @geometryDecorator
 def rectangle(startPoint: Point, width: float, height: float) -> list:
@@ -44,8 +47,23 @@ def square(startPoint: Point, side: float) -> list:
 
     return [startPoint.copy(), point2, point3, point4, startPoint.copy()]
 
+def initialAngularSegments(startAngle: float, endAngle: float, segmentsPerTurn: int = 16) -> int:
+    """
+    Starting grid for adaptive sampling of shapes swept around a center. Every turn gets segmentsPerTurn segments,
+    so that whole turns cannot hide between two samples.
+    Args:
+        startAngle (float): start angle of the shape
+        endAngle (float): end angle of the shape
+        segmentsPerTurn (int): number of segments per full turn
+
+    Returns:
+        int: number of segments of the starting grid
+    """
+
+    return max(segmentsPerTurn, ceil(abs(endAngle - startAngle) / (2 * pi) * segmentsPerTurn))
+
 @geometryDecorator
-def arcXY(center: Point, radious: float, startAngle: float, endAngle: float, segments: int = 100) -> list:
+def arcXY(center: Point, radious: float, startAngle: float, endAngle: float, segments: int = 100, tolerance: Optional[float] = None, minSegmentLength: float = 0.0) -> PointArray:
     """
 
     generate a 2d XY arc starting at a given point
@@ -55,21 +73,30 @@ def arcXY(center: Point, radious: float, startAngle: float, endAngle: float, seg
         startAngle (float): start angle of the arc
         endAngle (float): end angle of the arc
         segments (int): number of segments arc should be devided to
+        tolerance (Optional[float]): maximum chord deviation in mm, if given segments is ignored and points are placed adaptively
+        minSegmentLength (float): minimum segment length in mm when sampling adaptively
     Returns:
-        list:   list of points that define the arc
+        PointArray:   points that define the arc
 
     """
 
-    angles = linespace(startAngle, endAngle, segments)
+    if tolerance is not None:
+        points = adaptive_point_array(lambda angles: polarToPoints(center, radious, angles), startAngle, endAngle, tolerance, minSegmentLength,
+                                      initialAngularSegments(startAngle, endAngle))
+        if endAngle - startAngle == 2 * pi:
+            points.data[:, -1] = points.data[:, 0]
+        return points
+
+    angles = linespaceArray(startAngle, endAngle, segments)
     if endAngle - startAngle != 2 * pi:
-        return [polarToPoint(center, radious, angle) for angle in angles]
+        return polarToPoints(center, radious, angles)
 
     else:
         angles[-1] = angles[0]
-        return [polarToPoint(center, radious, angle) for angle in angles]
+        return polarToPoints(center, radious, angles)
 
 @geometryDecorator
-def varyingArc(center: Point, startRadious: float, endRadious: float, startAngle: float, endAngle: float, segments: int = 100) -> list:
+def varyingArc(center: Point, startRadious: float, endRadious: float, startAngle: float, endAngle: float, segments: int = 100, tolerance: Optional[float] = None, minSegmentLength: float = 0.0) -> PointArray:
     """
 
     generate a 2d XY arc starting at a given point
@@ -80,16 +107,23 @@ def varyingArc(center: Point, startRadious: float, endRadious: float, startAngle
         startAngle (float): start angle of the arc
         endAngle (float): end angle of the arc
         segments (int): number of segments arc should be devided to
+        tolerance (Optional[float]): maximum chord deviation in mm, if given segments is ignored and points are placed adaptively
+        minSegmentLength (float): minimum segment length in mm when sampling adaptively
     Returns:
-        list:   list of points that define the arc
+        PointArray:   points that define the arc
 
     """
-    radious = linespace(startRadious, endRadious, segments)
-    angles = linespace(startAngle, endAngle, segments)
-    return [polarToPoint(center, radious, angle) for radious, angle in zip(radious, angles)]
+    if tolerance is not None:
+        return adaptive_point_array(
+            lambda t: polarToPoints(center, startRadious + t * (endRadious - startRadious), startAngle + t * (endAngle - startAngle)),
+            0.0, 1.0, tolerance, minSegmentLength, initialAngularSegments(startAngle, endAngle))
+
+    radious = linespaceArray(startRadious, endRadious, segments)
+    angles = linespaceArray(startAngle, endAngle, segments)
+    return polarToPoints(center, radious, angles)
 
 
-def circle(center: Point, radious: float, segments: int = 100) -> list:
+def circle(center: Point, radious: float, segments: int = 100, tolerance: Optional[float] = None, minSegmentLength: float = 0.0) -> list:
     """
 
     generate a 2d XY circle starting at a given point
@@ -97,15 +131,17 @@ def circle(center: Point, radious: float, segments: int = 100) -> list:
         center (Point): point where the circle center is
         radious (float): radious of the circle
         segments (int): number of segments circle should be devided to
+        tolerance (Optional[float]): maximum chord deviation in mm, if given segments is ignored and points are placed adaptively
+        minSegmentLength (float): minimum segment length in mm when sampling adaptively
     Returns:
         list:   list of points that define the circle
 
     """
 
-    return arcXY(center, radious, 0, 2*pi, segments)
+    return arcXY(center, radious, 0, 2*pi, segments, tolerance, minSegmentLength)
 
 @geometryDecorator
-def spiral(center: Point, startRadious: float, endRadious: float, startAngle: float, endAngle: float, segments: int = 100) -> list:
+def spiral(center: Point, startRadious: float, endRadious: float, startAngle: float, endAngle: float, segments: int = 100, tolerance: Optional[float] = None, minSegmentLength: float = 0.0) -> PointArray:
     """
 
     generate a 2d XY spiral starting at a given point
@@ -116,17 +152,24 @@ def spiral(center: Point, startRadious: float, endRadious: float, startAngle: fl
         startAngle (float): start angle of the spiral
         endAngle (float): end angle of the spiral
         segments (int): number of segments spiral should be devided to
+        tolerance (Optional[float]): maximum chord deviation in mm, if given segments is ignored and points are placed adaptively
+        minSegmentLength (float): minimum segment length in mm when sampling adaptively
     Returns:
-        list:   list of points that define the spiral
+        PointArray:   points that define the spiral
 
     """
 
-    radious = linespace(startRadious, endRadious, segments)
-    angles = linespace(startAngle, endAngle, segments)
-    return [polarToPoint(center, radious, angle) for radious, angle in zip(radious, angles)]
+    if tolerance is not None:
+        return adaptive_point_array(
+            lambda t: polarToPoints(center, startRadious + t * (endRadious - startRadious), startAngle + t * (endAngle - startAngle)),
+            0.0, 1.0, tolerance, minSegmentLength, initialAngularSegments(startAngle, endAngle))
+
+    radious = linespaceArray(startRadious, endRadious, segments)
+    angles = linespaceArray(startAngle, endAngle, segments)
+    return polarToPoints(center, radious, angles)
 
 @geometryDecorator
-def helix(center: Point, startRadious: float, endRadious: float, startAngle: float, endAngle: float, startZ: float, endZ: float, segments: int = 100) -> list:
+def helix(center: Point, startRadious: float, endRadious: float, startAngle: float, endAngle: float, startZ: float, endZ: float, segments: int = 100, tolerance: Optional[float] = None, minSegmentLength: float = 0.0) -> PointArray:
     """
 
     generate a 3d XYZ helix starting at a given point
@@ -139,18 +182,25 @@ def helix(center: Point, startRadious: float, endRadious: float, startAngle: flo
         startZ (float): start z of the helix
         endZ (float): end z of the helix
         segments (int): number of segments helix should be devided to
+        tolerance (Optional[float]): maximum chord deviation in mm, if given segments is ignored and points are placed adaptively
+        minSegmentLength (float): minimum segment length in mm when sampling adaptively
     Returns:
-        list:   list of points that define the helix
+        PointArray:   points that define the helix
 
     """
 
-    radious = linespace(startRadious, endRadious, segments)
-    angles = linespace(startAngle, endAngle, segments)
-    z = linespace(startZ, endZ, segments)
-    return [Point(x = polarToPoint(center, radious, angle).x, y = polarToPoint(center, radious, angle).y, z = z) for radious, angle, z in zip(radious, angles, z)]
+    if tolerance is not None:
+        return adaptive_point_array(
+            lambda t: polarToPoints(center, startRadious + t * (endRadious - startRadious), startAngle + t * (endAngle - startAngle), startZ + t * (endZ - startZ)),
+            0.0, 1.0, tolerance, minSegmentLength, initialAngularSegments(startAngle, endAngle))
+
+    radious = linespaceArray(startRadious, endRadious, segments)
+    angles = linespaceArray(startAngle, endAngle, segments)
+    z = linespaceArray(startZ, endZ, segments)
+    return polarToPoints(center, radious, angles, z)
 
 @geometryDecorator
-def polygon(center: Point, radious: float, sides: int) -> list:
+def polygon(center: Point, radious: float, sides: int) -> PointArray:
     """
 
     generate a 2d XY polygon with a center at a given point and a given number of sides
@@ -161,17 +211,16 @@ def polygon(center: Point, radious: float, sides: int) -> list:
         radious (float): radious of the polygon
         sides (int): number of sides of the polygon
     Returns:
-        list:   list of points that define the polygon
+        PointArray:   points that define the polygon
 
     """
 
-    angles = linespace(0, 2*pi, sides + 1)
-    midPoints = [polarToPoint(center, radious, angle) for angle in angles]
-    midPoints[-1] = midPoints[0]
-    return midPoints
+    angles = linespaceArray(0, 2*pi, sides + 1)
+    angles[-1] = angles[0]
+    return polarToPoints(center, radious, angles)
 
 @geometryDecorator
-def generatePolarShape(center: Point, polar_function: Callable[[float], float], start_angle: float = 0, end_angle: float = 2 * pi, segments: int = 100) -> List[Point]:
+def generatePolarShape(center: Point, polar_function: Callable[[float], float], start_angle: float = 0, end_angle: float = 2 * pi, segments: int = 100, vectorized: Optional[bool] = None, tolerance: Optional[float] = None, minSegmentLength: float = 0.0) -> PointArray:
     """
     Generates points that approximate a shape defined by a polar equation.
 
@@ -181,26 +230,57 @@ def generatePolarShape(center: Point, polar_function: Callable[[float], float],
         start_angle (float): The start angle in radians.
         end_angle (float): The end angle in radians.
         segments (int): The number of segments to divide the shape.
+        vectorized (Optional[bool]): Whether polar_function accepts a numpy array of angles and returns an array of radii.
+            When None, an array call is attempted and the per-angle loop is used if the function cannot handle it.
+        tolerance (Optional[float]): Maximum chord deviation in mm, if given segments is ignored and points are placed adaptively.
+        minSegmentLength (float): Minimum segment length in mm when sampling adaptively.
 
     Returns:
-        List[Point]: A list of Point objects that define the shape.
+        PointArray: Points that define the shape.
     """
-    angles = linespace(start_angle, end_angle, segments)
-    points = []
-    if end_angle - start_angle == 2 * pi:
-        for angle in angles:
-            radius = polar_function(angle)
-            point = polarToPoint(center, radius, angle)
-            points.append(point)
-        points[-1] = points[0]
+    if tolerance is not None:
+        # Radial functions can have many lobes, so the starting grid is finer than for plain arcs
+        points = adaptive_point_array(
+            lambda angles: polarToPoints(center, evaluatePolarFunction(polar_function, angles, vectorized), angles),
+            start_angle, end_angle, tolerance, minSegmentLength, initialAngularSegments(start_angle, end_angle, 64))
     else:
-        for angle in angles:
-            radius = polar_function(angle)
-            point = polarToPoint(center, radius, angle)
-            points.append(point)
+        angles = linespaceArray(start_angle, end_angle, segments)
+        radii = evaluatePolarFunction(polar_function, angles, vectorized)
+        points = polarToPoints(center, radii, angles)
+
+    if end_angle - start_angle == 2 * pi:
+        points.data[:, -1] = points.data[:, 0]
 
     return points
 
+def evaluatePolarFunction(polar_function: Callable[[float], float], angles: np.ndarray, vectorized: Optional[bool] = None) -> np.ndarray:
+    """
+    Evaluates a radial function over all angles, in one call if the function is array-capable.
+
+    Args:
+        polar_function (Callable[[float], float]): A function that takes an angle (in radians) and returns the radius.
+        angles (np.ndarray): Angles to evaluate the function at.
+        vectorized (Optional[bool]): True to call the function once with the whole array, False to call it per angle,
+            None to detect which one works.
+
+    Returns:
+        np.ndarray: Radii for all angles.
+    """
+    if vectorized or vectorized is None:
+        try:
+            radii = np.asarray(polar_function(angles), dtype=float)
+        except (TypeError, ValueError):
+            if vectorized:
+                raise
+        else:
+            if vectorized:
+                return np.broadcast_to(radii, angles.shape)
+            # A scalar-only function may still return something for an array, only trust a radius per angle
+            if radii.shape == angles.shape:
+                return radii
+
+    return np.fromiter((polar_function(angle) for angle in angles.tolist()), dtype=float, count=len(angles))
+
 
 
 def polar_function_1(angle: float) -> float:
@@ -208,13 +288,13 @@ def polar_function_1(angle: float) -> float:
     r1 = 4
     r2 = 1
     r3 = 12
-    return 10*(r1 + r2 * cos(r3 * angle))
+    return 10*(r1 + r2 * np.cos(r3 * angle))
 
 
 def polar_function_2(angle: float) -> float:
     # Second equation: r = sin(a/b * θ) + 2
     a = 9
     b = -5
-    return sin(a / b * angle) + 2
+    return np.sin(a / b * angle) + 2
 
 
@@ -0,0 +1,108 @@
+from functools import lru_cache
+
+import numpy as np
+
+from design.geometricTools.baseTools import linespaceArray
+from design.pointArray import PointArray
+
+
+@lru_cache(maxsize=64)
+def hermite_basis(resolution: int) -> np.ndarray:
+    """
+    The four cubic Hermite basis polynomials sampled at resolution evenly spaced t in [0, 1], cached by resolution.
+    The returned matrix is read-only as it is shared between calls.
+
+    Args:
+        resolution (int): The number of samples per spline segment.
+
+    Returns:
+        np.ndarray: (resolution, 4) matrix with columns h1, h2, h3, h4.
+    """
+    t = linespaceArray(0, 1, resolution)
+    t2 = t * t
+    t3 = t2 * t
+
+    basis = np.column_stack((
+        2 * t3 - 3 * t2 + 1,
+        -2 * t3 + 3 * t2,
+        t3 - 2 * t2 + t,
+        t3 - t2,
+    ))
+    basis.flags.writeable = False
+    return basis
+
+
+def hermite_segments(control_points: PointArray, tension: float) -> np.ndarray:
+    """
+    Hermite form of every spline segment: its start, end and the tension adjusted tangents at both,
+    computed in one pass over the control point arrays.
+
+    Args:
+        control_points (PointArray): Control points through which the spline will pass.
+        tension (float): The tension parameter. Range -1 to 1, where -1 is very tight, and 1 is very loose.
+
+    Returns:
+        np.ndarray: (segments, 4, 4) array, [segment, (p1, p2, m1, m2), (x, y, z, e)].
+    """
+    points = np.nan_to_num(control_points.data.T)
+
+    # End segments use their own end point in place of the missing neighbour
+    p0 = np.concatenate((points[:1], points[:-2]))
+    p1 = points[:-1]
+    p2 = points[1:]
+    p3 = np.concatenate((points[2:], points[-1:]))
+
+    # Tension adjusted tangents at the start and the end of every segment
+    m1 = (1 - tension) * (p2 - p0) / 2
+    m2 = (1 - tension) * (p3 - p1) / 2
+
+    return np.stack((p1, p2, m1, m2), axis=1)
+
+
+def evaluate_cardinal_spline(control_points: PointArray, tension: float = 0.0, resolution: int = 10) -> PointArray:
+    """
+    Evaluate a Cardinal spline through all control points at once.
+
+    Every segment is sampled with the same cached Hermite basis in one product. All coordinates are
+    interpolated, including z; extrusion is interpolated only if the control points define it.
+
+    Args:
+        control_points (PointArray): Control points through which the spline will pass.
+        tension (float): The tension parameter. Range -1 to 1, where -1 is very tight, and 1 is very loose.
+        resolution (int): The number of interpolated points between each pair of control points.
+
+    Returns:
+        PointArray: resolution points per segment, segments following each other.
+    """
+    hasExtrusion = not np.isnan(control_points.e).all()
+    segments = hermite_segments(control_points, tension)
+    spline = np.einsum('rk,skc->src', hermite_basis(resolution), segments).reshape(-1, 4)
+
+    return PointArray(spline[:, 0], spline[:, 1], spline[:, 2], spline[:, 3] if hasExtrusion else None)
+
+
+def evaluate_cardinal_spline_at(control_points: PointArray, tension: float, parameters: np.ndarray) -> PointArray:
+    """
+    Evaluate a Cardinal spline at arbitrary parameters, e.g. the ones chosen by adaptive sampling.
+    Parameter s lies on segment floor(s), so the spline runs from 0 to len(control_points) - 1.
+
+    Args:
+        control_points (PointArray): Control points through which the spline will pass.
+        tension (float): The tension parameter. Range -1 to 1, where -1 is very tight, and 1 is very loose.
+        parameters (np.ndarray): Parameters between 0 and len(control_points) - 1.
+
+    Returns:
+        PointArray: Points of the spline.
+    """
+    hasExtrusion = not np.isnan(control_points.e).all()
+    segments = hermite_segments(control_points, tension)
+
+    parameters = np.asarray(parameters, dtype=float)
+    index = np.clip(np.floor(parameters).astype(int), 0, len(segments) - 1)
+    t = parameters - index
+    t2 = t * t
+    t3 = t2 * t
+    basis = np.column_stack((2 * t3 - 3 * t2 + 1, -2 * t3 + 3 * t2, t3 - 2 * t2 + t, t3 - t2))
+
+    spline = np.einsum('rk,rkc->rc', basis, segments[index])
+    return PointArray(spline[:, 0], spline[:, 1], spline[:, 2], spline[:, 3] if hasExtrusion else None)
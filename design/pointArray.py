@@ -0,0 +1,275 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Union
+
+from design.point import Point
+
+
+class PointView:
+    """
+    A lightweight, Point-compatible view of a single vertex stored inside a PointArray.
+
+    Reading and writing x, y, z and e goes straight to the underlying arrays, so existing scripts
+    that do ``shape['shape'][i].z += 1`` keep working on array-backed shapes.
+    """
+
+    __slots__ = ('_array', '_index')
+
+    def __init__(self, array: 'PointArray', index: int):
+        self._array = array
+        self._index = index
+
+    @property
+    def x(self) -> float:
+        return float(self._array.data[0, self._index])
+
+    @x.setter
+    def x(self, value: float):
+        self._array.data[0, self._index] = value
+
+    @property
+    def y(self) -> float:
+        return float(self._array.data[1, self._index])
+
+    @y.setter
+    def y(self, value: float):
+        self._array.data[1, self._index] = value
+
+    @property
+    def z(self) -> float:
+        return float(self._array.data[2, self._index])
+
+    @z.setter
+    def z(self, value: float):
+        self._array.data[2, self._index] = value
+
+    @property
+    def e(self) -> Optional[float]:
+        value = self._array.data[3, self._index]
+        return None if np.isnan(value) else float(value)
+
+    @e.setter
+    def e(self, value: Optional[float]):
+        self._array.data[3, self._index] = np.nan if value is None else value
+
+    def toPoint(self) -> Point:
+        """
+        Returns: a standalone Point holding the values of this vertex
+        """
+        return Point(x=self.x, y=self.y, z=self.z, e=self.e)
+
+    def copy(self) -> Point:
+        return self.toPoint()
+
+    def listRepresentation(self):
+        return [self.x, self.y, self.z]
+
+    def __eq__(self, other):
+        if isinstance(other, (Point, PointView)):
+            return self.x == other.x and self.y == other.y and self.z == other.z and self.e == other.e
+        return NotImplemented
+
+    def __str__(self):
+        return f"[{self.x}, {self.y}, {self.z}]"
+
+    def __repr__(self):
+        return f"PointView(x={self.x}, y={self.y}, z={self.z}, e={self.e})"
+
+
+class PointArray:
+    """
+    Struct-of-arrays container for a toolpath.
+
+    Coordinates are kept in a single (4, N) float array, so x, y, z and e are each contiguous rows.
+    Missing extrusion values (``Point.e is None``) are stored as NaN. Optional per-vertex channels
+    (e.g. speed or width) live in ``channels`` as arrays of length N.
+
+    The container behaves like a sequence of points: ``len``, iteration and integer indexing yield
+    PointView objects, slicing yields a new PointArray.
+
+    Attributes:
+        data (np.ndarray): (4, N) array holding x, y, z and e rows
+        channels (Dict[str, np.ndarray]): optional per-vertex data
+        cache (dict): derived data kept with the shape, such as its edge index, not carried over to copies
+    """
+
+    __slots__ = ('data', 'channels', '_cache')
+
+    def __init__(self, x, y, z=None, e=None, channels: Optional[Dict[str, np.ndarray]] = None):
+        x = np.asarray(x, dtype=float)
+        length = x.shape[0]
+        self.data = np.empty((4, length), dtype=float)
+        self.data[0] = x
+        self.data[1] = y
+        self.data[2] = 0.0 if z is None else z
+        self.data[3] = np.nan if e is None else e
+        self.channels = {name: np.asarray(values) for name, values in (channels or {}).items()}
+
+    @classmethod
+    def fromPoints(cls, points: Iterable[Union[Point, PointView]]) -> 'PointArray':
+        """
+        Build a PointArray from a sequence of Point objects. None coordinates become 0, None extrusion becomes NaN.
+        """
+        if isinstance(points, PointArray):
+            return points.copy()
+        values = [(p.x or 0.0, p.y or 0.0, p.z or 0.0, np.nan if p.e is None else p.e) for p in points]
+        data = np.array(values, dtype=float).reshape(-1, 4).T
+        return cls(data[0], data[1], data[2], data[3])
+
+    @classmethod
+    def fromArray(cls, coordinates: np.ndarray) -> 'PointArray':
+        """
+        Build a PointArray from an (N, 3) or (N, 4) array of x, y, z [, e] rows.
+        """
+        coordinates = np.asarray(coordinates, dtype=float)
+        e = coordinates[:, 3] if coordinates.shape[1] > 3 else None
+        return cls(coordinates[:, 0], coordinates[:, 1], coordinates[:, 2], e)
+
+    @classmethod
+    def concatenate(cls, arrays: Iterable['PointArray']) -> 'PointArray':
+        """
+        Join PointArrays one after another. Channels are kept if every array has them.
+        """
+        arrays = list(arrays)
+        joined = cls.__new__(cls)
+        joined.data = np.concatenate([array.data for array in arrays], axis=1) if arrays else np.empty((4, 0))
+        names = set.intersection(*(set(array.channels) for array in arrays)) if arrays else set()
+        joined.channels = {name: np.concatenate([array.channels[name] for array in arrays]) for name in names}
+        return joined
+
+    @property
+    def cache(self) -> dict:
+        try:
+            return self._cache
+        except AttributeError:
+            self._cache = {}
+            return self._cache
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.data[0]
+
+    @x.setter
+    def x(self, value):
+        self.data[0] = value
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.data[1]
+
+    @y.setter
+    def y(self, value):
+        self.data[1] = value
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.data[2]
+
+    @z.setter
+    def z(self, value):
+        self.data[2] = value
+
+    @property
+    def e(self) -> np.ndarray:
+        return self.data[3]
+
+    @e.setter
+    def e(self, value):
+        self.data[3] = value
+
+    @property
+    def xyz(self) -> np.ndarray:
+        """
+        Returns: (N, 3) view of the coordinates
+        """
+        return self.data[:3].T
+
+    def isClosed(self) -> bool:
+        """
+        Returns: True if the first and the last vertex share the same coordinates
+        """
+        return len(self) > 1 and bool(np.array_equal(self.data[:3, 0], self.data[:3, -1]))
+
+    def copy(self) -> 'PointArray':
+        new = PointArray.__new__(PointArray)
+        new.data = self.data.copy()
+        new.channels = {name: values.copy() for name, values in self.channels.items()}
+        return new
+
+    def combine(self, basis: np.ndarray) -> 'PointArray':
+        """
+        Linear combinations of the vertices, one per row of basis, as used by curves defined by control points.
+        Extrusion is combined only if at least one vertex defines it, missing values count as 0 then.
+
+        Args:
+            basis (np.ndarray): (M, N) matrix of weights, N being the number of vertices
+
+        Returns:
+            PointArray: M combined points
+        """
+        coordinates = basis @ self.data[:3].T
+        e = self.data[3]
+        combinedE = None if np.isnan(e).all() else basis @ np.nan_to_num(e)
+        return PointArray(coordinates[:, 0], coordinates[:, 1], coordinates[:, 2], combinedE)
+
+    def toPoints(self) -> List[Point]:
+        """
+        Returns: the vertices as a list of independent Point objects
+        """
+        return [Point(x=x, y=y, z=z, e=None if e != e else e) for x, y, z, e in self.data.T.tolist()]
+
+    def __len__(self) -> int:
+        return self.data.shape[1]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PointView(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or isinstance(index, np.ndarray):
+            new = PointArray.__new__(PointArray)
+            new.data = self.data[:, index].copy()
+            new.channels = {name: values[index].copy() for name, values in self.channels.items()}
+            return new
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PointArray index out of range")
+        return PointView(self, index)
+
+    def __setitem__(self, index: int, point: Union[Point, PointView]):
+        self.data[:, index] = (point.x, point.y, point.z, np.nan if point.e is None else point.e)
+
+    def __eq__(self, other):
+        if isinstance(other, PointArray):
+            return self.data.shape == other.data.shape and bool(np.array_equal(self.data, other.data, equal_nan=True))
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __str__(self):
+        return str([str(point) for point in self])
+
+    def __repr__(self):
+        return f"PointArray(n={len(self)})"
+
+
+def toPointArray(points: Union[PointArray, List[Point], Point, dict]) -> PointArray:
+    """
+    Returns the array-backed form of a shape without copying if it already is one.
+
+    Args:
+        points (Union[PointArray, List[Point], Point, dict]): a PointArray, a list of Points, a single Point or a dictionary with key 'shape'
+
+    Returns:
+        PointArray: the points as a PointArray
+    """
+    if isinstance(points, dict):
+        points = points['shape']
+    if isinstance(points, PointArray):
+        return points
+    if isinstance(points, (Point, PointView)):
+        return PointArray.fromPoints([points])
+    if isinstance(points, list):
+        return PointArray.fromPoints(points)
+    raise TypeError(f"Unexpected item type: {type(points)}. Expected Point, list of Points, PointArray or dict.")
@@ -1,6 +1,6 @@
 import pytest
 
-from design.geometricTools.extraTools import nonPlanarVase, vaseMode, solidLayerInfill
+from design.geometricTools.extraTools import nonPlanarVase, vaseMode, vaseLayers, solidLayerInfill
 from design.geometricTools.vector import Vector
 from design.geometries.curves import sinusoidalWave, squareWave, tringleWave, cubic_bezier_curve, bezier_curve_de_casteljau, cardinal_spline, nurbs_curve
 from design.geometries.shapes import varyingArc, spiral, helix, polar_function_1, polar_function_2, generatePolarShape, polygon, circle, rectangle, square
@@ -13,6 +13,26 @@ import math
 from math import pi, sin, cos
 from visualizator import main
 from design.directCommands.commands import moveWithNoExtrusion, stationaryExtrusion, retraction
+from design import optimizeTravel, simplify, sparseInfill
+import numpy as np
+import tracemalloc
+from design.geometries.adaptive import adaptive_parameters
+from design import parallelLayers, serpentineInfill, PolygonIndex, pointsInPolygon
+from design.geometries.curves import basis_function, generate_open_uniform_knot_vector, de_casteljau
+from design.geometries.nurbs import basis_matrix
+from design.geometricTools.baseTools import linespace, linearPattern, polarPattern, gridPattern, pointsToArray, flattenPoints, iterPoints
+from design.geometricTools.extraTools import findIntersectionsWithShape, findLineIntersection, nonPlanarVaseLayers
+from design.geometricTools.shapeCache import shapeCache, normalizeArgument
+from design.geometricTools.affine import AffineTransform
+from design.geometricTools.scanline import scanlineIntersections
+from design.geometricTools.intersections import segmentIntersections
+from design.geometricTools.offset import offsetPolygon, offsetLoops
+from design.geometricTools.spatialIndex import edgeGrid
+from design.geometricTools.containment import polygonIndex
+from design.geometricTools.travel import travelLength
+from transform.transformations import streamStepsToGcode, GcodeWriter
+import random
+import io
 
 
 # File: tests/test_point_and_polar.py
@@ -165,6 +185,732 @@ def test_rectangle_rotate():
         assert abs(rotated_rect[i].y - expected_points[i].y) < tolerance
         assert abs(rotated_rect[i].z - expected_points[i].z) < tolerance
 
+
+
+
+# Tests for the array-backed PointArray
+from design.pointArray import PointArray, toPointArray
+
+
+def test_point_array_round_trip():
+    points = [Point(x=0, y=0, z=0), Point(x=1.5, y=2, z=3, e=0.1)]
+    array = PointArray.fromPoints(points)
+
+    assert len(array) == 2
+    assert array[0] == points[0]
+    assert array[-1] == points[1]
+    assert array.toPoints() == points
+    assert array[0].e is None
+
+def test_point_array_view_writes_through():
+    array = toPointArray(rectangle(Point(x=0, y=0, z=0), 5.0, 3.0))
+    array[2].z += 4
+
+    assert array.z[2] == 4
+    assert array.isClosed()
+
+def test_transforms_on_point_array_match_lists():
+    rect = rectangle(Point(x=0, y=0, z=0), 4.0, 2.0)
+    rect_array = {'shape': toPointArray(rect)}
+
+    assert move(rect_array, Vector(x=2, y=3, z=1))['shape'] == move(rect, Vector(x=2, y=3, z=1))['shape']
+    assert scale(rect_array, 2.0, 'xy')['shape'] == scale(rect, 2.0, 'xy')['shape']
+
+    rotated = rotate(rect_array, math.pi / 2)['shape']
+    expected = rotate(rect, math.pi / 2)['shape']
+    for i in range(len(expected)):
+        assert abs(rotated[i].x - expected[i].x) < 1e-6
+        assert abs(rotated[i].y - expected[i].y) < 1e-6
+
+def test_gcode_from_point_array_matches_list(tmp_path):
+    rect = rectangle(Point(x=0, y=0, z=0.2), 10.0, 10.0)
+    steps = [moveWithNoExtrusion(Point(x=0, y=0, z=0.2)), rect]
+    array_steps = [moveWithNoExtrusion(Point(x=0, y=0, z=0.2)), {'shape': toPointArray(rect)}]
+
+    parseStepsToGcode(steps, tmp_path / 'list.gcode', [0.4, 0.2], hotendTemp=200, bedTemp=60)
+    parseStepsToGcode(array_steps, tmp_path / 'array.gcode', [0.4, 0.2], hotendTemp=200, bedTemp=60)
+
+    assert (tmp_path / 'list.gcode').read_text() == (tmp_path / 'array.gcode').read_text()
+
+
+def test_sinusoidal_wave_is_array_backed():
+    wave = sinusoidalWave(Point(x=0, y=0, z=1), 0, 5, 10, 2, segmentsPerPeriod=4)['shape']
+
+    assert len(wave) == 9
+    assert wave.z.tolist() == [1.0] * 9
+    assert pytest.approx(wave.x.tolist()) == [2.5 * i for i in range(9)]
+    assert pytest.approx(wave.y.tolist(), abs=1e-9) == [0, 5, 0, -5, 0, 5, 0, -5, 0]
+
+def test_square_and_tringle_wave_direction():
+    square_wave = squareWave(Point(x=0, y=0, z=0), pi / 2, 5, 10, 2)['shape']
+    tringle_wave = tringleWave(Point(x=0, y=0, z=0), 0, 5, 10, 2, extraHalfPeriod=True)['shape']
+
+    assert len(square_wave) == 9
+    assert pytest.approx(square_wave[2].x) == -5
+    assert pytest.approx(square_wave[2].y) == 5
+    assert len(tringle_wave) == 6
+    assert pytest.approx(tringle_wave[-1].x) == 25
+
+
+def test_circle_and_helix_are_batched_point_arrays():
+    center = Point(x=1, y=2, z=3)
+    ring = circle(center, 10, 8)['shape']
+    spring = helix(center, 10, 10, 0, 4 * pi, 0, 20, 9)['shape']
+
+    assert len(ring) == 8
+    assert ring.isClosed()
+    assert ring[0] == ring[-1]
+    assert pytest.approx(ring[2].x) == 1 + 10 * cos(2 * 2 * pi / 7)
+    assert pytest.approx(spring.z.tolist()) == [2.5 * i for i in range(9)]
+    assert pytest.approx(spring[4].x) == 11
+    assert polygon(center, 30, 5)['shape'].isClosed()
+
+
+def test_polar_shape_vectorized_matches_scalar_loop():
+    center = Point(x=0, y=0, z=0)
+    vectorized = generatePolarShape(center, polar_function_1, segments=300)['shape']
+    looped = generatePolarShape(center, polar_function_1, segments=300, vectorized=False)['shape']
+    # math.cos cannot take arrays, so this one has to fall back to the per-angle loop
+    scalar_only = generatePolarShape(center, lambda angle: 10 * (4 + math.cos(12 * angle)), segments=300)['shape']
+
+    assert vectorized.isClosed()
+    assert pytest.approx(vectorized.x.tolist()) == looped.x.tolist()
+    assert pytest.approx(vectorized.y.tolist()) == scalar_only.y.tolist()
+
+
+def test_nurbs_matches_recursive_basis():
+
+    knot_vector = [0, 0, 0, 0, 1, 2, 4, 7, 7, 7, 7]
+    parameters = [0.0, 0.5, 1.0, 3.3, 6.9]
+    matrix = basis_matrix(knot_vector, 3, parameters)
+    for row, t in enumerate(parameters):
+        for i in range(7):
+            assert pytest.approx(matrix[row, i], abs=1e-12) == basis_function(i, 4, t, knot_vector)
+
+    control_points = [Point(x=0, y=0, z=0), Point(x=10, y=20, z=0), Point(x=20, y=0, z=0), Point(x=30, y=40, z=0)]
+    curve = nurbs_curve(control_points, [1, 1, 1, 1], 3, 20, knot_vector=[0, 0, 0, 0, 1, 1, 1, 1])['shape']
+    assert len(curve) == 20
+    assert curve[0] == control_points[0]
+    assert pytest.approx(curve[-1].x) == 30
+    assert curve[-1].e is None
+
+
+def test_bezier_matrix_matches_de_casteljau():
+
+    control_points = [Point(x=0, y=0, z=0), Point(x=10, y=20, z=1), Point(x=15, y=5, z=2), Point(x=20, y=30, z=3), Point(x=40, y=3, z=4)]
+    curve = bezier_curve_de_casteljau(control_points, 50)['shape']
+    for point, t in zip(curve, linespace(0.0, 1.0, 50)):
+        expected = de_casteljau(control_points, t)
+        assert pytest.approx([point.x, point.y, point.z]) == [expected.x, expected.y, expected.z]
+
+def test_adaptive_bezier_stays_within_tolerance():
+
+    control_points = [Point(x=0, y=0, z=0), Point(x=0, y=40, z=0), Point(x=40, y=40, z=0), Point(x=40, y=0, z=0)]
+    dense = bezier_curve_de_casteljau(control_points, 2000)['shape']
+    adaptive = bezier_curve_de_casteljau(control_points, tolerance=0.05)['shape']
+
+    assert len(adaptive) < 200
+    assert adaptive[0] == dense[0] and adaptive[-1] == dense[-1]
+    # The apex of the curve is at y = 30, a vertical line through it must meet the approximation close to it
+    crossing = findIntersectionsWithShape(adaptive, Point(x=20, y=0, z=0), Point(x=20, y=40, z=0))
+    assert abs(crossing[0].y - 30) < 0.05
+
+
+def test_adaptive_bezier_follows_a_curve_running_back_along_its_chord():
+    control_points = [Point(x=0, y=0, z=0), Point(x=20, y=0, z=0), Point(x=-10, y=0, z=0), Point(x=10, y=0, z=0)]
+    adaptive = bezier_curve_de_casteljau(control_points, tolerance=0.01)['shape']
+    # The curve runs out to x = 7.23, back to x = 2.77 and then on to the end point
+    assert adaptive.x.max() == 10
+    assert adaptive.x[:-1].max() == pytest.approx(7.235, abs=0.01)
+    assert adaptive.x[1:-1].min() == pytest.approx(2.765, abs=0.01)
+
+
+def test_cardinal_spline_interpolates_z():
+    control_points = [Point(x=0, y=0, z=0), Point(x=10, y=10, z=2), Point(x=20, y=0, z=4)]
+    spline = cardinal_spline(control_points, 0.0, 5)['shape']
+
+    assert len(spline) == 10
+    assert spline[0] == control_points[0]
+    assert spline[4] == control_points[1]
+    assert spline[-1] == control_points[2]
+    assert 0 < spline[2].z < 2
+    assert all(b >= a for a, b in zip(spline.z, spline.z[1:]))
+
+
+def test_adaptive_sampling_respects_tolerance_and_min_length():
+    center = Point(x=0, y=0, z=0)
+    ring = circle(center, 75, tolerance=0.01)['shape']
+    coarse = circle(center, 75, tolerance=0.001, minSegmentLength=1.0)['shape']
+
+    assert ring.isClosed()
+    assert len(ring) < 1000
+    # The sagitta of every segment is the largest deviation of a chord from the circle
+    xy = ring.xyz[:, :2]
+    chords = ((xy[1:] - xy[:-1]) ** 2).sum(axis=1) ** 0.5
+    assert (75 - (75 ** 2 - (chords / 2) ** 2) ** 0.5).max() <= 0.01
+    coarse_xy = coarse.xyz[:, :2]
+    assert (((coarse_xy[1:] - coarse_xy[:-1]) ** 2).sum(axis=1) ** 0.5).min() >= 1.0
+
+def test_adaptive_curves_keep_their_end_points():
+    control_points = [Point(x=0, y=0, z=0), Point(x=10, y=20, z=0), Point(x=20, y=0, z=0), Point(x=30, y=40, z=0)]
+    nurbs = nurbs_curve(control_points, [1, 1, 1, 1], 3, knot_vector=[0, 0, 0, 0, 1, 1, 1, 1], tolerance=0.05)['shape']
+    spline = cardinal_spline(control_points, tolerance=0.05)['shape']
+
+    for curve in (nurbs, spline):
+        assert curve[0] == control_points[0]
+        assert pytest.approx(curve[-1].listRepresentation()) == control_points[-1].listRepresentation()
+
+
+def test_shape_cache_hits_and_protects_entries():
+
+    shapeCache.enable(maxEntries=2)
+    try:
+        first = circle(Point(x=0, y=0, z=0), 30, 100)
+        move(first, Vector(x=0, y=0, z=5), copy=False)
+        first['shape'][0].x = 1000
+        second = circle(Point(x=0.0, y=0.0, z=0.0), 30.0, 100)
+
+        assert shapeCache.info()['hits'] == 1
+        assert second['shape'][0].x == 30
+        assert second['shape'].z.max() == 0
+
+        rectangle(Point(x=0, y=0, z=0), 1, 2)
+        square(Point(x=0, y=0, z=0), 3)
+        assert shapeCache.info()['entries'] == 2
+        circle(Point(x=0, y=0, z=0), 30, 100)
+        assert shapeCache.info()['misses'] == 4
+
+        # Arguments passed by position, by keyword or left at their default share an entry
+        circle(Point(x=0, y=0, z=0), 30, segments=100)
+        circle(Point(x=0, y=0, z=0), radious=30)
+        circle(Point(x=0, y=0, z=0), 30)
+        assert shapeCache.info()['hits'] == 4
+        assert shapeCache.info()['misses'] == 4
+    finally:
+        shapeCache.disable()
+
+
+def test_shape_cache_keys_include_channels():
+    plain = PointArray(np.array([0.0, 1.0]), np.array([0.0, 0.0]))
+    fast = PointArray(np.array([0.0, 1.0]), np.array([0.0, 0.0]), channels={'speed': np.array([60.0, 60.0])})
+    slow = PointArray(np.array([0.0, 1.0]), np.array([0.0, 0.0]), channels={'speed': np.array([20.0, 20.0])})
+    keys = {normalizeArgument(points) for points in (plain, fast, slow)}
+    assert len(keys) == 3
+    assert normalizeArgument(fast) == normalizeArgument(fast.copy())
+
+
+def test_affine_chain_matches_separate_transforms():
+
+    shape = generatePolarShape(Point(x=3, y=-2, z=1), polar_function_1, segments=200)
+    expected = rotate(scale(move(shape, Vector(x=1, y=2, z=3)), 1.5, 'xy'), 0.3)['shape']
+    fused = AffineTransform().move(Vector(x=1, y=2, z=3)).scale(1.5, 'xy').rotate(0.3).apply(shape)['shape']
+
+    assert pytest.approx(fused.data.ravel().tolist(), nan_ok=True) == expected.data.ravel().tolist()
+    # Input is left untouched and single points are moved too
+    assert shape['shape'][0].z == 1
+    assert AffineTransform().move(Vector(x=1, y=0, z=0)).apply(Point(x=0, y=0, z=0)) == Point(x=1, y=0, z=0)
+
+
+def test_rotate_about_x_and_arbitrary_axis():
+    line = [Point(x=0, y=1, z=0), Point(x=0, y=3, z=0)]
+
+    # 90 degrees about x through the center (0, 2, 0): y offsets turn into z offsets
+    rotated = rotate(line, math.pi / 2, axis='x')['shape']
+    assert isinstance(rotated, list)
+    assert rotated[0].y == pytest.approx(2) and rotated[0].z == pytest.approx(-1)
+    assert rotated[1].y == pytest.approx(2) and rotated[1].z == pytest.approx(1)
+
+    # A full turn about any axis is the identity, half a turn about the diagonal swaps x and y
+    point = Point(x=1, y=0, z=0)
+    swapped = rotate(point, math.pi, axis=Vector(x=1, y=1, z=0), pivot=Point(x=0, y=0, z=0))
+    assert (swapped.x, swapped.y, swapped.z) == pytest.approx((0, 1, 0))
+    assert rotate(point, 1.0, axis='y') == point
+
+    with pytest.raises(ValueError):
+        rotate(line, 1.0, axis='w')
+
+
+def test_rotate_point_array_about_pivot():
+    points = [Point(x=2, y=0, z=0), Point(x=2, y=1, z=1), Point(x=3, y=2, z=0)]
+    pivot = Point(x=1, y=0, z=0)
+    fromList = rotate(points, 0.3, axis='y', pivot=pivot)['shape']
+    fromArray = rotate(PointArray.fromPoints(points), 0.3, axis='y', pivot=pivot)['shape']
+    assert isinstance(fromArray, PointArray)
+    assert fromArray.xyz.ravel().tolist() == pytest.approx(PointArray.fromPoints(fromList).xyz.ravel().tolist())
+    # About y through (1, 0, 0), (2, 0, 0) moves to (1 + cos, 0, -sin)
+    assert (fromArray[0].x, fromArray[0].z) == pytest.approx((1 + math.cos(0.3), -math.sin(0.3)))
+
+
+def test_linear_pattern_matches_moved_copies():
+    base = circle(Point(x=0, y=0, z=0), 10, 50)
+    pattern = linearPattern(base, 4, Vector(x=0, y=0, z=20.4))['pattern']
+    assert len(pattern) == 4
+    for index, instance in enumerate(pattern):
+        expected = move(base, Vector(x=0, y=0, z=20.4 * index))['shape']
+        assert instance.xyz.ravel().tolist() == pytest.approx(PointArray.fromPoints(expected).xyz.ravel().tolist())
+    assert pattern.expand().shape == (4, 4, len(base['shape']))
+    assert len(pattern.toPointArray()) == 4 * len(base['shape'])
+    assert pointsIndiciesToStrRepresentation({'pattern': pattern})[-1] == pytest.approx([10, 0, 61.2])
+
+
+def test_polar_and_grid_patterns():
+    base = [Point(x=10, y=0, z=0), Point(x=11, y=0, z=0)]
+    ring = polarPattern(base, 4, Point(x=0, y=0, z=0))['pattern']
+    quarter = ring.instance(1)
+    assert (quarter[0].x, quarter[0].y) == pytest.approx((0, 10))
+
+    grid = gridPattern(base, 3, 2, Vector(x=20, y=0, z=0), Vector(x=0, y=30, z=0))['pattern']
+    starts = [(points[0].x, points[0].y) for points in grid]
+    assert starts == [(10, 0), (30, 0), (50, 0), (10, 30), (30, 30), (50, 30)]
+
+
+def test_pattern_gcode_matches_separate_shapes(tmp_path):
+    base = circle(Point(x=0, y=0, z=0), 5, 20)
+    pattern = linearPattern(base, 3, Vector(x=0, y=0, z=0.2))
+    patternFile, shapesFile = tmp_path / "pattern.gcode", tmp_path / "shapes.gcode"
+    parseStepsToGcode([pattern], str(patternFile), [0.4, 0.2], 200, 60)
+    parseStepsToGcode(pattern['pattern'].steps(), str(shapesFile), [0.4, 0.2], 200, 60)
+    assert patternFile.read_text() == shapesFile.read_text()
+
+
+def test_points_to_array_flattens_mixed_nesting():
+    array = PointArray.fromPoints([Point(x=2, y=0, z=0), Point(x=3, y=0, z=0)])
+    nested = [Point(x=0, y=0, z=0), [[Point(x=1, y=0, z=0)], array], Point(x=4, y=0, z=1)]
+    coordinates = pointsToArray(nested)
+    assert coordinates.shape == (5, 3) and coordinates.flags['C_CONTIGUOUS']
+    assert coordinates[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert [point.x for point in flattenPoints(nested)] == [0, 1, 2, 3, 4]
+
+    # Nesting deeper than the recursion limit is walked iteratively
+    deep = [Point(x=7, y=8, z=9)]
+    for _ in range(5000):
+        deep = [deep]
+    assert [point.x for point in iterPoints(deep)] == [7]
+    assert pointsIndiciesToStrRepresentation(deep) == [[7.0, 8.0, 9.0]]
+
+
+def test_scanline_matches_per_edge_intersections():
+    shape = generatePolarShape(Point(x=5, y=5, z=0), polar_function_1, segments=300)['shape']
+    outline = PointArray.fromPoints(shape)
+    positions = [0.3, -4.1, 2.0, 7.7]
+    for position, crossings in zip(positions, scanlineIntersections(outline, positions, 'y')):
+        expected = sorted(p.x for p in findIntersectionsWithShape(shape, Point(x=-100, y=position, z=0), Point(x=100, y=position, z=0)))
+        assert crossings.tolist() == pytest.approx(expected)
+    for position, crossings in zip(positions, scanlineIntersections(outline, positions, 'x')):
+        expected = sorted(p.y for p in findIntersectionsWithShape(shape, Point(x=position, y=-100, z=0), Point(x=position, y=100, z=0)))
+        assert crossings.tolist() == pytest.approx(expected)
+
+
+def test_solid_layer_infill_segments_inside_circle():
+    infill = solidLayerInfill(circle(Point(x=0, y=0, z=0), 10, 400), 0.5)
+    segments = [step['shape'] for step in infill if 'shape' in step]
+    assert len(segments) == 40
+    for start, end in segments:
+        assert start.y == end.y and start.x < end.x
+        assert end.x == pytest.approx(sqrt(100 - start.y ** 2), abs=0.01)
+
+
+def test_segment_intersections_match_single_pair_search():
+    polygon = circle(Point(x=0, y=0, z=0), 10, 60)['shape']
+    starts = [Point(x=-20, y=-3, z=0), Point(x=0, y=0, z=1), Point(x=-20, y=10, z=0)]
+    ends = [Point(x=20, y=5, z=4), Point(x=0, y=30, z=3), Point(x=20, y=10, z=0)]
+
+    found = segmentIntersections(starts, ends, polygon, chunkSize=50)
+    expected = []
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        for edge in range(len(polygon) - 1):
+            point = findLineIntersection(start, end, polygon[edge], polygon[edge + 1])
+            if point:
+                expected.append((index, edge, point.x, point.y, point.z))
+
+    assert list(zip(found.segment.tolist(), found.edge.tolist())) == [item[:2] for item in expected]
+    assert found.points.ravel().tolist() == pytest.approx([value for item in expected for value in item[2:]])
+    assert ((found.t >= 0) & (found.t <= 1) & (found.s >= 0) & (found.s <= 1)).all()
+    first = found.segment == 0
+    assert found.points[first, 2].tolist() == pytest.approx((4 * found.t[first]).tolist())
+    # A segment parallel to an edge never crosses it
+    assert len(segmentIntersections(Point(x=0, y=0, z=0), Point(x=10, y=0, z=0), [Point(x=0, y=0, z=0), Point(x=5, y=0, z=0)]).t) == 0
+
+
+def test_serpentine_infill_links_lines_inside_shape():
+    outline = [Point(x=0, y=0), Point(x=20, y=0), Point(x=20, y=4), Point(x=4, y=4), Point(x=4, y=16),
+               Point(x=20, y=16), Point(x=20, y=20), Point(x=0, y=20), Point(x=0, y=0)]
+    steps = serpentineInfill({'shape': outline}, 0.4, z=0.6)
+    paths = [step['shape'] for step in steps if 'shape' in step]
+    assert sum('moveWithNoExtrusion' in step for step in steps) == len(paths) == 1
+    path = paths[0]
+    assert (path.z == 0.6).all()
+    # Every line is inside the outline and the links between lines are vertical along x = 0 or short
+    for start, end in zip(path[0:-1], path[1:]):
+        if start.y != end.y:
+            assert start.x == end.x and abs(end.y - start.y) < 1.3
+            assert not (4 < start.y < 16 and start.x > 4)
+
+
+def test_serpentine_infill_alternates_angle_per_layer():
+    shape = circle(Point(x=0, y=0, z=0), 10, 200)
+    even = [step['shape'] for step in serpentineInfill(shape, 0.5, pi / 4) if 'shape' in step]
+    odd = [step['shape'] for step in serpentineInfill(shape, 0.5, pi / 4, layerIndex=1) if 'shape' in step]
+    first, second = even[0][0], even[0][1]
+    assert atan2(second.y - first.y, second.x - first.x) % pi == pytest.approx(pi / 4)
+    first, second = odd[0][0], odd[0][1]
+    assert atan2(second.y - first.y, second.x - first.x) % pi == pytest.approx(3 * pi / 4)
+    assert len(even) < 20
+
+
+def test_offset_polygon_shrinks_grows_and_splits():
+    rect = rectangle(Point(x=0, y=0, z=1), 20, 10)
+    inner, = offsetPolygon(rect, -1)
+    assert (inner.x.min(), inner.x.max(), inner.y.min(), inner.y.max()) == pytest.approx((1, 19, 1, 9))
+    assert inner.isClosed() and (inner.z == 1).all()
+    outer, = offsetPolygon(rect, 1)
+    assert (outer.x.min(), outer.y.max()) == pytest.approx((-1, 11))
+    assert offsetPolygon(rect, -5.1) == []
+
+    corners = [(0, 0), (10, 0), (10, 4), (14, 4), (14, 0), (24, 0), (24, 10), (14, 10), (14, 6), (10, 6), (10, 10), (0, 10), (0, 0)]
+    dumbbell = [Point(x=x, y=y, z=0) for x, y in corners]
+    assert len(offsetPolygon(dumbbell, -0.5)) == 1
+    halves = offsetPolygon(dumbbell, -1.5)
+    assert sorted(float(loop.x.min() + loop.x.max()) / 2 for loop in halves) == pytest.approx([5, 19])
+
+    walls = offsetLoops(rect, 0.4, 3)
+    assert [round(float(step['shape'].x.min()), 6) for step in walls if 'shape' in step] == [0.2, 0.6, 1.0]
+
+
+def test_solid_infill_stays_inside_perimeters():
+    infill = solidLayerInfill(circle(Point(x=0, y=0, z=0), 10, 400), 0.5, perimeters=2)
+    ends = [point for step in infill if 'shape' in step for point in step['shape']]
+    assert ends and max(sqrt(point.x ** 2 + point.y ** 2) for point in ends) == pytest.approx(9, abs=0.01)
+
+
+def test_vase_layers_stream_without_touching_base(tmp_path):
+    base = circle(Point(x=0, y=0, z=0), 10, 50)
+    before = [point.copy() for point in base['shape']]
+
+    layers = vaseLayers(base, 5, 0.6, 0.2)
+    first = next(layers)['shape']
+    assert first[0].z == 0 and first[-1].z == pytest.approx(0.2) and first[0].e == 0.0
+    rest = [step['shape'] for step in layers]
+    assert [float(layer.z[1] - first.z[1]) for layer in rest[:-1]] == pytest.approx([0.2, 0.4, 0.6])
+    # The closing layer starts at the second point of the shape
+    assert len(rest[-1]) == len(first) - 1
+    assert float(rest[-1].z[0] - first.z[1]) == pytest.approx(0.8)
+    # Extrusion follows the length of every move, the first one coming from the end of the previous layer
+    steps = np.diff(np.vstack((first.xyz[-1:], rest[0].xyz)), axis=0)
+    assert rest[0].e.tolist() == pytest.approx((np.linalg.norm(steps, axis=1) * 0.12).tolist())
+    assert base['shape'] == before
+    assert len(vaseMode(base, 5, 0.6, 0.2)['shape']) == 5 * len(before) - 1
+
+    nonPlanar = [step['shape'] for step in nonPlanarVaseLayers(base, 0.5, 3, 0.6, 0.2)]
+    assert [float(layer.z.max()) for layer in nonPlanar] == pytest.approx([0.3, 0.6, 0.9], abs=0.01)
+    assert nonPlanar[0].e[0] != nonPlanar[0].e[0]
+    assert base['shape'] == before
+
+    gcodeFile = tmp_path / "vase.gcode"
+    parseStepsToGcode(vaseLayers(base, 3, 0.6, 0.2), str(gcodeFile), [0.4, 0.2], 200, 60)
+    assert gcodeFile.read_text().count("; Generating shape") == 3
+
+
+def test_vase_layers_are_computed_one_at_a_time():
+    angles = np.linspace(0, 2 * pi, 20000)
+    base = {'shape': PointArray(np.cos(angles) * 50, np.sin(angles) * 50)}
+    tracemalloc.start()
+    try:
+        first = next(vaseLayers(base, 1000, 0.6, 0.2))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert len(first['shape']) == 20000
+    assert peak < 10 * 1024 * 1024
+
+
+def test_edge_grid_queries_match_brute_force():
+    outline = generatePolarShape(Point(x=0, y=0, z=0), polar_function_1, segments=2000, asArray=True)['shape']
+    grid = edgeGrid(outline)
+    assert edgeGrid(outline) is grid
+
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        start, end = rng.uniform(-55, 55, 3), rng.uniform(-55, 55, 3)
+        found = grid.intersectSegment(start, end)
+        expected = segmentIntersections(start, end, outline)
+        assert found.edge.tolist() == expected.edge.tolist()
+        assert found.points.ravel().tolist() == pytest.approx(expected.points.ravel().tolist())
+
+        point = rng.uniform(-60, 60, 2)
+        edge, distance, closest = grid.nearestEdge(point)
+        starts, ends = outline.xyz[:-1, :2], outline.xyz[1:, :2]
+        t = np.clip(((point - starts) * (ends - starts)).sum(axis=1) / ((ends - starts) ** 2).sum(axis=1), 0, 1)
+        distances = np.hypot(*(starts + t[:, None] * (ends - starts) - point).T)
+        assert distance == pytest.approx(distances.min())
+        assert set(np.flatnonzero(distances <= 2.0)) <= set(grid.pointCandidates(point, 2.0).tolist())
+
+    # Changing the points rebuilds the cached grid
+    outline.x += 100
+    assert edgeGrid(outline) is not grid
+    assert edgeGrid(outline).origin[0] > 40
+    grid = edgeGrid(outline)
+    move(outline, Vector(x=0, y=50, z=0), copy=False)
+    assert edgeGrid(outline) is not grid
+    grid = edgeGrid(outline)
+    outline[0] = Point(x=-500, y=0, z=0)
+    assert edgeGrid(outline).origin[0] == -500
+    outline.data[0] -= 1000
+    assert edgeGrid(outline).origin[0] == -1500
+
+
+def test_parallel_layers_match_serial_run():
+    layers = [circle(Point(x=0, y=0, z=0), 10 + 2 * index, 60) for index in range(5)]
+    layerArguments = [{'layerIndex': index, 'z': 0.2 * (index + 1)} for index in range(5)]
+
+    serial = parallelLayers(serpentineInfill, layers, 0.4, layerArguments=layerArguments, workers=1)
+    parallel = parallelLayers(serpentineInfill, layers, 0.4, layerArguments=layerArguments, workers=3)
+    assert [list(step) for step in parallel] == [list(step) for step in serial]
+    for mine, theirs in zip(parallel, serial):
+        if 'shape' in mine:
+            assert mine['shape'] == theirs['shape']
+        else:
+            assert mine['moveWithNoExtrusion'] == theirs['moveWithNoExtrusion']
+
+    # Lists of Points come back as lists of Points
+    steps = parallelLayers(solidLayerInfill, layers[:2], 0.4, workers=2)
+    assert steps == parallelLayers(solidLayerInfill, layers[:2], 0.4, workers=1)
+    assert all(isinstance(point, Point) for step in steps if 'shape' in step for point in step['shape'])
+
+
+@pytest.mark.parametrize("pattern", ['grid', 'triangles', 'honeycomb', 'gyroid'])
+def test_sparse_infill_patterns(pattern):
+    steps = sparseInfill(rectangle(Point(x=0, y=0, z=0), 150, 150), 0.4, 0.2, pattern, z=0.6)
+    paths = [step['shape'] for step in steps[1::2]]
+    assert [list(step) for step in steps[0::2]] == [['moveWithNoExtrusion']] * len(paths)
+    length = sum(np.hypot(np.diff(path.x), np.diff(path.y)).sum() for path in paths)
+    assert length * 0.4 / 150 ** 2 == pytest.approx(0.2, rel=0.2)
+    assert all(np.all(path.z == 0.6) for path in paths)
+
+    outline = circle(Point(x=5, y=5, z=0), 20, 200)
+    for step in sparseInfill(outline, 0.4, 0.3, pattern, angle=0.4)[1::2]:
+        assert np.all(np.hypot(step['shape'].x - 5, step['shape'].y - 5) <= 20 + 1e-9)
+
+
+@pytest.mark.parametrize("pattern, z", [('honeycomb', 0.6), ('gyroid', 0.0), ('gyroid', 2.0), ('gyroid', 3.0)])
+def test_sparse_infill_prints_every_segment_once(pattern, z):
+    steps = sparseInfill(rectangle(Point(x=0, y=0, z=0), 60, 60), 0.4, 0.15, pattern, z=z)
+    segments = []
+    for path in (step['shape'] for step in steps[1::2]):
+        xy = np.round(np.column_stack((path.x, path.y)), 6).tolist()
+        segments += [frozenset((tuple(a), tuple(b))) for a, b in zip(xy, xy[1:])]
+    assert len(segments) == len(set(segments))
+
+
+def test_sparse_infill_rejects_bad_arguments():
+    outline = rectangle(Point(x=0, y=0, z=0), 10, 10)
+    with pytest.raises(ValueError):
+        sparseInfill(outline, 0.4, 0.2, 'lightning')
+    with pytest.raises(ValueError):
+        sparseInfill(outline, 0.4, 0)
+    # The gyroid changes with the height of the layer
+    first = sparseInfill(outline, 0.4, 0.2, 'gyroid', z=0.2)
+    second = sparseInfill(outline, 0.4, 0.2, 'gyroid', z=1.4)
+    assert first[1]['shape'] != second[1]['shape']
+
+
+def test_optimize_travel_shortens_moves_within_layers():
+    steps = []
+    for z in (0.2, 0.4):
+        for column in range(3):
+            for row in range(3):
+                part = circle(Point(x=50 * column, y=50 * row, z=z), 15, 60)
+                steps += [moveWithNoExtrusion(part['shape'][0]), part]
+                steps += sparseInfill(part, 0.4, 0.2, 'grid', z=z)
+    groups = [steps[index:index + 2] for index in range(0, len(steps), 2)]
+    random.Random(3).shuffle(groups)
+    groups.sort(key=lambda group: group[0]['moveWithNoExtrusion'].z)
+    shuffled = [step for group in groups for step in group]
+    # An explicit extrusion keeps a path in its direction
+    shuffled[-1] = {'shape': [Point(x=0, y=0, z=0.4, e=0.1), Point(x=200, y=0, z=0.4, e=0.2)]}
+    shuffled[-2] = moveWithNoExtrusion(Point(x=0, y=0, z=0.4))
+
+    optimized = optimizeTravel(shuffled, timeBudget=2.0)
+    assert travelLength(optimized) < 0.5 * travelLength(shuffled)
+    heights = [step['moveWithNoExtrusion'].z for step in optimized if 'moveWithNoExtrusion' in step]
+    assert heights == sorted(heights)
+
+    def segments(steps):
+        found = set()
+        for step in steps:
+            if 'shape' in step:
+                points = [(round(point.x, 9), round(point.y, 9), round(point.z, 9)) for point in step['shape']]
+                found.update(frozenset(pair) for pair in zip(points, points[1:]))
+        return found
+    assert segments(optimized) == segments(shuffled)
+    assert any(step is shuffled[-1] for step in optimized)
+    for move, shape in zip(optimized[0::2], optimized[1::2]):
+        assert (move['moveWithNoExtrusion'].x, move['moveWithNoExtrusion'].y) == pytest.approx((shape['shape'][0].x, shape['shape'][0].y))
+
+
+def test_optimize_travel_keeps_climbing_paths_in_direction():
+    ring = circle(Point(x=20, y=0, z=0.2), 5, 30)
+    climb = helix(Point(x=0, y=0, z=0), 10, 10, pi, 4 * pi, 0.2, 10, 200)
+    steps = [moveWithNoExtrusion(ring['shape'][0]), ring, moveWithNoExtrusion(climb['shape'][0]), climb]
+    optimized = optimizeTravel(steps)
+    printed = [step['shape'] for step in optimized if 'shape' in step]
+    assert printed[1].z[0] == pytest.approx(0.2)
+    assert printed[1].z[-1] == pytest.approx(10)
+    moves = [step['moveWithNoExtrusion'] for step in optimized if 'moveWithNoExtrusion' in step]
+    assert moves[1].z == pytest.approx(0.2)
+
+
+def test_points_in_polygon_rules_and_cache():
+    outline = generatePolarShape(Point(x=0, y=0, z=0), polar_function_1, segments=1000, asArray=True)['shape']
+    queries = np.random.default_rng(5).uniform(-60, 60, (5000, 2))
+    inside = pointsInPolygon(queries, outline)
+    assert polygonIndex(outline) is polygonIndex(outline)
+    index = polygonIndex(outline)
+    moved = move(outline, Vector(x=200, y=0, z=0))['shape']
+    assert polygonIndex(moved) is not index
+    move(outline, Vector(x=0, y=0, z=0), copy=False)
+    assert polygonIndex(outline) is index
+
+    starts, ends = outline.xyz[:-1, :2], outline.xyz[1:, :2]
+    y, x = queries[:, 1:2], queries[:, 0:1]
+    spans = ((starts[:, 1] <= y) & (y < ends[:, 1])) | ((ends[:, 1] <= y) & (y < starts[:, 1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossX = starts[:, 0] + (y - starts[:, 1]) * (ends[:, 0] - starts[:, 0]) / (ends[:, 1] - starts[:, 1])
+    assert inside.tolist() == ((spans & (crossX > x)).sum(axis=1) % 2 == 1).tolist()
+
+    # A square with a hole, and two overlapping squares wound the same way
+    square = rectangle(Point(x=0, y=0, z=0), 10, 10)
+    hole = [Point(x=3, y=3, z=0), Point(x=3, y=7, z=0), Point(x=7, y=7, z=0), Point(x=7, y=3, z=0)]
+    points = np.array([[1, 1], [5, 5], [12, 1]])
+    assert PolygonIndex.fromLoops([square, hole]).contains(points).tolist() == [True, False, False]
+    overlapping = PolygonIndex.fromLoops([square, move(square, Vector(x=4, y=4, z=0))])
+    assert overlapping.contains(points).tolist() == [True, False, False]
+    assert overlapping.contains(points, 'nonzero').tolist() == [True, True, False]
+    assert overlapping.windingNumbers(points).tolist() == [1, 2, 0]
+    with pytest.raises(ValueError):
+        overlapping.contains(points, 'positive')
+    # Writes into the rows of the points are noticed as well
+    outline.x[:] += 200
+    assert polygonIndex(outline) is not index
+    assert pointsInPolygon(queries[:10], outline).tolist() == [False] * 10
+
+
+@pytest.mark.parametrize("method", ['douglas-peucker', 'visvalingam'])
+def test_simplify_keeps_shape_ends_and_extrusion(method):
+    angles = np.linspace(0, 2 * pi, 20001)
+    radius = 40 + 3 * np.sin(7 * angles)
+    loop = PointArray(radius * np.cos(angles), radius * np.sin(angles), np.full(len(angles), 0.2), np.full(len(angles), 0.01))
+    loop.data[:, -1] = loop.data[:, 0]
+    simplified = simplify({'shape': loop}, 0.05, method)['shape']
+    assert 10 < len(simplified) < len(loop) // 10
+    assert simplified.isClosed()
+    assert np.nansum(simplified.e[1:]) == pytest.approx(np.nansum(loop.e[1:]))
+
+    # Every removed vertex lies close to the chord replacing it
+    if method == 'douglas-peucker':
+        keptIndex = np.flatnonzero(np.isin(loop.x, simplified.x))
+        span = np.searchsorted(keptIndex, np.arange(len(loop)), side='right') - 1
+        span = np.minimum(span, len(keptIndex) - 2)
+        start, end = loop.xyz[keptIndex[span]], loop.xyz[keptIndex[span + 1]]
+        chord = end - start
+        t = np.clip(((loop.xyz - start) * chord).sum(axis=1) / np.maximum((chord ** 2).sum(axis=1), 1e-300), 0, 1)
+        assert np.sqrt(((loop.xyz - start - t[:, None] * chord) ** 2).sum(axis=1)).max() <= 0.05 + 1e-9
+
+    # Step lists keep their other steps, lists of Points stay Points
+    points = circle(Point(x=0, y=0, z=0), 10, 400)['shape'].toPoints()
+    steps = simplify([moveWithNoExtrusion(points[0]), {'shape': points}, retraction(1.0)], 0.05, method)
+    assert steps[0] == moveWithNoExtrusion(points[0]) and steps[2] == retraction(1.0)
+    assert all(isinstance(point, Point) for point in steps[1]['shape'])
+    assert len(steps[1]['shape']) < 100 and steps[1]['shape'][-1] == points[-1]
+    with pytest.raises(ValueError):
+        simplify(points, 0.05, 'radial')
+
+
+def test_stream_steps_to_gcode_matches_file_output(tmp_path):
+    base = circle(Point(x=0, y=0, z=0.2), 10, 60)
+    steps = [moveWithNoExtrusion(Point(x=10, y=0, z=0.2)), stationaryExtrusion(2, 600), base,
+             {'shape': base['shape'].toPoints()}, retraction(1.0)]
+
+    gcodeFile = tmp_path / "steps.gcode"
+    parseStepsToGcode(steps, gcodeFile, [0.4, 0.2], 200, 60)
+
+    output = io.BytesIO()
+    written = streamStepsToGcode((step for step in steps), output, [0.4, 0.2], 200, 60)
+    assert output.getvalue() == gcodeFile.read_bytes()
+    assert written == len(output.getvalue())
+
+    layers = io.BytesIO()
+    streamStepsToGcode(vaseLayers(base, 3, 0.6, 0.2), layers, [0.4, 0.2], 200, 60)
+    assert layers.getvalue().decode('utf-8').count("; Generating shape") == 3
+
+
+def test_gcode_writer_writes_in_chunks():
+    class Recorder:
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, data):
+            self.chunks.append(bytes(data))
+
+    stream = Recorder()
+    writer = GcodeWriter(stream, bufferSize=100)
+    for _ in range(30):
+        writer.write("G1 X1 Y2\n")
+    assert len(stream.chunks) == 2
+    assert all(len(chunk) >= 100 for chunk in stream.chunks)
+    writer.flush()
+    assert b"".join(stream.chunks) == b"G1 X1 Y2\n" * 30
+    assert writer.bytesWritten == 9 * 30
+
+
+def test_pattern_keeps_its_own_base():
+    base = PointArray(np.array([5.0, 6.0]), np.array([0.0, 0.0]))
+    pattern = linearPattern({'shape': base}, 3, Vector(x=0, y=10, z=0))['pattern']
+    base.data[0] += 100
+    move(base, Vector(x=1, y=1, z=1), copy=False)
+    assert pattern.instance(1).x.tolist() == [5.0, 6.0]
+    assert pattern.instance(1).y.tolist() == [10.0, 10.0]
+
+
+def test_adaptive_sampling_refines_intervals_running_back():
+    def curve(t):
+        return np.stack([30 * t ** 2 - 20 * t, 0 * t, 0 * t], axis=1)
+
+    # The midpoint of the first interval lies on the chord's line, behind its start
+    parameters, values = adaptive_parameters(curve, 0.0, 1.0, 0.01, initial_segments=1)
+    assert len(parameters) > 2
+    assert values[:, 0].min() == pytest.approx(-10 / 3, abs=0.05)
+
+
+def test_adaptive_sampling_only_evaluates_refined_intervals():
+    evaluated = []
+
+    def curve(t):
+        evaluated.append(len(t))
+        return np.stack([t, np.where(t > 0.9, (t - 0.9) ** 2 * 1000, 0.0), 0 * t], axis=1)
+
+    parameters, values = adaptive_parameters(curve, 0.0, 1.0, 0.001, initial_segments=16)
+    # The starting grid, its 16 midpoints, then two midpoints per inserted vertex
+    assert sum(evaluated) == 17 + 16 + 2 * (len(parameters) - 17)
+    assert np.all(parameters[np.flatnonzero(np.diff(parameters) < 1 / 16)] >= 0.875)
+
+
+def test_simplify_keeps_computed_extrusion_apart_from_explicit():
+    x = np.arange(10.0)
+    halves = simplify(PointArray(x, 0 * x, e=np.r_[[0.1] * 5, [np.nan] * 5]), 0.01)
+    assert halves.x.tolist() == [0.0, 4.0, 9.0]
+    assert halves.e[1] == pytest.approx(0.4)
+    assert np.isnan(halves.e[2])
+
+    alternating = PointArray(x, 0 * x, e=np.where(np.arange(10) % 2 == 0, 0.1, np.nan))
+    for method in ('douglas-peucker', 'visvalingam'):
+        assert simplify(alternating, 0.01, method) == alternating
+
+
+def test_visvalingam_keeps_vertices_beyond_the_neighbours_segment():
+    spike = PointArray(np.array([0.0, 10.0, 5.0, 5.0]), np.array([0.0, 0.0, 0.0, 3.0]))
+    for method in ('douglas-peucker', 'visvalingam'):
+        assert simplify(spike, 0.01, method).x.tolist() == [0.0, 10.0, 5.0, 5.0]
+
 if __name__ == "__main__":
     pytest.main()
-
@@ -1,3 +1,3 @@
-from .transformations import (parseStepsToGcode, pointsIndiciesToStrRepresentation)
+from .transformations import (parseStepsToGcode, pointsIndiciesToStrRepresentation, streamStepsToGcode)
 
-__all__ = ["parseStepsToGcode", "pointsIndiciesToStrRepresentation"]
\ No newline at end of file
+__all__ = ["parseStepsToGcode", "pointsIndiciesToStrRepresentation", "streamStepsToGcode"]
\ No newline at end of file
@@ -1,9 +1,11 @@
 import design
-from typing import List, Dict, Union
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Union
 from math import sqrt, pi
-from design.geometricTools.baseTools import flatten, flattenPoints
+from design.geometricTools.baseTools import flatten, flattenPoints, pointsToArray
 from typing import List, Dict
 from design.point import Point
+from design.pointArray import PointArray
+import numpy as np
 
 
 def pointsIndiciesToStrRepresentation(points: List[Union[Point, List[Point], dict]]) -> list:
@@ -17,9 +19,10 @@ def pointsIndiciesToStrRepresentation(points: List[Union[Point, List[Point], dic
                 - A single Point object,
                 - A list of Point objects,
                 - A dictionary containing the key 'shape', with a list of Point objects.
+            PointArrays, ShapePatterns and nested lists are accepted as well, they all go through one contiguous array.
 
     Returns:
-        list: A list of strings, where each string is the representation of a Point object.
+        list: A list of [x, y, z] lists, one for each Point object.
 
     Example:
         ```python
@@ -34,24 +37,7 @@ def pointsIndiciesToStrRepresentation(points: List[Union[Point, List[Point], dic
         # Output: ['[1.0, 2.0, 3.0]', '[4.0, 5.0, 6.0]']
         ```
     """
-    if isinstance(points, dict):
-        points = points['shape']
-
-    if isinstance(points, Point):
-        return [points.listRepresentation()]
-    elif isinstance(points, list):
-        flatList = flattenPoints(points)
-        counter = 0
-        listOfPoints = []
-        for point in flatList:
-            counter += 1
-            if counter < len(flatList):
-                listOfPoints.append(point.listRepresentation())
-                #print(f"{point},")
-            else:
-                #print(point)
-                listOfPoints.append(point.listRepresentation())
-        return listOfPoints
+    return pointsToArray(points).tolist()
 
 # Define a function for the starting G-code
 def generateStartingGcode(hotend_temp: float, bed_temp: float) -> List[str]:
@@ -104,17 +90,218 @@ def generateEndingGcode() -> List[str]:
 
 
 
-def parseStepsToGcode(steps: List[Dict], filename: str, extrusion_params: List[float], hotendTemp: float, bedTemp: float) -> None:
+def shapeArrayToGcode(points: PointArray, last_point: Union[Point, None], extrusionWidth: float, extrusionHeight: float) -> str:
+    """
+    Formats an array-backed shape into G1 moves, computing the missing extrusion values for all points at once.
+
+    Args:
+        points (PointArray): the shape to be printed
+        last_point (Union[Point, None]): the position of the nozzle before the shape, None at the start of the print
+        extrusionWidth (float): The default width of the extrusion.
+        extrusionHeight (float): The default height of the extrusion.
+
+    Returns:
+        str: G-code lines of the shape, each terminated with a new line
+    """
+    if len(points) == 0:
+        return ""
+
+    xyz = points.xyz
+    previous = np.empty_like(xyz)
+    previous[1:] = xyz[:-1]
+    if last_point is not None:
+        previous[0] = (last_point.x, last_point.y, last_point.z)
+    else:
+        previous[0] = xyz[0]
+
+    # Calculate extrusion values based on the distance from the previous point, where they are not defined
+    distance = np.sqrt(((xyz - previous) ** 2).sum(axis=1))
+    e_values = np.where(np.isnan(points.e), (extrusionWidth * extrusionHeight * distance) / (pi * (1.75 / 2) ** 2), points.e)
+    if last_point is None and np.isnan(points.e[0]):
+        e_values[0] = np.nan
+
+    lines = []
+    for x, y, z, e_value in zip(points.x.tolist(), points.y.tolist(), points.z.tolist(), e_values.tolist()):
+        e_command = f"E{e_value}" if e_value == e_value else ""
+        lines.append(f"G1 X{x} Y{y} Z{z} {e_command}\n")
+    return "".join(lines)
+
+
+def stepsToGcodeChunks(steps: Iterable[Dict], extrusion_params: List[float], hotendTemp: float, bedTemp: float) -> Iterator[str]:
+    """
+    Formats steps into G-code one step at a time, see parseStepsToGcode. The steps are consumed as they are
+    generated, so neither the step list nor the whole G-code needs to be held in memory.
+
+    Args:
+        steps (Iterable[Dict]): the steps, a list or any iterator or generator of them
+        extrusion_params (List[float]): the default extrusion width and height
+        hotendTemp (float): hotend temperature of the starting G-code
+        bedTemp (float): bed temperature of the starting G-code
+
+    Returns:
+        Iterator[str]: pieces of G-code, each consisting of whole lines terminated with a new line
+    """
+    extrusionWidth, extrusionHeight = extrusion_params
+    last_point = None
+    retraction_amount = 2.0  # The amount to retract before non-extrusion moves (in mm)
+    prime_amount = retraction_amount * 0.9  # Extrude back slightly less than retracted amount (e.g., 90%)
+
+    yield "".join(line + "\n" for line in generateStartingGcode(hotendTemp, bedTemp))
+
+    for step in steps:
+        command_type, data = next(iter(step.items()))  # Extract the single key-value pair in each step
+
+        match command_type:
+            case 'moveWithNoExtrusion':
+                # Add retraction before the move with no extrusion
+                yield f"G1 E-{retraction_amount} F1800 ; Retraction before moving\n"
+
+                # Perform the move with no extrusion
+                point = data
+                yield f"G0 X{point.x} Y{point.y} Z{point.z}\n"
+                last_point = point  # Update the last point
+
+                # Prime extrusion after moving
+                yield f"G1 E{prime_amount} F1800 ; Priming after move\n"
+
+            case 'stationaryExtrusion':
+                extrude_amount = data['amount']
+                speed = data['speed']
+                yield f"G1 E{extrude_amount} F{speed}\n"
+
+            case 'shape' if isinstance(data, PointArray):
+                yield "; Generating shape\n"
+                yield shapeArrayToGcode(data, last_point, extrusionWidth, extrusionHeight)
+                if len(data):
+                    last_point = data[-1]
+
+            case 'pattern':
+                # Instances are generated one at a time, the whole pattern is never held in memory
+                for instance in data:
+                    yield "; Generating shape\n"
+                    yield shapeArrayToGcode(instance, last_point, extrusionWidth, extrusionHeight)
+                    if len(instance):
+                        last_point = instance[-1]
+
+            case 'shape':
+                lines = ["; Generating shape\n"]
+                for point in data:
+                    if point.e is None and last_point:
+                        # Calculate distance from last point
+                        distance = sqrt(
+                            (point.x - last_point.x) ** 2
+                            + (point.y - last_point.y) ** 2
+                            + (point.z - last_point.z) ** 2
+                        )
+                        # Calculate extrusion value based on distance, extrusionWidth, and extrusionHeight
+                        e_value = (extrusionWidth * extrusionHeight * distance) / (pi * (1.75 / 2) ** 2)
+                    else:
+                        e_value = point.e
+
+                    e_command = f"E{e_value}" if e_value is not None else ""
+                    lines.append(f"G1 X{point.x} Y{point.y} Z{point.z} {e_command}\n")
+
+                    last_point = point  # Update the last point after each move
+                yield "".join(lines)
+
+            case 'retraction':
+                retraction = data
+                yield f"G1 E{retraction} F{speed}\n"
+
+            case _:
+                yield f"; Unknown command type: {command_type}\n"
+
+    yield "".join(line + "\n" for line in generateEndingGcode())
+
+
+class GcodeWriter:
+    """
+    Collects pieces of G-code and writes them encoded to a binary stream in large chunks, so that a file, pipe or
+    socket sees few large writes instead of one per line.
+
+    Attributes:
+        stream (BinaryIO): the binary file-like object written to, anything with a write(bytes) method
+        bufferSize (int): number of characters collected before they are written
+        bytesWritten (int): number of bytes written to the stream so far
+    """
+
+    def __init__(self, stream: BinaryIO, bufferSize: int = 1 << 20):
+        self.stream = stream
+        self.bufferSize = bufferSize
+        self.bytesWritten = 0
+        self.pending: List[str] = []
+        self.pendingSize = 0
+
+    def write(self, text: str) -> None:
+        self.pending.append(text)
+        self.pendingSize += len(text)
+        if self.pendingSize >= self.bufferSize:
+            self.writePending()
+
+    def writePending(self) -> None:
+        if not self.pending:
+            return
+        chunk = "".join(self.pending).encode('utf-8')
+        self.pending, self.pendingSize = [], 0
+        self.stream.write(chunk)
+        self.bytesWritten += len(chunk)
+
+    def flush(self) -> None:
+        """
+        Writes the collected G-code and flushes the stream, if it can be flushed.
+        """
+        self.writePending()
+        if hasattr(self.stream, 'flush'):
+            self.stream.flush()
+
+
+def streamStepsToGcode(steps: Iterable[Dict], output: BinaryIO, extrusion_params: List[float], hotendTemp: float, bedTemp: float,
+                       bufferSize: int = 1 << 20) -> int:
+    """
+    Writes the G-code of a stream of steps to a binary file-like object, see parseStepsToGcode.
+
+    The steps are consumed one by one, e.g. from a generator, and their G-code is collected in a buffer that is
+    written in chunks of about bufferSize characters, so G-code can be piped straight into a compressor or to the
+    printer host without holding all steps in memory.
+
+    Args:
+        steps (Iterable[Dict]): the steps, a list or any iterator or generator of them
+        output (BinaryIO): a binary file-like object, e.g. a file opened with 'wb', a pipe, socket.makefile('wb'), gzip.open(..., 'wb') or io.BytesIO
+        extrusion_params (List[float]): the default extrusion width and height
+        hotendTemp (float): hotend temperature of the starting G-code
+        bedTemp (float): bed temperature of the starting G-code
+        bufferSize (int): number of characters collected before they are written. Default is 1 MiB.
+
+    Returns:
+        int: the number of bytes written
+
+    Example:
+        ```
+        import gzip
+
+        with gzip.open('output.gcode.gz', 'wb') as compressed:
+            streamStepsToGcode(vaseLayers(base, 200, 0.6, 0.2), compressed, [0.4, 0.2], hotendTemp=200, bedTemp=60)
+        ```
+    """
+    writer = GcodeWriter(output, bufferSize)
+    for chunk in stepsToGcodeChunks(steps, extrusion_params, hotendTemp, bedTemp):
+        writer.write(chunk)
+    writer.flush()
+    return writer.bytesWritten
+
+
+def parseStepsToGcode(steps: Iterable[Dict], filename: str, extrusion_params: List[float], hotendTemp: float, bedTemp: float) -> None:
     """
     Parses a list of steps representing G-code commands and writes them to a G-code file.
     Adds extrusion calculation for G-code moves if extrusion is not explicitly defined.
 
     Args:
-        steps (List[Dict]): A list of steps, each represented as a dictionary containing a command type and associated data.
+        steps (Iterable[Dict]): A list, or any iterable, of steps, each represented as a dictionary containing a command type and associated data.
             The dictionary has the following structure:
                 - 'moveWithNoExtrusion': A Point object representing a move without extrusion.
                 - 'stationaryExtrusion': A dictionary containing 'amount' (float) and 'speed' (int) representing the extrusion amount and speed.
-                - 'shape': A list of Point objects representing a shape defined by its points.
+                - 'shape': A list of Point objects or a PointArray representing a shape defined by its points.
+                - 'pattern': A ShapePattern, its instances are printed one after another like separate 'shape' steps.
                 - 'retraction': A float representing the amount of filament to retract.
         filename (str): The name of the output file to write the G-code commands to.
         extrusion_params (List[float]): A list containing two values:
@@ -144,64 +331,5 @@ def parseStepsToGcode(steps: List[Dict], filename: str, extrusion_params: List[f
         ValueError: If an unsupported command type is encountered in the steps.
 
     """
-    extrusionWidth, extrusionHeight = extrusion_params
-    last_point = None
-    retraction_amount = 2.0  # The amount to retract before non-extrusion moves (in mm)
-    prime_amount = retraction_amount * 0.9  # Extrude back slightly less than retracted amount (e.g., 90%)
-
-    with open(filename, 'w') as gcode_file:
-        startingGcode = generateStartingGcode(hotendTemp, bedTemp)
-        for line in startingGcode:
-            gcode_file.write(line + "\n")
-
-        for step in steps:
-            command_type, data = next(iter(step.items()))  # Extract the single key-value pair in each step
-
-            match command_type:
-                case 'moveWithNoExtrusion':
-                    # Add retraction before the move with no extrusion
-                    gcode_file.write(f"G1 E-{retraction_amount} F1800 ; Retraction before moving\n")
-
-                    # Perform the move with no extrusion
-                    point = data
-                    gcode_file.write(f"G0 X{point.x} Y{point.y} Z{point.z}\n")
-                    last_point = point  # Update the last point
-
-                    # Prime extrusion after moving
-                    gcode_file.write(f"G1 E{prime_amount} F1800 ; Priming after move\n")
-
-                case 'stationaryExtrusion':
-                    extrude_amount = data['amount']
-                    speed = data['speed']
-                    gcode_file.write(f"G1 E{extrude_amount} F{speed}\n")
-
-                case 'shape':
-                    gcode_file.write(f"; Generating shape\n")
-                    for point in data:
-                        if point.e is None and last_point:
-                            # Calculate distance from last point
-                            distance = sqrt(
-                                (point.x - last_point.x) ** 2
-                                + (point.y - last_point.y) ** 2
-                                + (point.z - last_point.z) ** 2
-                            )
-                            # Calculate extrusion value based on distance, extrusionWidth, and extrusionHeight
-                            e_value = (extrusionWidth * extrusionHeight * distance) / (pi * (1.75 / 2) ** 2)
-                        else:
-                            e_value = point.e
-
-                        e_command = f"E{e_value}" if e_value is not None else ""
-                        gcode_file.write(f"G1 X{point.x} Y{point.y} Z{point.z} {e_command}\n")
-
-                        last_point = point  # Update the last point after each move
-
-                case 'retraction':
-                    retraction = data
-                    gcode_file.write(f"G1 E{retraction} F{speed}\n")
-
-                case _:
-                    gcode_file.write(f"; Unknown command type: {command_type}\n")
-
-        endingGcode = generateEndingGcode()
-        for line in endingGcode:
-            gcode_file.write(line + "\n")
\ No newline at end of file
+    with open(filename, 'wb') as gcode_file:
+        streamStepsToGcode(steps, gcode_file, extrusion_params, hotendTemp, bedTemp)